@@ -116,7 +116,9 @@ def test_execution(runs):
 
   testRunner = tester.Tester()
   try:
-    testRunner.begin_testing(True, False, runs=runs)
+    # One run at a time: run_test_execution divides the wall time by runs, and
+    # config._CONTEST_TIMEOUT_SEC is derived from that average
+    testRunner.begin_testing(True, False, runs=runs, workers=1)
 
     #logger.info("Testing Runs Results...")
     #logger.info("Successes: {}".format(testRunner.successes))
@@ -0,0 +1,251 @@
+"""This module manages the persistent test harness, launchHarness.java.
+
+Starting a JVM, loading the classes and having ConTest instrument them is
+most of the cost of a test run for small testsuites. The harness is a JVM
+that stays up and runs the testsuite as many times as it is asked, through
+py4j (like _jpf/launchJPF.java). One harness is kept per workarea, started
+the first time the workarea is tested and stopped when the workarea is
+rebuilt or deleted (see release_harnesses).
+
+Copyright David Kelk, 2013
+"""
+
+# py4j is a library for calling java methods from python
+# http://py4j.sourceforge.net/
+from py4j.java_gateway import JavaGateway, GatewayClient
+from py4j.protocol import Py4JNetworkError, Py4JJavaError
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import Queue
+import sys
+sys.path.append("..")  # To allow importing parent directory module
+import config
+import logging
+logger = logging.getLogger('output-log')
+
+# Global variables
+_harnesses = {}  # workarea -> Harness
+_harnessLock = threading.Lock()
+_harnessCompiled = False
+_freePorts = Queue.Queue()
+_portsCreated = 0
+
+# Seconds to wait for a new harness JVM to accept connections
+_STARTUP_TIMEOUT_SEC = 30
+
+
+def get_harness(projectDir, classpath):
+  """Return the harness of a workarea. The JVM is started by the first run.
+
+  Attributes:
+    projectDir (string): workarea the testsuite is run from
+    classpath (string): classpath of the project in that workarea
+  Returns:
+    Harness: harness of the workarea
+  """
+
+  with _harnessLock:
+    compile_harness()
+    harness = _harnesses.get(projectDir)
+    if harness is None:
+      harness = Harness(projectDir, classpath)
+      _harnesses[projectDir] = harness
+
+  return harness
+
+
+def release_harnesses(directory):
+  """Stop the harnesses of the workareas in a directory that is about to be
+  rebuilt or deleted. A harness JVM keeps the working directory it was
+  started in, so it can't be used with a new copy of its workarea.
+
+  Attributes:
+    directory (string): a workarea, or a directory holding workareas (eg.
+      tmp/3/4/)
+  Returns:
+    No return value
+  """
+
+  prefix = os.path.join(os.path.abspath(directory), '')
+  with _harnessLock:
+    released = [_harnesses.pop(projectDir) for projectDir in _harnesses.keys()
+                if os.path.join(os.path.abspath(projectDir), '').startswith(prefix)]
+
+  for harness in released:
+    harness.stop()
+
+
+def shutdown_harnesses():
+  """CORE is closing, so stop all of the harness JVMs.
+
+  Returns:
+    No return value
+  """
+
+  with _harnessLock:
+    for harness in _harnesses.values():
+      harness.stop()
+    _harnesses.clear()
+
+
+def compile_harness():
+  """Compile src/_contest/launchHarness.java. Do this once per run.
+
+  Returns:
+    No return value
+  """
+
+  global _harnessCompiled
+
+  if _harnessCompiled:
+    return
+
+  logger.debug("Compiling _contest/launchHarness.java.")
+  outFile = tempfile.SpooledTemporaryFile()
+  errFile = tempfile.SpooledTemporaryFile()
+  process = subprocess.Popen(['javac', '-cp', ".:" + config._JUNIT_JAR
+    + ":" + config._PY4J_JAR, 'launchHarness.java'], stdout=outFile,
+    stderr=errFile, cwd=config._HARNESS_DIR, shell=False)
+  if process.wait() != 0:
+    errFile.seek(0)
+    logger.error("Couldn't compile launchHarness.java:\n{}".format(errFile.read()))
+  outFile.close()
+  errFile.close()
+  _harnessCompiled = True
+
+
+def acquire_port():
+  """Get a py4j port no other harness JVM is using.
+
+  Returns:
+    int: Port for the Java end of the gateway
+  """
+
+  global _portsCreated
+
+  try:
+    return _freePorts.get_nowait()
+  except Queue.Empty:
+    port = config._CONTEST_HARNESS_PORT + 2 * _portsCreated
+    _portsCreated += 1
+    return port
+
+
+class Harness():
+  """A harness JVM and the python end of its gateway.
+
+  The harness is run from the workarea, so ConTest writes
+  com_ibm_contest/ to the same place as when the testsuite is run directly.
+
+  Attributes:
+    projectDir (string): workarea the harness is run from
+    classpath (string): classpath of the project under test
+    process (Popen): the harness JVM, None if it isn't running
+  """
+
+  def __init__(self, projectDir, classpath):
+    self.projectDir = projectDir
+    self.classpath = classpath
+    self.process = None
+    self.port = None
+    self.gateway = None
+    self.outFile = None
+    self.errFile = None
+
+  def start(self):
+    """Start the harness JVM and connect to it."""
+
+    with _harnessLock:
+      self.port = acquire_port()
+
+    logger.debug("Starting the test harness on port {}.".format(self.port))
+    # The output of the tests themselves isn't needed
+    self.outFile = open(os.devnull, 'w')
+    self.errFile = tempfile.SpooledTemporaryFile()
+    self.process = subprocess.Popen(['java', '-Xmx{}m'.format(config._PROJECT_TEST_MB),
+      '-XX:-UseSplitVerifier', '-cp', config._HARNESS_DIR + ":" +
+      config._JUNIT_JAR + ":" + config._PY4J_JAR, '-javaagent:' +
+      config._CONTEST_JAR, '-Dcontest.verbose=0', 'launchHarness',
+      str(self.port)], stdout=self.outFile, stderr=self.errFile,
+      cwd=self.projectDir, shell=False)
+
+    # Wait until the Java end accepts connections instead of sleeping for
+    # a fixed amount of time
+    self.gateway = JavaGateway(GatewayClient(port=self.port), auto_convert=True)
+    startTime = time.time()
+    while True:
+      try:
+        self.gateway.entry_point.setProject(self.classpath, config._PROJECT_TESTSUITE)
+        return
+      except Py4JNetworkError:
+        if self.process.poll() is not None or \
+          time.time() - startTime > _STARTUP_TIMEOUT_SEC:
+          self.errFile.seek(0)
+          logger.error("The test harness didn't start:\n{}".format(self.errFile.read()))
+          self.stop()
+          raise
+        time.sleep(0.1)
+
+  def start_once(self):
+    """Start the harness JVM, unless it is running already."""
+
+    if self.process is None:
+      self.start()
+
+  def stop(self):
+    """Stop the harness JVM. Killing the process is inelegant, see
+    run_jpf.shutdownJPFProcess."""
+
+    if self.process is None:
+      return
+
+    if self.gateway is not None:
+      try:
+        self.gateway.close()
+      except:
+        pass
+    if self.process.poll() is None:
+      self.process.kill()
+    self.process.wait()
+    self.outFile.close()
+    self.errFile.close()
+
+    self.process = None
+    self.gateway = None
+    _freePorts.put(self.port)
+
+  def run_testsuite(self, timeout):
+    """Run the testsuite once.
+
+    Attributes:
+      timeout (float): seconds the testsuite may run before it is timed out
+    Returns:
+      (string, string): result (FINISHED, TIMEOUT or ERROR) and the JUnit
+        summary, thread dump or error text
+    """
+
+    self.start_once()
+
+    try:
+      watchdogMs = 0
+      if config._CONTEST_WATCHDOG:
+        watchdogMs = int(config._CONTEST_WATCHDOG_INTERVAL_SEC * 1000)
+      result = self.gateway.entry_point.runTestSuite(int(timeout * 1000),
+                 watchdogMs)
+    except (Py4JNetworkError, Py4JJavaError), err:
+      # The harness died, eg. the testsuite called System.exit()
+      logger.error("The test harness stopped responding: {}".format(err))
+      self.stop()
+      return "ERROR", str(err)
+
+    status, text = (result.split("\n", 1) + [""])[:2]
+
+    # Threads of a timed out run are still hanging around. Start from a
+    # clean JVM for the next run
+    if status == "TIMEOUT":
+      self.stop()
+
+    return status, text
@@ -0,0 +1,152 @@
+import java.io.*;
+import java.lang.management.*;
+import java.net.*;
+import java.util.*;
+import java.util.concurrent.*;
+
+// JUnit is on the classpath of this JVM, the project under test isn't
+import org.junit.runner.JUnitCore;
+import org.junit.runner.Result;
+import org.junit.runner.notification.Failure;
+
+// py4j is a python package for connecting to Java programs
+// JAR is in core/lib/Java
+import py4j.*;
+
+// Runs the testsuite of the project over and over in the same JVM, so a
+// test run doesn't pay for JVM startup. Each run loads the project in a new
+// class loader, so no static state is carried over from the previous run and
+// the classes ConTest instruments are the ones just compiled.
+//
+// runTestSuite returns a string whose first line is FINISHED, TIMEOUT or
+// ERROR. For FINISHED the JUnit summary follows, in the same format as
+// JUnitCore prints it. For TIMEOUT a thread dump follows. See harness.py.
+public class launchHarness {
+
+  protected
+    URL[] projectURLs;
+    String testSuite;
+    int runCount;
+
+  public launchHarness() {
+    projectURLs = new URL[0];
+    testSuite = null;
+    runCount = 0;
+  }
+
+  public void setProject(String classpath, String inTestSuite)
+    throws MalformedURLException {
+    List<URL> urls = new ArrayList<URL>();
+    for (String entry : classpath.split(":")) {
+      if (entry.length() > 0)
+        urls.add(new File(entry).toURI().toURL());
+    }
+    projectURLs = urls.toArray(new URL[urls.size()]);
+    testSuite = inTestSuite;
+  }
+
+  // watchdogMs > 0 checks for deadlocked threads at that interval, so a
+  // deadlocked run is reported without waiting for the full timeout
+  public String runTestSuite(long timeoutMs, long watchdogMs) {
+    if (testSuite == null)
+      return "ERROR\nlaunchHarness.java, runTestSuite: Call setProject first.";
+
+    // Classes not found in the project (JUnit, the JDK) come from the parent
+    final URLClassLoader loader = new URLClassLoader(projectURLs,
+      launchHarness.class.getClassLoader());
+
+    FutureTask<Result> task = new FutureTask<Result>(new Callable<Result>() {
+      public Result call() throws Exception {
+        Thread.currentThread().setContextClassLoader(loader);
+        Class<?> suite = Class.forName(testSuite, true, loader);
+        return new JUnitCore().run(suite);
+      }
+    });
+
+    runCount++;
+    Thread runner = new Thread(task, "harness-run-" + runCount);
+    runner.setDaemon(true);
+    runner.start();
+
+    try {
+      long deadline = System.currentTimeMillis() + timeoutMs;
+      ThreadMXBean threads = ManagementFactory.getThreadMXBean();
+      while (true) {
+        long remainingMs = deadline - System.currentTimeMillis();
+        if (remainingMs <= 0)
+          throw new TimeoutException();
+        if (watchdogMs > 0 && watchdogMs < remainingMs)
+          remainingMs = watchdogMs;
+
+        try {
+          return "FINISHED\n" + summary(task.get(remainingMs, TimeUnit.MILLISECONDS));
+        } catch (TimeoutException e) {
+          if (watchdogMs > 0 && threads.findDeadlockedThreads() != null)
+            throw e;
+        }
+      }
+    } catch (TimeoutException e) {
+      // The hung threads can't be cleaned up. The python side restarts
+      // this JVM after a timeout
+      return "TIMEOUT\n" + threadDump();
+    } catch (ExecutionException e) {
+      return "ERROR\n" + stackTrace(e.getCause());
+    } catch (InterruptedException e) {
+      return "ERROR\n" + stackTrace(e);
+    }
+  }
+
+  // Same text as JUnitCore's TextListener, so tester.py can parse it
+  protected String summary(Result result) {
+    StringBuilder text = new StringBuilder();
+    for (Failure failure : result.getFailures())
+      text.append(failure.getTestHeader() + "\n" + failure.getTrace() + "\n");
+
+    if (result.wasSuccessful()) {
+      text.append("OK (" + result.getRunCount() + " test"
+        + (result.getRunCount() == 1 ? "" : "s") + ")\n");
+    } else {
+      text.append("FAILURES!!!\n");
+      text.append("Tests run: " + result.getRunCount() + ",  Failures: "
+        + result.getFailureCount() + "\n");
+    }
+    return text.toString();
+  }
+
+  // Close to what the JVM prints on SIGQUIT, including the deadlock report
+  protected String threadDump() {
+    ThreadMXBean threads = ManagementFactory.getThreadMXBean();
+    StringBuilder text = new StringBuilder("Full thread dump\n");
+    for (ThreadInfo info : threads.dumpAllThreads(
+      threads.isObjectMonitorUsageSupported(),
+      threads.isSynchronizerUsageSupported()))
+      text.append(info.toString());
+
+    long[] deadlocked = threads.findDeadlockedThreads();
+    if (deadlocked != null) {
+      text.append("Found one Java-level deadlock:\n");
+      for (ThreadInfo info : threads.getThreadInfo(deadlocked, true, true))
+        text.append(info.toString());
+      text.append("Found " + deadlocked.length + " deadlocked threads.\n");
+    }
+    return text.toString();
+  }
+
+  protected String stackTrace(Throwable t) {
+    StringWriter trace = new StringWriter();
+    t.printStackTrace(new PrintWriter(trace));
+    return trace.toString();
+  }
+
+  public static void main(String[] args) {
+    // py4j needs this
+    // The first argument, if given, is the port to listen on
+    launchHarness harness = new launchHarness();
+    GatewayServer server;
+    if (args.length > 0)
+      server = new GatewayServer(harness, Integer.parseInt(args[0]));
+    else
+      server = new GatewayServer(harness);
+    server.start();
+  } // main
+} // class
@@ -0,0 +1,219 @@
+"""This module holds the rules used to stop testing early.
+
+Running the testsuite many times for every member is the most expensive part
+of CORE. Often the first few runs are enough to tell if a member is better or
+worse than the best member of the population. A stop rule is handed to
+Tester.begin_testing and is asked after every run if the testing can stop.
+
+SuccessRateRule is used in the fixing phase, MeasurementRule in the
+optimization phase.
+
+Copyright David Kelk, 2013
+"""
+
+from __future__ import division
+import math
+import sys
+sys.path.append("..")  # To allow importing parent directory module
+import config
+
+import logging
+logger = logging.getLogger('output-log')
+
+
+def wilson_interval(successes, runs, z=None):
+  """Wilson score confidence interval for a success rate. Unlike the normal
+  approximation it behaves well with few runs and rates near 0 or 1.
+
+  Attributes:
+    successes (int): number of successful test runs
+    runs (int): number of completed test runs
+    z (float): z value of the confidence level, config._CONTEST_SEQUENTIAL_Z
+      if None
+  Returns:
+    (float, float): lower and upper bound on the success rate
+  """
+
+  if z is None:
+    z = config._CONTEST_SEQUENTIAL_Z
+
+  if runs == 0:
+    return 0.0, 1.0
+
+  rate = successes / runs
+  denominator = 1 + z * z / runs
+  centre = (rate + z * z / (2 * runs)) / denominator
+  halfWidth = z * math.sqrt(rate * (1 - rate) / runs
+                + z * z / (4 * runs * runs)) / denominator
+
+  return max(0.0, centre - halfWidth), min(1.0, centre + halfWidth)
+
+
+def scale_counts(counts, completed, runs=None):
+  """A member whose testing stopped early has counts (successes, timeouts,
+  ...) over fewer runs than the others. Scale them to the number of runs the
+  rest of CORE expects.
+
+  Each run has exactly one outcome, so the counts add up to the completed
+  runs. The scaled counts are rounded by largest remainder to add up to runs
+  too, rounding each of them separately could give one run more or less.
+
+  Attributes:
+    counts (list int): number of runs with each outcome
+    completed (int): number of test runs that completed
+    runs (int): number of runs to scale to, config._CONTEST_RUNS if None
+  Returns:
+    list int: counts over runs test runs, in the same order
+  """
+
+  if runs is None:
+    runs = config._CONTEST_RUNS
+
+  if completed == 0 or completed == runs:
+    return list(counts)
+
+  # Round down, then give the runs that are left to the counts that lost the
+  # most to the rounding
+  scaled = [count * runs // completed for count in counts]
+  remainders = [(count * runs % completed, i) for i, count in enumerate(counts)]
+  remainders.sort(key=lambda remainder: remainder[0], reverse=True)
+  for remainder, i in remainders[:runs - sum(scaled)]:
+    scaled[i] += 1
+
+  return scaled
+
+
+def mean_and_variance(values):
+  """Sample mean and (unbiased) sample variance.
+
+  Attributes:
+    values (list float): measurements
+  Returns:
+    (float, float): mean and variance, the variance is 0 for fewer than 2 values
+  """
+
+  if len(values) == 0:
+    return 0.0, 0.0
+
+  mean = sum(values, 0.0) / len(values)
+  if len(values) < 2:
+    return mean, 0.0
+
+  variance = sum([(value - mean) ** 2 for value in values]) / (len(values) - 1)
+  return mean, variance
+
+
+def mean_interval(values, z=None):
+  """Normal confidence interval on the mean of the measurements.
+
+  Attributes:
+    values (list float): measurements
+    z (float): z value of the confidence level, config._CONTEST_SEQUENTIAL_Z
+      if None
+  Returns:
+    (float, float): lower and upper bound on the mean
+  """
+
+  if z is None:
+    z = config._CONTEST_SEQUENTIAL_Z
+
+  mean, variance = mean_and_variance(values)
+  if len(values) == 0:
+    return mean, mean
+  halfWidth = z * math.sqrt(variance / len(values))
+  return mean - halfWidth, mean + halfWidth
+
+
+class SuccessRateRule():
+  """Stop testing a member once the confidence interval on its success rate
+  is clear of the best success rate in the population, that is, once we know
+  whether it ranks above or below the best member.
+
+  A member that hasn't failed yet is never stopped. It may be a fix, and
+  a fix has to pass all of the config._CONTEST_RUNS runs.
+
+  Attributes:
+    target (float): best success rate in the population, None if unknown
+  """
+
+  def __init__(self, target):
+    self.target = target
+
+  def __call__(self, successes, completed):
+    """Can the testing stop?
+
+    Attributes:
+      successes (int): number of successful test runs so far
+      completed (int): number of test runs completed so far
+    Returns:
+      boolean: True to stop testing
+    """
+
+    if self.target is None or successes == completed:
+      return False
+
+    if completed < config._CONTEST_SEQUENTIAL_MIN_RUNS:
+      return False
+
+    low, high = wilson_interval(successes, completed)
+    if high < self.target or low > self.target:
+      logger.debug("Success rate is in [{:.2f}, {:.2f}] after {} runs, best "
+        "success rate is {:.2f}. Stopping early.".format(low, high, completed,
+        self.target))
+      return True
+
+    return False
+
+
+class MeasurementRule():
+  """Stop measuring the performance of a member (real time and voluntary
+  context switches, lower is better) once:
+  - the confidence intervals on both means are narrower than
+    config._MEASUREMENT_TARGET_WIDTH of the means, or
+  - both means are clearly worse (higher) than the best means in the
+    population.
+  Only successful runs are measurements, at least config._MEASUREMENT_MIN_RUNS
+  of them are taken. The run count passed to begin_testing is the cap.
+
+  Attributes:
+    contest (Tester): tester doing the measuring
+    bestRealTime (float): best mean real time in the population, or None
+    bestVoluntarySwitches (float): best mean voluntary switches, or None
+  """
+
+  def __init__(self, contest, bestRealTime, bestVoluntarySwitches):
+    self.contest = contest
+    self.bestRealTime = bestRealTime
+    self.bestVoluntarySwitches = bestVoluntarySwitches
+
+  def __call__(self, successes, completed):
+    """Can the measuring stop?
+
+    Attributes:
+      successes (int): number of successful test runs so far
+      completed (int): number of test runs completed so far
+    Returns:
+      boolean: True to stop testing
+    """
+
+    samples = [self.contest.realTime, self.contest.voluntarySwitches]
+    if len(samples[0]) < config._MEASUREMENT_MIN_RUNS:
+      return False
+
+    narrow = True
+    for values in samples:
+      low, high = mean_interval(values)
+      mean = (low + high) / 2
+      if mean > 0 and (high - low) / 2 > config._MEASUREMENT_TARGET_WIDTH * mean:
+        narrow = False
+    if narrow:
+      logger.debug("Measurements are precise enough after {} runs".format(completed))
+      return True
+
+    if self.bestRealTime is not None and self.bestVoluntarySwitches is not None \
+      and mean_interval(samples[0])[0] > self.bestRealTime \
+      and mean_interval(samples[1])[0] > self.bestVoluntarySwitches:
+      logger.debug("Clearly worse than the best member after {} runs".format(completed))
+      return True
+
+    return False
@@ -0,0 +1,353 @@
+"""This module starts and watches over the test processes run by the Tester.
+
+Instead of polling each process, the supervisor blocks in select() on the
+stdout/stderr pipes of all of its children until output arrives, a child
+exits or the next deadline is reached. A child that runs past its deadline is
+sent SIGQUIT so the JVM prints a thread dump. As soon as the dump has been
+read the child is terminated.
+
+Children are reaped with os.wait4, so the resource usage of each child (CPU
+time, peak memory, context switches) is available without wrapping it in
+/usr/bin/time.
+
+Children can also be watched while they run (config._CONTEST_WATCHDOG). The
+CPU time of a watched child is sampled from /proc/<pid>/stat. When it stops
+going up, the child is sent SIGQUIT, and if the thread dump reports a
+Java-level deadlock the child is treated as timed out right away, instead of
+after the full timeout. Without /proc (eg. on the mac) a thread dump is
+requested every few samples instead.
+
+Copyright David Kelk, 2013
+"""
+
+import os
+import re
+import select
+import signal
+import subprocess
+import time
+import errno
+import sys
+sys.path.append("..")  # To allow importing parent directory module
+import config
+
+import logging
+logger = logging.getLogger('output-log')
+
+# The JVM ends a thread dump with "JNI global references: n", followed by a
+# deadlock report if it finds one. If no more output arrives for this long
+# after the JNI line, the dump is complete
+_DUMP_QUIET_SEC = 0.25
+
+# The JVM's own housekeeping threads use a little CPU even when every thread
+# of the program is blocked. Less than this many clock ticks between two
+# watchdog samples counts as no progress
+_IDLE_TICKS = 2
+
+# Seconds to wait for a terminated child to exit before killing it
+_TERMINATE_GRACE_SEC = 2
+
+
+class Child():
+  """A test process being supervised.
+
+  Attributes:
+    process (Popen): the test process
+    tag: identifies the child to the caller, eg. the test run number
+    startTime (float): time.time() at which the child was started
+    endTime (float): time.time() at which the child was reaped
+    deadline (float): time.time() at which the child is timed out
+    timedOut (bool): the child didn't finish before its deadline
+    deadlockDetected (bool): the watchdog found a deadlock before the deadline
+    watch (bool): sample the child's progress while it runs
+    output (string): everything the child wrote to stdout
+    error (string): everything the child wrote to stderr
+    returncode (int): exit status, once the child has been reaped
+    rusage: resource usage of the child (see resource.getrusage), once reaped
+  """
+
+  def __init__(self, process, tag, deadline, watch=False):
+    self.process = process
+    self.tag = tag
+    self.startTime = time.time()
+    self.endTime = None
+    self.deadline = deadline
+    self.timedOut = False
+    self.deadlockDetected = False
+    self.returncode = None
+    self.rusage = None
+
+    self.watch = watch
+    self.nextSample = self.startTime + config._CONTEST_WATCHDOG_INTERVAL_SEC
+    self.lastCpuTime = None
+    self.stalledSamples = 0
+    self.probeOffset = None  # Start of the requested thread dump in output
+    self.probeDeadline = None
+
+    self.outChunks = []
+    self.errChunks = []
+    self.openPipes = {process.stdout.fileno(): self.outChunks,
+                      process.stderr.fileno(): self.errChunks}
+
+    self.dumpOffset = None  # Start of the thread dump of the timeout in output
+    self.dumpDeadline = None  # Give up waiting for the thread dump
+    self.killDeadline = None  # Kill the child if it hasn't exited
+    self.lastOutput = time.time()
+
+  @property
+  def output(self):
+    return ''.join(self.outChunks)
+
+  @property
+  def error(self):
+    return ''.join(self.errChunks)
+
+  def dump_complete(self, offset=0):
+    """Has the JVM finished writing the thread dump requested by SIGQUIT?
+
+    Args:
+      offset (int): where in the output the thread dump starts
+    """
+
+    output = self.output[offset:]
+    if re.search("Found \d+ deadlocks?\.", output) is not None:
+      return True
+    if output.find("JNI global references") >= 0 and \
+      time.time() - self.lastOutput >= _DUMP_QUIET_SEC:
+      return True
+    return False
+
+
+class Supervisor():
+  """Runs any number of test processes and reports them as they finish.
+
+  Attributes:
+    children (list Child): children that haven't been reaped yet
+  """
+
+  def __init__(self):
+    self.children = []
+
+  def running(self):
+    """Number of children that haven't been reaped yet."""
+
+    return len(self.children)
+
+  def start(self, args, cwd, timeout, tag, watch=False):
+    """Start a child process.
+
+    Args:
+      args (list string): command line of the child
+      cwd (string): working directory of the child
+      timeout (float): seconds the child may run before it is timed out
+      tag: returned with the child, so the caller can tell children apart
+      watch (bool): look for deadlocks while the child runs. The child has
+        to be the JVM itself, not a wrapper such as /usr/bin/time
+    Returns:
+      Child: the started child
+    """
+
+    process = subprocess.Popen(args, stdout=subprocess.PIPE,
+      stderr=subprocess.PIPE, cwd=cwd, close_fds=True, shell=False)
+    child = Child(process, tag, time.time() + timeout,
+                  watch and config._CONTEST_WATCHDOG)
+    self.children.append(child)
+    return child
+
+  def wait_any(self):
+    """Block until at least one child has finished (exited or timed out and
+    been terminated).
+
+    Returns:
+      list Child: children that finished, in the order they finished
+    """
+
+    finished = []
+    while len(finished) == 0 and len(self.children) > 0:
+      self.check_deadlines()
+
+      readFds = []
+      for child in self.children:
+        readFds.extend(child.openPipes.keys())
+
+      try:
+        ready = select.select(readFds, [], [], self.next_wakeup())[0]
+      except select.error, err:
+        if err.args[0] == errno.EINTR:
+          continue
+        raise
+
+      for child in self.children[:]:
+        for fd in child.openPipes.keys():
+          if fd in ready:
+            self.read_pipe(child, fd)
+
+        # Both pipes are closed at exit, so the child can be reaped without
+        # blocking for long
+        if len(child.openPipes) == 0:
+          self.reap(child)
+          self.children.remove(child)
+          finished.append(child)
+
+    return finished
+
+  def kill_all(self):
+    """Kill and reap every child that is still running."""
+
+    for child in self.children:
+      if child.process.poll() is None:
+        child.process.kill()
+      child.process.wait()
+      child.process.stdout.close()
+      child.process.stderr.close()
+    del self.children[:]
+
+  def reap(self, child):
+    """Wait for a child to exit and collect its exit status and resource
+    usage."""
+
+    while True:
+      try:
+        status, rusage = os.wait4(child.process.pid, 0)[1:]
+        break
+      except OSError, err:
+        if err.errno != errno.EINTR:
+          raise
+
+    child.endTime = time.time()
+    child.rusage = rusage
+    if os.WIFSIGNALED(status):
+      child.returncode = -os.WTERMSIG(status)
+    else:
+      child.returncode = os.WEXITSTATUS(status)
+    # Let Popen know the child is gone, so it doesn't wait for it again
+    child.process.returncode = child.returncode
+
+  def read_pipe(self, child, fd):
+    """Read what is available on one of a child's pipes."""
+
+    data = os.read(fd, 65536)
+    if len(data) == 0:
+      # EOF
+      # The other pipe may be closed already, so don't ask it for its fd
+      if child.openPipes[fd] is child.outChunks:
+        child.process.stdout.close()
+      else:
+        child.process.stderr.close()
+      del child.openPipes[fd]
+    else:
+      child.openPipes[fd].append(data)
+      child.lastOutput = time.time()
+
+  def check_deadlines(self):
+    """Time out children that ran past their deadline, and move timed out
+    children through SIGQUIT -> terminate -> kill."""
+
+    now = time.time()
+    for child in self.children:
+      if child.process.returncode is not None:
+        continue
+
+      if not child.timedOut:
+        if now >= child.deadline:
+          # Send the Quit signal to get thread dump information from JVM
+          # A dump the watchdog asked for earlier is in the output already,
+          # only the one that starts here counts
+          child.timedOut = True
+          child.dumpOffset = len(child.output)
+          child.dumpDeadline = now + config._CONTEST_THREAD_DUMP_SEC
+          child.process.send_signal(signal.SIGQUIT)
+        elif child.watch and now >= child.nextSample:
+          self.sample(child, now)
+
+      elif child.killDeadline is None:
+        if child.dump_complete(child.dumpOffset) or now >= child.dumpDeadline:
+          child.killDeadline = now + _TERMINATE_GRACE_SEC
+          child.process.terminate()
+
+      elif now >= child.killDeadline:
+        child.process.kill()
+        child.killDeadline = float('inf')
+
+  def sample(self, child, now):
+    """Watchdog: check on the progress of a running child.
+
+    Args:
+      child (Child): watched child that hasn't timed out
+      now (float): time.time()
+    """
+
+    child.nextSample = now + config._CONTEST_WATCHDOG_INTERVAL_SEC
+
+    # Waiting for the thread dump we asked for
+    if child.probeOffset is not None:
+      child.nextSample = now + _DUMP_QUIET_SEC
+      if child.output.find("Java-level deadlock:", child.probeOffset) >= 0 and \
+        child.dump_complete(child.probeOffset):
+        # The deadlock report is already in the output, no need to ask again
+        child.timedOut = True
+        child.deadlockDetected = True
+        child.killDeadline = now + _TERMINATE_GRACE_SEC
+        child.process.terminate()
+      elif child.dump_complete(child.probeOffset) or now >= child.probeDeadline:
+        # Not deadlocked, eg. sleeping or waiting on I/O
+        child.probeOffset = None
+      return
+
+    cpuTime = get_cpu_time(child.process.pid)
+    if cpuTime is None or (child.lastCpuTime is not None and
+      cpuTime - child.lastCpuTime < _IDLE_TICKS):
+      child.stalledSamples += 1
+    else:
+      child.stalledSamples = 0
+    child.lastCpuTime = cpuTime
+
+    if child.stalledSamples >= config._CONTEST_WATCHDOG_STALLED_SAMPLES:
+      child.stalledSamples = 0
+      child.probeOffset = len(child.output)
+      child.probeDeadline = now + config._CONTEST_THREAD_DUMP_SEC
+      child.nextSample = now + _DUMP_QUIET_SEC
+      child.process.send_signal(signal.SIGQUIT)
+
+  def next_wakeup(self):
+    """Seconds until the next deadline of any child."""
+
+    now = time.time()
+    wakeup = None
+    for child in self.children:
+      if not child.timedOut:
+        due = child.deadline
+        if child.watch:
+          due = min(due, child.nextSample)
+      elif child.killDeadline is None:
+        # Check for a quiet stream after the JNI line while the dump arrives
+        due = min(child.dumpDeadline, now + _DUMP_QUIET_SEC)
+      else:
+        due = child.killDeadline
+      if wakeup is None or due < wakeup:
+        wakeup = due
+
+    if wakeup is None or wakeup == float('inf'):
+      return None
+    return max(0, wakeup - now)
+
+
+def get_cpu_time(pid):
+  """CPU time (user + system, in clock ticks) used so far by a process.
+
+  Args:
+    pid (int): process id
+  Returns:
+    int: clock ticks, or None if /proc/<pid>/stat can't be read
+  """
+
+  try:
+    with open('/proc/{}/stat'.format(pid)) as statFile:
+      stat = statFile.read()
+  except IOError:
+    return None
+
+  # The command name (field 2) can contain spaces, so split after it.
+  # utime and stime are fields 14 and 15
+  fields = stat[stat.rfind(')') + 2:].split()
+  return int(fields[11]) + int(fields[12])
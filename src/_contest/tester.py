@@ -10,12 +10,14 @@ Copyright ARC, David Kelk and Kevin Jalbert, 2012
 from __future__ import division
 import sys
 import time
-import subprocess
-import tempfile
 import re
 import os
 import shutil
 from _evolution import static
+from _txl.project_context import ProjectContext
+from supervisor import Supervisor
+import harness
+import timeout
 
 sys.path.append("..")  # To allow importing parent directory module
 import config
@@ -39,73 +41,153 @@ class Tester():
     dataraces (int): number of test executions that resulted in a datarace
     deadlocks (int): number of test executions that resulted in a deadlock
     errors (int): number of test executions that resulted in an error
+    projectDir (string): workarea the testsuite is run from
+    classpath (string): classpath of the project in that workarea
   """
 
-  successes = 0
-  timeouts = 0
-  dataraces = 0
-  deadlocks = 0
-  errors = 0
-
-  realTime = []
-  voluntarySwitches = []
-  goodRuns = []  # True || False
-
+  def __init__(self, context=None):
+    self.successes = 0
+    self.timeouts = 0
+    self.dataraces = 0
+    self.deadlocks = 0
+    self.errors = 0
 
-  def begin_testing(self, functional, exitOnFail = False, runs=config._CONTEST_RUNS):
-    """Begins the testing phase by creating the test processes."""
+    self.realTime = []
+    self.voluntarySwitches = []
+    self.goodRuns = []  # True || False
+    # Resource usage of each successful non-functional run, see make_sample
+    self.runSamples = []
+
+    # Members evaluated concurrently, or built in place, are tested in their
+    # own copy of the project. context points the classpath at that copy
+    if context is None:
+      context = ProjectContext()
+    self.projectDir = context.projectDir
+    self.classpath = context.classpath
+
+
+  def begin_testing(self, functional, exitOnFail = False, runs=config._CONTEST_RUNS,
+    stopRule=None, workers=None, measure=True):
+    """Begins the testing phase by creating the test processes.
+
+    Up to workers (config._CONTEST_PARALLEL_RUNS if None) test processes are
+    kept running at once. Non-functional runs, which measure performance, are
+    always run one at a time. With measure=False, non-functional runs only
+    check that the testsuite passes, so they can be run in parallel too. When more than one is used, each worker runs its JVM from its own
+    directory (<workarea>/contest_runs/<worker>/) so that the ConTest output in
+    com_ibm_contest/ isn't shared between concurrent runs.
+
+    stopRule (see sequential.py), if given, is called with the number of
+    successes and completed runs after each run. No new runs are started once
+    it returns True. len(self.goodRuns) is the number of runs completed.
+
+    With exitOnFail, the first failed run kills the runs still in progress.
+    They aren't counted.
+    """
 
-    global _OS
+    if workers is None:
+      workers = config._CONTEST_PARALLEL_RUNS
+    workers = max(1, min(workers, runs))
+
+    # Runs competing for the CPU would distort the times and context switches
+    # being measured
+    if not functional and measure:
+      workers = 1
+
+    # The harness runs the testsuite inside one JVM, one run at a time.
+    # ConTest only writes the shared variables it found (sharedVars.txt) when
+    # its JVM exits, so the testsuite is run in a JVM per run until it has
+    useHarness = functional and config._CONTEST_USE_HARNESS and \
+      static.load_contest_list()
+    if useHarness:
+      workers = 1
+
+    if workers == 1:
+      runDirs = [self.projectDir]
+    else:
+      runDirs = [os.path.join(self.projectDir, 'contest_runs', str(worker))
+                 for worker in xrange(workers)]
 
     # Delete old ConTest longs.  Thousands can accumulate if this isn't done regularly
-    conTestLogDir = os.path.join(config._PROJECT_DIR, 'com_ibm_contest', 'instLogs')
-    if os.path.exists(conTestLogDir):
-      shutil.rmtree(conTestLogDir)
-      os.makedirs(conTestLogDir)
-
-    logger.debug("Performing {} Test Runs...".format(runs))
-    # Sometimes a situation occurs where there are 149 successes in 150 test
-    # runs. One test vanishes so the program is still marked incorrect, when
-    # it is actually correct.
-    i = 0
-    while self.errors + self.successes + self.dataraces + self.deadlocks \
-      + self.timeouts < runs:
-      i += 1
-
-      # To ensure stdout doesn't overflow because .poll() can deadlock
-      outFile = tempfile.SpooledTemporaryFile()
-      errFile = tempfile.SpooledTemporaryFile()
-
-      # Start a test process
-      if functional:
-        process = subprocess.Popen(['java', '-Xmx{}m'.format(config._PROJECT_TEST_MB),
-          '-XX:-UseSplitVerifier', '-cp', config._PROJECT_CLASSPATH + ":" +
-          config._JUNIT_JAR, '-javaagent:' + config._CONTEST_JAR,
-          '-Dcontest.verbose=0',  'org.junit.runner.JUnitCore',
-          config._PROJECT_TESTSUITE], stdout=outFile, stderr=errFile,
-          cwd=config._PROJECT_DIR, shell=False)
-      else:
-        # MAC uses a different time argument then Linux
-        # http://developer.apple.com/library/mac/#documentation/Darwin/Reference/ManPages/man1/time.1.html
-        #if config._OS is 'MAC':
-        if _OS is 'MAC':
-          timeArg = '-lp' # BSD-style
-        else:
-          timeArg = '-v'  # Linux-style
-
-        process = subprocess.Popen(['/usr/bin/time', timeArg, 'java',
-          '-XX:-UseSplitVerifier', '-Xmx{}m'.format(config._PROJECT_TEST_MB),
-          '-cp', config._PROJECT_CLASSPATH + ":" + config._JUNIT_JAR,
-          'org.junit.runner.JUnitCore', config._PROJECT_TESTSUITE],
-          stdout=outFile, stderr=errFile, cwd=config._PROJECT_DIR, shell=False)
-
-      success = self.run_test(process, outFile, errFile, i, functional)
-
-      # If last run was unsuccessful and we are verifying functionality
-      if len(self.goodRuns) > 0:
-        if exitOnFail and not self.goodRuns[-1]:
-          logger.debug("Verification testing: A bug exists in the program")
-          return False
+    for runDir in runDirs:
+      conTestLogDir = os.path.join(runDir, 'com_ibm_contest', 'instLogs')
+      if os.path.exists(conTestLogDir):
+        shutil.rmtree(conTestLogDir)
+        os.makedirs(conTestLogDir)
+      elif not os.path.exists(runDir):
+        os.makedirs(runDir)
+
+    logger.debug("Performing {} Test Runs ({} at a time, {:.1f}s timeout)...".format(
+      runs, workers, timeout.get_timeout(functional, workers, useHarness)))
+
+    # A single supervisor keeps up to workers test processes running and
+    # wakes up as soon as one of them finishes or times out
+    supervisor = Supervisor()
+    freeRunDirs = runDirs[:]
+    runsStarted = 0
+    stopTesting = False
+    stoppedByRule = False
+
+    while useHarness and not stopTesting and len(self.goodRuns) < runs:
+      i = len(self.goodRuns) + 1
+      goodRun = self.record_harness_run(harness.get_harness(self.projectDir,
+                  self.classpath), i, functional)
+
+      # If this run was unsuccessful and we are verifying functionality
+      if exitOnFail and not goodRun:
+        stopTesting = True
+
+      # Is the result of the testing clear enough to stop now?
+      if stopRule is not None and stopRule(self.successes, len(self.goodRuns)):
+        stopTesting = True
+        stoppedByRule = True
+
+    while not useHarness:
+      while not stopTesting and runsStarted < runs and len(freeRunDirs) > 0:
+        runsStarted += 1
+        runDir = freeRunDirs.pop(0)
+        # Measured runs aren't watched. The thread dumps of the watchdog
+        # would disturb the times and context switches being measured
+        supervisor.start(self.test_command(functional), runDir,
+          timeout.get_timeout(functional, workers), (runsStarted, runDir),
+          functional or not measure)
+
+      if supervisor.running() == 0:
+        break
+
+      for child in supervisor.wait_any():
+        i, runDir = child.tag
+        freeRunDirs.append(runDir)
+        goodRun = self.record_run(child, i, functional, workers, measure)
+
+        if runDir != config._PROJECT_DIR:
+          collect_shared_vars(runDir)
+
+        # If this run was unsuccessful and we are verifying functionality
+        if exitOnFail and not goodRun:
+          stopTesting = True
+
+        # Is the result of the testing clear enough to stop now?
+        if stopRule is not None and not stopTesting and \
+          stopRule(self.successes, len(self.goodRuns)):
+          stopTesting = True
+          stoppedByRule = True
+
+      # A bug was found, so the result of the runs still in progress doesn't
+      # matter. Don't wait for them
+      if exitOnFail and False in self.goodRuns and supervisor.running() > 0:
+        logger.debug("Verification testing: Cancelling {} runs in progress".format(
+          supervisor.running()))
+        supervisor.kill_all()
+        break
+
+    # If a run was unsuccessful and we are verifying functionality
+    if exitOnFail and False in self.goodRuns:
+      logger.debug("Verification testing: A bug exists in the program")
+      return False
+
+    if len(self.goodRuns) < runs:
+      logger.debug("Stopped early after {} of {} runs".format(len(self.goodRuns), runs))
 
     logger.debug("Test Runs Results...")
     logger.debug("Successes: {}".format(self.successes))
@@ -115,20 +197,49 @@ class Tester():
     logger.debug("Errors: {}".format(self.errors))
     logger.debug("Real Time: {}".format(self.realTime))
     logger.debug("Voluntary Switches: {}".format(self.voluntarySwitches))
+    if len(self.runSamples) > 0:
+      logger.debug("Peak RSS (KB): {}".format([sample['maxrss']
+        for sample in self.runSamples]))
     logger.debug("Good Runs: {}".format(self.goodRuns))
 
+    # When the stop rule ended the testing, all of the runs that were done
+    # have to be successful
+    if stoppedByRule:
+      runs = len(self.goodRuns)
+
     if self.successes == runs:
       return True
     else:
       return False
 
 
-  def run_test(self, process, outFile, errFile, i, functional):
-    """Runs a single test process.
+  def test_command(self, functional):
+    """Command line of a test process.
+
+    Args:
+      functional (bool): testing functionality (ConTest) or performance
+    Returns:
+      list string: arguments for Popen
+    """
+
+    if functional:
+      return ['java', '-Xmx{}m'.format(config._PROJECT_TEST_MB),
+        '-XX:-UseSplitVerifier', '-cp', self.classpath + ":" +
+        config._JUNIT_JAR, '-javaagent:' + config._CONTEST_JAR,
+        '-Dcontest.verbose=0',  'org.junit.runner.JUnitCore',
+        config._PROJECT_TESTSUITE]
+
+    # Performance is measured without ConTest. The resource usage comes from
+    # the supervisor reaping the JVM (os.wait4)
+    return ['java', '-XX:-UseSplitVerifier', '-Xmx{}m'.format(config._PROJECT_TEST_MB),
+      '-cp', self.classpath + ":" + config._JUNIT_JAR,
+      'org.junit.runner.JUnitCore', config._PROJECT_TESTSUITE]
 
-    The test process is run with a timeout mechanism in place to determine if
-    the process is timing out or just deadlocked. The results of a test is
-    either:
+
+  def record_run(self, child, i, functional, workers=1, measure=True):
+    """Records the result of a finished test process.
+
+    The results of a test is either:
      * Success - the testsuite had no errors
      * Timeout - the testsuite  didn't finished in time
      * Datarace - the testsuite had at least one failing test case
@@ -136,137 +247,179 @@ class Tester():
      * Error - the testsuite didn't run correctly
 
     Args:
-      process (Popen): testsuite execution process
-      outFile (SpooledTemporaryFile): temporary file to hold stdout output
-      errFile (SpooledTemporaryFile): temporary file to hold stderr output
+      child (Child): finished test process, see supervisor.py
       i (int): current test execution number
+      functional (bool): testing functionality (ConTest) or performance
+      workers (int): number of test runs run at the same time
+      measure (bool): keep the resource usage of non-functional runs
+    Returns:
+      bool: was the run a good (successful) one
     """
 
-    # Set a timeout for the running process
-    remainingTime = config._CONTEST_TIMEOUT_SEC
-    while process.poll() is None and remainingTime > 0:
-      time.sleep(0.1)
-      remainingTime -= 0.1
-
-      # If the process did not finish in time
-      if process.poll() is None and remainingTime <= 0:
-
-        # Send the Quit signal to get thread dump information from JVM
-        process.send_signal(3)
-
-        # Sleep for a second to let std finish, then send terminate command
-        time.sleep(1)
-        process.terminate()
-
-        # Acquire the stdout information
-        outFile.seek(0)
-        errFile.seek(0)
-        output = outFile.read()
-        error = errFile.read()
-        outFile.close()
-        errFile.close()
-
-        # Check if there is any deadlock using "Java-level deadlock:"
-        if (output.find(b"Java-level deadlock:") >= 0):
-          logger.info("Test {} - Deadlock Encountered (Java-level deadlock)(Process didn't finish in time)".format(i))
-          self.deadlocks += 1
-        else:
-          if functional:
-            logger.info("Test {} - Timeout Encountered (Process didn't finish in time)".format(i))
-            self.timeouts += 1
-          else:
-            # If on non-functional, we cannot tell when deadlock thus assume it
-            logger.info("Test {} - Deadlock/Timeout Encountered (Process didn't finish in time)".format(i))
-            self.deadlocks += 1
-        self.goodRuns.append(False)
-
-      # If the process finished in time
-      elif process.poll() is not None:
-
-        # Acquire the stdout information
-        outFile.seek(0)
-        errFile.seek(0)
-        output = outFile.read()
-        error = errFile.read()
-        outFile.close()
-        errFile.close()
-
-
-        #logger.debug("==== Tester, Output text:\n")
-        #logger.debug(output)
-        #logger.debug("==== Tester, Error text:\n")
-        #logger.debug(error)
-
-        # Acquire the number of faults (accoring to ant test)
-        numTests = 0
-        numFailures = 0
-        numSuccesses = 0
-
-        stmtOne = re.search("Tests run: (\d+),\s+Failures: (\d+)", output)
-        if stmtOne is not None:
-          numTests = stmtOne.group(1)
-          numFailures = stmtOne.group(2)
-
-        stmtTwo = re.search("OK \((\d+) test", output)
-        if stmtTwo is not None:
-          numSuccesses = stmtTwo.group(1)
-
-        # Some tests have failed
-        if numTests > 0 and numFailures > 0:
-          totalFaults = numFailures
-          logger.info("Test {} - Datarace Encountered ({} errors)".format(i,
-                                                                  totalFaults))
-          self.dataraces += 1
-          self.goodRuns.append(False)
-
-        # Tests have no faults and no successes
-        elif numTests is 0 and numSuccesses is 0:
-          logger.info("Test {} - Deadlock Encountered".format(i))
-          self.deadlocks += 1
-          self.goodRuns.append(False)
-
-        # Tests have successes
-        elif numSuccesses > 0 or (numTests > 0 and numFailures is 0):
-          if numTests > 0:
-            totalSuccesses = numTests
-          else:
-            totalSuccesses = numSuccesses
-
-          # No tests were run, thus some error occurred
-          if totalSuccesses is 0:
-            logger.info("Test {} - Error, no tests ran".format(i))
-            self.errors += 1
-            self.goodRuns.append(False)
-
-          # Successful tests were encounted
-          else:
-            logger.info("Test {} - Successful Execution".format(i))
-            self.successes += 1
-            self.goodRuns.append(True)
-
-            if not functional:
-              if _OS is 'MAC':
-              #if config._OS is 'MAC':
-                userTime = re.search("user \s+ (\d+\.\d+)", error).groups()[0]
-                systemTime = re.search("sys \s+ (\d+\.\d+)", error).groups()[0]
-                voluntarySwitches = re.search("(\d+)\s+ voluntary context switches", error).groups()[0]
-              else: # Linux
-                userTime = re.search("User time \(seconds\): (\d+\.\d+)", error).groups()[0]
-                systemTime = re.search("System time \(seconds\): (\d+\.\d+)", error).groups()[0]
-                voluntarySwitches = re.search("Voluntary context switches: (\d+)", error).groups()[0]
-
-              self.realTime.append(float(userTime) + float(systemTime))
-              self.voluntarySwitches.append(float(voluntarySwitches))
-        else:
-          logger.error("Test {} - Something unexpected has happened. We haven't been")
-          logger.error("able to determine what happened for this test.")
-          logger.error("marking this test as successful and moving on.")
-          self.successes += 1
-          self.goodRuns.append(True)
+    if child.deadlockDetected:
+      logger.debug("Test {} - Watchdog found a deadlock after {:.1f}s".format(i,
+        child.endTime - child.startTime))
+
+    if child.timedOut:
+      goodRun = self.record_timeout(child.output, i, functional,
+                  child.endTime - child.startTime, workers)
+    else:
+      timeout.record_duration(functional, child.endTime - child.startTime,
+        workers)
+      sample = None
+      if measure:
+        sample = make_sample(child)
+      goodRun = self.record_finished(child.output, child.error, i, functional,
+                  sample)
+    self.goodRuns.append(goodRun)
+
     # If ConTest hasn't given us a list of (class.variable) involved in concurrency
     # yet, we keep looking for it.
     static.load_contest_list()
 
+    return goodRun
+
+
+  def record_harness_run(self, testHarness, i, functional):
+    """Runs the testsuite once in the persistent harness (see harness.py) and
+    records the result like record_run does for a test process.
+
+    Args:
+      testHarness (Harness): harness of the workarea
+      i (int): current test execution number
+      functional (bool): testing functionality (ConTest) or performance
+    Returns:
+      bool: was the run a good (successful) one
+    """
+
+    # Starting the JVM isn't part of the run
+    testHarness.start_once()
+
+    startTime = time.time()
+    runTimeout = timeout.get_timeout(functional, 1, True)
+    status, text = testHarness.run_testsuite(runTimeout)
+
+    if status == "TIMEOUT":
+      goodRun = self.record_timeout(text, i, functional, runTimeout, 1, True)
+    elif status == "FINISHED":
+      timeout.record_duration(functional, time.time() - startTime, 1, True)
+      goodRun = self.record_finished(text, "", i, functional)
+    else:
+      logger.info("Test {} - Error, the harness couldn't run the tests".format(i))
+      logger.debug(text)
+      self.errors += 1
+      goodRun = False
+    self.goodRuns.append(goodRun)
+
+    static.load_contest_list()
+
+    return goodRun
+
+
+  def record_timeout(self, output, i, functional, duration, workers=1,
+    useHarness=False):
+    """Classifies a test process that didn't finish in time. A run that
+    didn't deadlock was only slow, so its timeout is added to the run times
+    the timeout is based on (see timeout.py).
+
+    Args:
+      duration (float): seconds the run had taken when it was timed out
+      workers (int): number of test runs run at the same time
+      useHarness (bool): the run was done in the test harness
+    Returns:
+      bool: always False, a timed out run is never a good run
+    """
+
+    # Check if there is any deadlock using "Java-level deadlock:"
+    if (output.find(b"Java-level deadlock:") >= 0):
+      logger.info("Test {} - Deadlock Encountered (Java-level deadlock)(Process didn't finish in time)".format(i))
+      self.deadlocks += 1
+    else:
+      if functional:
+        logger.info("Test {} - Timeout Encountered (Process didn't finish in time)".format(i))
+        self.timeouts += 1
+      else:
+        # If on non-functional, we cannot tell when deadlock thus assume it
+        logger.info("Test {} - Deadlock/Timeout Encountered (Process didn't finish in time)".format(i))
+        self.deadlocks += 1
+      timeout.record_timeout(functional, duration, workers, useHarness)
+    return False
+
+
+  def record_finished(self, output, error, i, functional, sample=None):
+    """Classifies a test process that finished in time using the JUnit
+    summary it printed.
+
+    Args:
+      sample (dict): resource usage of the run (see make_sample), recorded
+        for successful non-functional runs
+    Returns:
+      bool: was the run a good (successful) one
+    """
+
+    #logger.debug("==== Tester, Output text:\n")
+    #logger.debug(output)
+    #logger.debug("==== Tester, Error text:\n")
+    #logger.debug(error)
+
+    # Acquire the number of faults (accoring to ant test)
+    numTests = 0
+    numFailures = 0
+    numSuccesses = 0
+
+    stmtOne = re.search("Tests run: (\d+),\s+Failures: (\d+)", output)
+    if stmtOne is not None:
+      numTests = stmtOne.group(1)
+      numFailures = stmtOne.group(2)
+
+    stmtTwo = re.search("OK \((\d+) test", output)
+    if stmtTwo is not None:
+      numSuccesses = stmtTwo.group(1)
+
+    # Some tests have failed
+    if numTests > 0 and numFailures > 0:
+      totalFaults = numFailures
+      logger.info("Test {} - Datarace Encountered ({} errors)".format(i,
+                                                              totalFaults))
+      self.dataraces += 1
+      return False
+
+    # Tests have no faults and no successes
+    elif numTests is 0 and numSuccesses is 0:
+      logger.info("Test {} - Deadlock Encountered".format(i))
+      self.deadlocks += 1
+      return False
+
+    # Tests have successes
+    elif numSuccesses > 0 or (numTests > 0 and numFailures is 0):
+      if numTests > 0:
+        totalSuccesses = numTests
+      else:
+        totalSuccesses = numSuccesses
+
+      # No tests were run, thus some error occurred
+      if totalSuccesses is 0:
+        logger.info("Test {} - Error, no tests ran".format(i))
+        self.errors += 1
+        return False
+
+      # Successful tests were encounted
+      logger.info("Test {} - Successful Execution".format(i))
+      self.successes += 1
+
+      if not functional and sample is not None:
+        self.runSamples.append(sample)
+        self.realTime.append(sample['user'] + sample['sys'])
+        self.voluntarySwitches.append(float(sample['nvcsw']))
+      return True
+
+    else:
+      logger.error("Test {} - Something unexpected has happened. We haven't been")
+      logger.error("able to determine what happened for this test.")
+      logger.error("marking this test as successful and moving on.")
+      self.successes += 1
+      return True
+
   def clear_results(self):
     """Clears the results of the test runs thus far."""
 
@@ -277,4 +430,53 @@ class Tester():
     self.errors = 0
     del self.realTime [:]
     del self.voluntarySwitches [:]
+    del self.runSamples [:]
     del self.goodRuns [:]
+
+
+def collect_shared_vars(runDir):
+  """ConTest writes the shared variables it finds to com_ibm_contest/ in the
+  directory the test was run from. When a test was run from one of the
+  per-worker directories, copy the file to config._SHARED_VARS_FILE where
+  static.load_contest_list() looks for it.
+
+  Args:
+    runDir (string): working directory of the finished test process
+  """
+
+  if os.path.exists(config._SHARED_VARS_FILE):
+    return
+
+  runVarsFile = os.path.join(runDir, 'com_ibm_contest', 'sharedVars.txt')
+  if not os.path.exists(runVarsFile) or os.path.getsize(runVarsFile) == 0:
+    return
+
+  sharedDir = os.path.dirname(config._SHARED_VARS_FILE)
+  if not os.path.exists(sharedDir):
+    os.makedirs(sharedDir)
+  shutil.copy(runVarsFile, config._SHARED_VARS_FILE)
+
+
+def make_sample(child):
+  """Resource usage of a finished test process.
+
+  Args:
+    child (Child): reaped test process, see supervisor.py
+  Returns:
+    dict: wall, user and sys time (s), maxrss (peak memory, KB), nvcsw and
+      nivcsw (voluntary and involuntary context switches)
+  """
+
+  if child.rusage is None:
+    return None
+
+  maxrss = child.rusage.ru_maxrss
+  if sys.platform == 'darwin':
+    maxrss //= 1024  # Bytes on the mac, KB on Linux
+
+  return {'wall': child.endTime - child.startTime,
+          'user': child.rusage.ru_utime,
+          'sys': child.rusage.ru_stime,
+          'maxrss': maxrss,
+          'nvcsw': child.rusage.ru_nvcsw,
+          'nivcsw': child.rusage.ru_nivcsw}
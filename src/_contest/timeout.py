@@ -0,0 +1,125 @@
+"""This module decides how long a test run may take before it is timed out.
+
+A fixed timeout has to be large enough for the slowest normal run, so every
+hung or deadlocked mutant wastes that much time. Instead, the run times of
+the test runs that finish are kept, and the timeout is a high quantile of the
+recent run times plus a safety margin. Until enough runs have finished,
+config._CONTEST_TIMEOUT_SEC (set from the practice runs in core.py) is used.
+
+A run that times out without a deadlock was only slower than its timeout. Its
+timeout is recorded as its run time (a censored observation, the real run
+time is at least that long), so the timeout can grow back when the runs get
+slower instead of only ever shrinking. It never grows past
+config._CONTEST_TIMEOUT_SEC.
+
+Functional (ConTest) and non-functional runs take different amounts of time,
+and so do runs sharing the CPU with other test runs and runs in the test
+harness (see harness.py). Each of them has its own model.
+
+Copyright David Kelk, 2013
+"""
+
+from __future__ import division
+import math
+import threading
+from collections import deque
+import sys
+sys.path.append("..")  # To allow importing parent directory module
+import config
+
+import logging
+logger = logging.getLogger('output-log')
+
+
+class TimeoutModel():
+  """Distribution of the run times of the last config._CONTEST_TIMEOUT_WINDOW
+  test runs that finished.
+
+  Attributes:
+    durations (deque float): run times in seconds, oldest first
+  """
+
+  def __init__(self):
+    self.durations = deque(maxlen=config._CONTEST_TIMEOUT_WINDOW)
+    # Members can be tested concurrently (config._EVOLUTION_PARALLEL_MEMBERS)
+    self.lock = threading.Lock()
+
+  def add(self, duration):
+    """Record the run time of a test run that finished in time, or the
+    timeout of a run that didn't."""
+
+    with self.lock:
+      self.durations.append(duration)
+
+  def timeout(self):
+    """Current timeout in seconds."""
+
+    with self.lock:
+      durations = sorted(self.durations)
+
+    if not config._CONTEST_ADAPTIVE_TIMEOUT or \
+      len(durations) < config._CONTEST_TIMEOUT_MIN_SAMPLES:
+      return config._CONTEST_TIMEOUT_SEC
+
+    index = int(math.ceil(config._CONTEST_TIMEOUT_QUANTILE * len(durations))) - 1
+    quantile = durations[min(max(index, 0), len(durations) - 1)]
+    return min(config._CONTEST_TIMEOUT_SEC,
+               max(config._CONTEST_TIMEOUT_MIN_SEC,
+                   quantile * (1 + config._CONTEST_TIMEOUT_MARGIN)))
+
+
+# (functional, workers, useHarness) -> TimeoutModel
+_models = {}
+_modelsLock = threading.Lock()
+
+
+def get_model(functional, workers, useHarness):
+  """The model of the test runs of a kind, created the first time it is
+  needed."""
+
+  key = (functional, workers, useHarness)
+  with _modelsLock:
+    if key not in _models:
+      _models[key] = TimeoutModel()
+    return _models[key]
+
+
+def get_timeout(functional, workers=1, useHarness=False):
+  """Timeout to use for the next test run.
+
+  Args:
+    functional (bool): testing functionality (ConTest) or performance
+    workers (int): number of test runs run at the same time
+    useHarness (bool): the run is done in the test harness
+  Returns:
+    float: seconds
+  """
+
+  return get_model(functional, workers, useHarness).timeout()
+
+
+def record_duration(functional, duration, workers=1, useHarness=False):
+  """Add the run time of a test run that finished in time to the model.
+
+  Args:
+    functional (bool): testing functionality (ConTest) or performance
+    duration (float): seconds the run took
+    workers (int): number of test runs run at the same time
+    useHarness (bool): the run was done in the test harness
+  """
+
+  get_model(functional, workers, useHarness).add(duration)
+
+
+def record_timeout(functional, duration, workers=1, useHarness=False):
+  """Add a test run that was timed out, but didn't deadlock, to the model. It
+  would have taken at least duration seconds.
+
+  Args:
+    functional (bool): testing functionality (ConTest) or performance
+    duration (float): seconds the run had taken when it was timed out
+    workers (int): number of test runs run at the same time
+    useHarness (bool): the run was done in the test harness
+  """
+
+  get_model(functional, workers, useHarness).add(duration)
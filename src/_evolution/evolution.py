@@ -16,12 +16,21 @@ from collections import Counter
 sys.path.append("..")  # To allow importing parent directory module
 import config
 from _contest import tester
+from _contest import sequential
+from _contest import harness
 from _txl import txl_operator
+from _txl import compile_cache
+from _txl import mutant_cache
+from _txl import blobstore
+from _txl.project_context import ProjectContext
 import hashlist
 import static
+import scheduler
+import reclaimer
+import threading
 from py4j.java_gateway import JavaGateway
 from _jpf import run_jpf
-from send2trash import send2trash
+from _javac import run_javac
 import logging
 
 
@@ -46,6 +55,10 @@ _functionalPhase = True
 # Are we still using JPF in the evalutation
 _useJPF = True
 
+# Members can be evaluated concurrently (config._EVOLUTION_PARALLEL_MEMBERS),
+# so checking and adding to the hash list is done while holding this lock
+_hashLock = threading.Lock()
+
 def initialize(bestIndividual=None):
   """Initialize the population of individuals for either the functional or
   Optimization phases of the fixing process.  This function is called at
@@ -135,13 +148,17 @@ def start():
         # the fixed, unoptimized program
         txl_operator.move_local_project_to_workarea(bestFunctional.generation,
                                                     bestFunctional.id)
-        txl_operator.compile_project()
+        context = txl_operator.get_context(bestFunctional.generation,
+                                           bestFunctional.id)
+        txl_operator.compile_project(context)
         logger.debug("Acquiring Non-Functional worst score")
-        contest = tester.Tester()
+        contest = tester.Tester(context)
+        stopRule = None
+        if config._MEASUREMENT_ADAPTIVE:
+          stopRule = sequential.MeasurementRule(contest, None, None)
         contest.begin_testing(False, False, config._CONTEST_RUNS *
-          config._CONTEST_VALIDATION_MULTIPLIER)  # Measure performance
-        worstScore = get_average_non_functional_score(contest, bestFunctional,
-          config._CONTEST_RUNS * config._CONTEST_VALIDATION_MULTIPLIER)
+          config._CONTEST_VALIDATION_MULTIPLIER, stopRule)  # Measure performance
+        worstScore = get_average_non_functional_score(contest, bestFunctional)
 
         # Evolve the population to find the best non-functional individual
         logger.info("******************************")
@@ -213,6 +230,16 @@ def start():
     logger.error("evolution.start: Unexpected error:\n", \
       traceback.print_exc(file=sys.stdout))
   finally:
+    # Stop the test harness JVMs and the compile server, if they were used
+    harness.shutdown_harnesses()
+    run_javac.shutdown_compile_server()
+    if config._COMPILE_CACHE:
+      compile_cache.log_statistics()
+    if config._MUTANT_CACHE:
+      mutant_cache.log_statistics()
+    if config._PROJECT_SNAPSHOT == 'blobstore':
+      blobstore.log_statistics()
+
     # Save the final results of the static analysis to file.  See
     # static.write_static_to_db for details.
     if len(static._classVar) > 0 or len(static._classMeth) > 0 \
@@ -226,7 +253,10 @@ def start():
       for mem in xrange(1, config._EVOLUTION_POPULATION+1):
         sourceDir = os.path.join(config._TMP_DIR, str(gen), str(mem), "source")
         if os.path.isdir(sourceDir):
-          send2trash(sourceDir)
+          reclaimer.reclaim(sourceDir)
+        if txl_operator.has_own_workarea(gen, mem):
+          reclaimer.reclaim(txl_operator.get_workarea(gen, mem))
+    reclaimer.shutdown_reclaimer()
 
 
 def evolve(generation=0, worstScore=0):
@@ -270,8 +300,14 @@ def evolve(generation=0, worstScore=0):
     highestID = -1
     runningSum = 0
 
-    for individual in _population:
-      individual.generation = generation
+    # Members are mutated and evaluated config._EVOLUTION_PARALLEL_MEMBERS
+    # at a time. The results are then looked at one member after another, in
+    # the same order as when the members are handled one at a time
+    workers = max(1, config._EVOLUTION_PARALLEL_MEMBERS)
+    for chunkStart in xrange(0, len(_population), workers):
+      chunk = _population[chunkStart:chunkStart + workers]
+      for individual in chunk:
+        individual.generation = generation
 
       # Mutate an individual, then evaluate it right away
       # There are two circumstances under which false is returned:
@@ -279,45 +315,45 @@ def evolve(generation=0, worstScore=0):
       # - No compilable project is generated for a member during the fixing phase
       # (If no mutants are found for a program during the fixing phase, an
       #  exception is raised in mutation.)
-      mutationSuccess = mutation(individual, deadlockVotes, dataraceVotes,
-                                 OptimizationVotes)
-
-      if mutationSuccess:
-        moreMutations = True
-        evaluate(individual, generation)
-        individual.wasRestarted.append(False)
-        individual.wasReplaced.append(False)
-        runningSum += individual.score[-1]
-        if individual.score[-1] >= highestSoFar:
-          highestSoFar = individual.score[-1]
-          highestID = individual.id
-
-        # Check to see if we can end the evolution process
-        terminating, bestIndividual = terminate(individual, generation, generationLimit)
-        if terminating:
-          # We can, but the evolution process failed (eg, No fix found in phase 1)
-          if bestIndividual is None:
-            return get_best_individual()
-          else:
-            return bestIndividual, generation
-
-      # No mutants were generate for a member of the population during the
-      # Optimization phase, so we return the best individual found so far
-      # TODO: I've forgotten the reason for this decision. We stop if only
-      #       one member of the population doesn't have mutants.  Is that
-      #       wise?
-      elif not mutationSuccess and not _functionalPhase:
-        logger.debug("No mutants were generated by member {} at generation {}.".format(individual.id, generation))
-        logger.debug("Returning the best individual found so far.")
-        return get_best_individual()
-
-      # We can remove mutants for generation n-2. (We must keep generation n-1
-      # for the restart case.) We do this as the mutants can take up a lot of
-      # space.
-      if individual.generation > 2:
-        logger.debug("Cleaning up mutants for generation {} member {}."
-          .format(individual.generation - 2, individual.id))
-        txl_operator.clean_up_mutants(individual.generation - 2, individual.id)
+      mutationResults = scheduler.run_members(chunk, workers, mutate_and_evaluate,
+        generation, deadlockVotes, dataraceVotes, OptimizationVotes)
+
+      for individual, mutationSuccess in zip(chunk, mutationResults):
+        if mutationSuccess:
+          moreMutations = True
+          individual.wasRestarted.append(False)
+          individual.wasReplaced.append(False)
+          runningSum += individual.score[-1]
+          if individual.score[-1] >= highestSoFar:
+            highestSoFar = individual.score[-1]
+            highestID = individual.id
+
+          # Check to see if we can end the evolution process
+          terminating, bestIndividual = terminate(individual, generation, generationLimit)
+          if terminating:
+            # We can, but the evolution process failed (eg, No fix found in phase 1)
+            if bestIndividual is None:
+              return get_best_individual()
+            else:
+              return bestIndividual, generation
+
+        # No mutants were generate for a member of the population during the
+        # Optimization phase, so we return the best individual found so far
+        # TODO: I've forgotten the reason for this decision. We stop if only
+        #       one member of the population doesn't have mutants.  Is that
+        #       wise?
+        elif not mutationSuccess and not _functionalPhase:
+          logger.debug("No mutants were generated by member {} at generation {}.".format(individual.id, generation))
+          logger.debug("Returning the best individual found so far.")
+          return get_best_individual()
+
+        # We can remove mutants for generation n-2. (We must keep generation n-1
+        # for the restart case.) We do this as the mutants can take up a lot of
+        # space.
+        if individual.generation > 2:
+          logger.debug("Cleaning up mutants for generation {} member {}."
+            .format(individual.generation - 2, individual.id))
+          txl_operator.clean_up_mutants(individual.generation - 2, individual.id)
 
     averageFitness.append(runningSum / config._EVOLUTION_POPULATION)
     bestFitness.append((highestSoFar, highestID))
@@ -367,6 +403,30 @@ def evolve(generation=0, worstScore=0):
       deadlockVotes, dataraceVotes, OptimizationVotes = adjust_operator_weighting(generation)
 
 
+def mutate_and_evaluate(individual, generation, deadlockVotes, dataraceVotes,
+  OptimizationVotes):
+  """Mutate an individual and, if a mutated project was created, evaluate it.
+  This is the work done for one member of the population. Several members
+  can be in here at once (see scheduler.run_members).
+
+  Attributes:
+    individual (Individual): Who we are mutating and scoring
+    generation (int): Current generation
+    deadlockVotes, dataraceVotes, OptimizationVotes:
+      Votes by operator type, eg: ({'ASAT': 1}) See the operator_weighting fn
+
+  Returns:
+    boolean: Return value of mutation()
+  """
+
+  mutationSuccess = mutation(individual, deadlockVotes, dataraceVotes,
+                             OptimizationVotes)
+  if mutationSuccess:
+    evaluate(individual, generation)
+
+  return mutationSuccess
+
+
 def mutation(individual, deadlockVotes, dataraceVotes, OptimizationVotes):
   """A mutator for the individual using single mutation with feedback.
 
@@ -420,25 +480,92 @@ def mutation(individual, deadlockVotes, dataraceVotes, OptimizationVotes):
       raise Exception("mutation fn, Fixing phase: Pristine project has no mutants")
 
   # If we reach this point, there are mutations, thus totNumMutants > 0
+  candidates = draw_mutants(individual, mutationOperators, totNumMutants,
+                            deadlockVotes, dataraceVotes, OptimizationVotes)
+
+  if config._SPECULATIVE_COMPILES > 1:
+    compiledMutant = compile_speculatively(individual, candidates)
+  else:
+    compiledMutant = None
+    for candidate in candidates:
+      if compile_mutant(individual, candidate):
+        compiledMutant = candidate
+        break
+      # If the project didn't compile and we have retries left, go back to
+      # the start of the loop and try again
+
+  if compiledMutant is not None:
+    selectedOperator, operatorIndex, randomMutant = compiledMutant
+
+    # Update individual with the successful operator type
+    individual.lastOperator = selectedOperator
+    individual.appliedOperators.append(selectedOperator[0])
+
+    # Switch the appropriate bit to 1 to record which mutant is used
+    individual.genome[operatorIndex][randomMutant] = 1
+
+    #logger.debug("Selected operator for Individual {} at generation {}: {}, number {}".
+    #  format(individual.id, individual.generation, selectedOperator[0], randomMutant + 1))
+    return True
+
+  # If we weren't able to compile a mutant project, reset it to the pristine and leave
+  # it for this generation. We'll try again next generation to do something with it.
+  logger.debug("Couldn't create a compilable mutant project. Resetting to the pristine \
+                project (fixing phase) or best individual (optimization phase.)")
+  if _functionalPhase:
+    txl_operator.create_local_project(individual.generation, individual.id, True)
+  else:
+    txl_operator.create_local_project(individual.generation, individual.id,
+                                  True, individual.switchGeneration + 1)
+
+  # Update individual to reflect failed mutation
+  individual.lastOperator = None
+  individual.appliedOperators.append(None)
+
+  return False
+
+
+def draw_mutants(individual, mutationOperators, totNumMutants, deadlockVotes,
+  dataraceVotes, OptimizationVotes):
+  """Draw the untried mutants of an individual, one at a time, in the order
+  mutation should try them. Mutants excluded by the config (synchronizing
+  run, double locking) are skipped.
+
+  Attributes:
+    individual (Individual): Who we are mutating
+    mutationOperators (list): Operators in use, see GetMutationSet
+    totNumMutants (int): Number of mutants in the individual's genome
+    deadlockVotes, dataraceVotes, OptimizationVotes:
+      Votes by operator type, eg: ({'ASAT': 1}) See the operator_weighting fn
+
+  Yields:
+    (list, int, int): The selected operator, its index in the genome and the
+      index of the mutant in the operator's part of the genome
+  """
 
   # Hold attempted mutations, so we don't retry them
   # It is a set of sets by operator type
   # {{ASAT operators tried}, {ASIM operators tried}, ...}
   attemptedMutations = {}
 
-  # Initialize attemptedMutations hash for valid operators
+  # Initialize attemptedMutations hash for valid operators. Mutants known not
+  # to compile (see txl_operator.probe_mutants) count as already tried
+  totTriedMutants = 0
   operatorIndex = -1
   for mutationOp in mutationOperators:
     if mutationOp[1]:
       operatorIndex += 1
       attemptedMutations[operatorIndex] = set()
+      for mutant in xrange(len(individual.genome[operatorIndex])):
+        if not txl_operator.is_compilable(individual.generation, individual.id,
+          mutationOp[0], mutant + 1):
+          attemptedMutations[operatorIndex].add(mutant)
+          totTriedMutants += 1
 
   # Big while loop where we try all mutants in turn
   outerLoopCtr = 0
   innerLoopCtr = 0      # Doesn't need to be declared here, but is :)
-  totTriedMutants = 0
-  retry = True
-  while retry:
+  while True:
 
     # Make sure this loop doesn't go on forever. This is set quite high
     # to make sure an endless loop doesn't occur.
@@ -451,20 +578,18 @@ def mutation(individual, deadlockVotes, dataraceVotes, OptimizationVotes):
     #       would take 16.666 minutes.
     outerLoopCtr += 1
     if outerLoopCtr >= 1000:
-      retry = False
       logger.debug("No compilable project found.")
       logger.debug("Exiting outer loop after {} iterations".format(outerLoopCtr))
       logger.debug("  This probably occurred because the remaining mutations were not")
       logger.debug("  compatible with what is trying to be fixed.  For example, if")
       logger.debug("  we are trying to fix data races, we don't remove synchronized")
       logger.debug("  blocks, so synchronization removing mutations are ignored.")
-      break
+      return
 
     # Check if we have more mutants to try
     if totTriedMutants >= totNumMutants:
-      # If not we jump down to the end of this function to deal with it
-      retry = False
-      break
+      # If not we jump down to the end of mutation to deal with it
+      return
 
     selectedOperator = feedback_selection(individual, deadlockVotes, dataraceVotes,
                                           OptimizationVotes)
@@ -509,6 +634,11 @@ def mutation(individual, deadlockVotes, dataraceVotes, OptimizationVotes):
     # When we get here, we have selected a new mutant to try
     totTriedMutants += 1
 
+    # With config._LAZY_MUTANTS the mutant is only written now
+    if not txl_operator.realize_mutant(individual.generation, individual.id,
+      selectedOperator[0], randomMutant + 1):
+      continue
+
     # Now we check for reasons to exclude a mutant file:
 
     # 1. If we are excluding run as a synchronizable method, check the selected
@@ -525,47 +655,147 @@ def mutation(individual, deadlockVotes, dataraceVotes, OptimizationVotes):
       selectedOperator[0], randomMutant + 1):
       continue
 
-    # We wipe out the entire project and start again because we don't want
-    # the previous mutation
-    txl_operator.create_local_project(individual.generation, individual.id, False)
-    txl_operator.move_mutant_to_local_project(individual.generation, individual.id,
-                                              selectedOperator[0], randomMutant + 1)
-    txl_operator.move_local_project_to_workarea(individual.generation, individual.id)
-    #logger.debug("Attempting to compile...")
+    yield selectedOperator, operatorIndex, randomMutant
 
-    if txl_operator.compile_project():
-      #logger.debug("Success!")
 
-      # Update individual with the successful operator type
-      individual.lastOperator = selectedOperator
-      individual.appliedOperators.append(selectedOperator[0])
+def compile_mutant(individual, candidate):
+  """Move a mutant into the individual's project and compile it in the
+  individual's work area.
 
-      # Switch the appropriate bit to 1 to record which mutant is used
-      individual.genome[operatorIndex][randomMutant] = 1
+  Attributes:
+    individual (Individual): Who we are mutating
+    candidate (list, int, int): Mutant drawn by draw_mutants
 
-      #logger.debug("Selected operator for Individual {} at generation {}: {}, number {}".
-      #  format(individual.id, individual.generation, selectedOperator[0], randomMutant + 1))
-      return True
-    # If the project didn't compile and we have retries left, go back to the start of the
-    # while loop and try again
+  Returns:
+    boolean: Did the mutant compile?
+  """
 
-  # If we weren't able to compile a mutant project, reset it to the pristine and leave
-  # it for this generation. We'll try again next generation to do something with it.
-  logger.debug("Couldn't create a compilable mutant project. Resetting to the pristine \
-                project (fixing phase) or best individual (optimization phase.)")
-  if _functionalPhase:
-    txl_operator.create_local_project(individual.generation, individual.id, True)
-  else:
-    txl_operator.create_local_project(individual.generation, individual.id,
-                                  True, individual.switchGeneration + 1)
+  selectedOperator, operatorIndex, randomMutant = candidate
 
-  # Update individual to reflect failed mutation
-  individual.lastOperator = None
-  individual.appliedOperators.append(None)
+  # We wipe out the entire project and start again because we don't want
+  # the previous mutation
+  txl_operator.create_local_project(individual.generation, individual.id, False)
+  changedFile = txl_operator.move_mutant_to_local_project(individual.generation,
+                  individual.id, selectedOperator[0], randomMutant + 1)
+  txl_operator.move_local_project_to_workarea(individual.generation, individual.id)
+  #logger.debug("Attempting to compile...")
+
+  if txl_operator.compile_project(txl_operator.get_context(
+    individual.generation, individual.id), changedFile):
+    #logger.debug("Success!")
+    txl_operator.save_classes_to_local_project(individual.generation,
+                                               individual.id)
+    return True
 
   return False
 
 
+def compile_speculatively(individual, candidates):
+  """Compile up to config._SPECULATIVE_COMPILES candidate mutants at once,
+  each in its own sandbox. The first candidate (in the order they were drawn)
+  that compiles is chosen, as if they had been compiled one at a time.
+
+  A candidate is only drawn and started when a sandbox is free and no
+  candidate has been chosen yet. Once one is chosen, the later candidates
+  that are still being moved into their sandbox are cancelled. Those already
+  compiling run to the end, their result is ignored.
+
+  Attributes:
+    individual (Individual): Who we are mutating
+    candidates (generator): Mutants drawn by draw_mutants
+
+  Returns:
+    (list, int, int): The chosen candidate, now in the individual's project
+      and work area, or None if no candidate compiled
+  """
+
+  # The sandboxes are copies of the unmutated project
+  txl_operator.create_local_project(individual.generation, individual.id, False)
+
+  chosen = None
+  cancelled = threading.Event()
+  compiled = [False] * config._SPECULATIVE_COMPILES
+  freeSlots = range(config._SPECULATIVE_COMPILES)
+  # (candidate, slot, thread) of the candidates compiling, in the order drawn
+  running = []
+  moreCandidates = True
+
+  while True:
+    while chosen is None and moreCandidates and len(freeSlots) > 0:
+      candidate = next(candidates, None)
+      if candidate is None:
+        moreCandidates = False
+        break
+      slot = freeSlots.pop(0)
+      compiled[slot] = False
+      thread = threading.Thread(target=compile_in_sandbox, args=(individual,
+                 candidate, slot, cancelled, compiled))
+      thread.start()
+      running.append((candidate, slot, thread))
+
+    if len(running) == 0:
+      break
+
+    # The oldest candidate decides: if it compiled, none drawn after it can
+    # be chosen
+    candidate, slot, thread = running.pop(0)
+    thread.join()
+    if chosen is None and compiled[slot]:
+      chosen = (candidate, slot)
+      cancelled.set()
+    else:
+      freeSlots.append(slot)
+  # Every thread was joined above, nothing writes to the sandboxes any more
+
+  if chosen is None:
+    txl_operator.clean_up_sandboxes(individual.generation, individual.id)
+    return None
+
+  candidate, slot = chosen
+  selectedOperator, operatorIndex, randomMutant = candidate
+  txl_operator.move_mutant_to_local_project(individual.generation,
+    individual.id, selectedOperator[0], randomMutant + 1)
+  txl_operator.move_sandbox_to_workarea(individual.generation, individual.id,
+                                        slot)
+  txl_operator.save_classes_to_local_project(individual.generation,
+                                             individual.id)
+  txl_operator.clean_up_sandboxes(individual.generation, individual.id)
+
+  return candidate
+
+
+def compile_in_sandbox(individual, candidate, slot, cancelled, compiled):
+  """Thread body for compile_speculatively: compile one candidate mutant in
+  its sandbox.
+
+  Attributes:
+    individual (Individual): Who we are mutating
+    candidate (list, int, int): Mutant drawn by draw_mutants
+    slot (int): Sandbox to use
+    cancelled (Event): Set once an earlier candidate compiled
+    compiled (list boolean): compiled[slot] is set to True if the mutant
+      compiled
+  """
+
+  selectedOperator, operatorIndex, randomMutant = candidate
+
+  try:
+    if cancelled.is_set():
+      return
+    sandbox = txl_operator.create_sandbox(individual.generation, individual.id,
+                                          slot)
+    changedFile = txl_operator.move_mutant_to_local_project(individual.generation,
+                    individual.id, selectedOperator[0], randomMutant + 1, sandbox)
+
+    if cancelled.is_set():
+      return
+    compiled[slot] = txl_operator.compile_project(ProjectContext(sandbox),
+                                                  changedFile)
+  except:
+    logger.error("Compiling {} mutant {} in sandbox {} failed:\n{}".format(
+      selectedOperator[0], randomMutant + 1, slot, traceback.format_exc()))
+
+
 def feedback_selection(individual, deadlockVotes, dataraceVotes,
   OptimizationVotes):
   """Given the individual this function will find the next operator to apply.
@@ -780,17 +1010,18 @@ def evaluate(individual, generation):
   global _functionalPhase
   global _useJPF
 
-  # If the mutant is a repeat, there is nothing more to do here
-  seenBefore, hashVal = check_repeat_mutant(individual)
-  if seenBefore:
-    return
+  with _hashLock:
+    # If the mutant is a repeat, there is nothing more to do here
+    seenBefore, hashVal = check_repeat_mutant(individual)
+    if seenBefore:
+      return
 
-  # If the mutant isn't a repeat, add it to the hash list of seen
-  # mutants and continue with the evaluation
-  if hashVal != None and _functionalPhase:
-    #logger.debug("Didn't find this mutated project hash in hash list: {}. \
-    #  Adding it".format(hashVal))
-    hashlist.add_hash(hashVal, individual.generation, individual.id)
+    # If the mutant isn't a repeat, add it to the hash list of seen
+    # mutants and continue with the evaluation
+    if hashVal != None and _functionalPhase:
+      #logger.debug("Didn't find this mutated project hash in hash list: {}. \
+      #  Adding it".format(hashVal))
+      hashlist.add_hash(hashVal, individual.generation, individual.id)
 
   if _functionalPhase and _useJPF:
     TryContest = evaluate_modelcheck(individual, generation)
@@ -820,7 +1051,8 @@ def evaluate_modelcheck(individual, generation):
     logger.debug("Creating gateway.")
     run_jpf.createGateway(individual.id, generation)
 
-    run_jpf.runJPF()
+    run_jpf.runJPF(txl_operator.get_context(individual.generation,
+                                            individual.id))
 
     # After running JPF, display any errors detected right away
     errStr = run_jpf.getErrorText()
@@ -872,6 +1104,7 @@ def evaluate_modelcheck(individual, generation):
       individual.score.append(0)
       individual.evalMethod.append('None')
       individual.successes.append(-1)
+      individual.successInterval.append(None)
       individual.timeouts.append(-1)
       individual.dataraces.append(-1)
       individual.deadlocks.append(-1)
@@ -940,6 +1173,7 @@ def evaluate_modelcheck(individual, generation):
       individual.score.append(depthFit)
       individual.evalMethod.append('JPF')
       individual.successes.append(-1)
+      individual.successInterval.append(None)
       individual.timeouts.append(-1)
       if raceFound:
         individual.dataraces.append(1)
@@ -962,6 +1196,7 @@ def evaluate_modelcheck(individual, generation):
       individual.score.append(depthFit)
       individual.evalMethod.append('JPF')
       individual.successes.append(-1)
+      individual.successInterval.append(None)
       individual.timeouts.append(-1)
       individual.dataraces.append(-1)
       individual.deadlocks.append(-1)
@@ -1004,7 +1239,8 @@ def evaluate_contest(individual):  #, worstScore):
   global _functionalPhase
 
   # ConTest testing
-  contest = tester.Tester()
+  contest = tester.Tester(txl_operator.get_context(individual.generation,
+                                                   individual.id))
 
   logger.info("Evaluating individual {}, generation {} with ConTest".
     format(individual.id, individual.generation))
@@ -1014,30 +1250,63 @@ def evaluate_contest(individual):  #, worstScore):
   # Bug fixing phase
   if _functionalPhase:
 
-    contest.begin_testing(_functionalPhase, False)
+    stopRule = None
+    if config._CONTEST_SEQUENTIAL_TESTING:
+      stopRule = sequential.SuccessRateRule(get_best_success_rate(individual))
+
+    contest.begin_testing(_functionalPhase, False, config._CONTEST_RUNS, stopRule)
+
+    # If the testing stopped early, the counts are scaled up so they can be
+    # compared with members that had all config._CONTEST_RUNS runs
+    completed = len(contest.goodRuns)
+    successes, timeouts, dataraces, deadlocks, errors = sequential.scale_counts(
+      [contest.successes, contest.timeouts, contest.dataraces,
+       contest.deadlocks, contest.errors], completed)
 
     # Fitness
-    individual.score.append((contest.successes * config._SUCCESS_WEIGHT) + \
-                            (contest.timeouts * config._TIMEOUT_WEIGHT))
+    individual.score.append((successes * config._SUCCESS_WEIGHT) + \
+                            (timeouts * config._TIMEOUT_WEIGHT))
 
     # Store results into genome
-    individual.successes.append(contest.successes)
-    individual.timeouts.append(contest.timeouts)
-    individual.dataraces.append(contest.dataraces)
-    individual.deadlocks.append(contest.deadlocks)
-    individual.errors.append(contest.errors)
+    individual.successes.append(successes)
+    individual.successInterval.append(sequential.wilson_interval(
+      contest.successes, completed))
+    individual.timeouts.append(timeouts)
+    individual.dataraces.append(dataraces)
+    individual.deadlocks.append(deadlocks)
+    individual.errors.append(errors)
 
 
   # Optimization phase
   else:
-    # Ensure functionality is still there
-    if contest.begin_testing(_functionalPhase, True, config._CONTEST_RUNS *
-      config._CONTEST_VALIDATION_MULTIPLIER):
+    stopRule = None
+    if config._MEASUREMENT_ADAPTIVE:
+      bestRealTime, bestVoluntarySwitches = get_best_measurements(individual)
+      stopRule = sequential.MeasurementRule(contest, bestRealTime,
+                                            bestVoluntarySwitches)
+
+    # Ensure functionality is still there, while measuring performance
+    validationRuns = config._CONTEST_RUNS * config._CONTEST_VALIDATION_MULTIPLIER
+    validated = contest.begin_testing(_functionalPhase, True, validationRuns,
+                                      stopRule)
+
+    # The stop rule only decides how many runs are measured. The mutation is
+    # still validated with all of the runs. Those that aren't measured can be
+    # run in parallel
+    if validated and len(contest.goodRuns) < validationRuns:
+      validation = tester.Tester(txl_operator.get_context(individual.generation,
+                                                          individual.id))
+      validated = validation.begin_testing(_functionalPhase, True,
+                    validationRuns - len(contest.goodRuns),
+                    workers=config._CONTEST_VALIDATION_WORKERS, measure=False)
+      validation.clear_results()
+
+    if validated:
       logger.debug("Optimization phase: Mutation didn't introduce any bugs")
 
       # Optimization fitness
       individual.score.append(get_average_non_functional_score(contest,
-        individual, config._CONTEST_RUNS * config._CONTEST_VALIDATION_MULTIPLIER))
+        individual))
     else:
       logger.debug("Optimization phase: Mutation introduced a bug")
       individual.score.append(-1)
@@ -1062,6 +1331,32 @@ def evaluate_contest(individual):  #, worstScore):
   contest.clear_results()
 
 
+def get_best_success_rate(individual):
+  """Return the highest success rate of the last ConTest evaluation of the
+  other members of the population. Used as the target of sequential testing.
+
+  Attributes:
+    individual (Individual): Member being evaluated, left out
+  Returns:
+    float: Best success rate, or None if no other member was tested yet
+  """
+
+  global _population
+
+  bestRate = None
+  for member in _population:
+    if member is individual or len(member.successes) == 0:
+      continue
+    # -1 is recorded when ConTest wasn't used (JPF, errors)
+    if member.successes[-1] < 0:
+      continue
+    rate = member.successes[-1] / config._CONTEST_RUNS
+    if bestRate is None or rate > bestRate:
+      bestRate = rate
+
+  return bestRate
+
+
 def check_repeat_mutant(individual):
   """Check to see if this particular mutant has been seen before. If it has,
   we don't need to evaluate it again.  Simply copy the results from the
@@ -1081,6 +1376,9 @@ def check_repeat_mutant(individual):
     return False, None
 
   # Check if we have encountered this mutant already
+  # (The local project may only be known by its edits, see
+  # config._DELTA_INDIVIDUALS)
+  txl_operator.get_local_project(individual.generation, individual.id)
   md5Hash = hashlist.generate_hash(individual.generation, individual.id)
   if md5Hash is None:
     logger.error("Hash value of member {}, generation {} is NULL".format(
@@ -1107,6 +1405,10 @@ def check_repeat_mutant(individual):
   # Copy the testing information into the individual
   individual.score.append(prevIndvidual.score[-1])
   individual.successes.append(prevIndvidual.successes[-1])
+  if len(prevIndvidual.successInterval) > 0:
+    individual.successInterval.append(prevIndvidual.successInterval[-1])
+  else:
+    individual.successInterval.append(None)
   individual.timeouts.append(prevIndvidual.timeouts[-1])
   individual.dataraces.append(prevIndvidual.dataraces[-1])
   individual.deadlocks.append(prevIndvidual.deadlocks[-1])
@@ -1115,6 +1417,34 @@ def check_repeat_mutant(individual):
   return True, md5Hash
 
 
+def get_best_measurements(individual):
+  """Return the lowest (best) mean real time and voluntary switches measured
+  for the other members of the population. Used to stop measuring members
+  that are clearly worse.
+
+  Attributes:
+    individual (Individual): Member being measured, left out
+  Returns:
+    (float, float): Best real time and voluntary switches, None if nothing
+      was measured yet
+  """
+
+  global _population
+
+  bestRealTime = None
+  bestVoluntarySwitches = None
+  for member in _population:
+    if member is individual or len(member.realTime) == 0:
+      continue
+    if bestRealTime is None or member.realTime[-1] < bestRealTime:
+      bestRealTime = member.realTime[-1]
+    if bestVoluntarySwitches is None or \
+      member.voluntarySwitches[-1] < bestVoluntarySwitches:
+      bestVoluntarySwitches = member.voluntarySwitches[-1]
+
+  return bestRealTime, bestVoluntarySwitches
+
+
 def get_average_non_functional_score(contest, individual):
   """Calculate the non-functional score of the individual
 
@@ -1131,12 +1461,16 @@ def get_average_non_functional_score(contest, individual):
   logger.info("Getting average non-functional score")
 
   # Get the average of realTime and voluntarySwitches
-  avgRealTime = sum(contest.realTime, 0.0) / len(contest.realTime)
-  avgVoluntarySwitches = sum(contest.voluntarySwitches, 0.0) / len(contest.voluntarySwitches)
+  avgRealTime, varRealTime = sequential.mean_and_variance(contest.realTime)
+  avgVoluntarySwitches, varVoluntarySwitches = sequential.mean_and_variance(
+    contest.voluntarySwitches)
 
   # Append average data to individual
   individual.realTime.append(avgRealTime)
   individual.voluntarySwitches.append(avgVoluntarySwitches)
+  individual.realTimeVariance.append(varRealTime)
+  individual.voluntarySwitchesVariance.append(varVoluntarySwitches)
+  individual.measuredRuns.append(len(contest.realTime))
 
   # Find the uncertainties in the measurements
   maxRT = max(contest.realTime)
@@ -1349,14 +1683,17 @@ def terminate(individual, generation, generationLimit):
 
     # ... and the individual passes the extended number of tests, we have
     # found a fix for the dataraces(s) and deadlock(s)
-    if tester.Tester().begin_testing(True, True, config._CONTEST_RUNS
-      * config._CONTEST_VALIDATION_MULTIPLIER):
-      tester.Tester().clear_results()
+    contest = tester.Tester(txl_operator.get_context(individual.generation,
+                                                     individual.id))
+    if contest.begin_testing(True, True, config._CONTEST_RUNS
+      * config._CONTEST_VALIDATION_MULTIPLIER,
+      workers=config._CONTEST_VALIDATION_WORKERS):
+      contest.clear_results()
       logger.info("Found best individual {}".format(individual.id))
       individual.validated = True
       return True, individual
     else:
-      tester.Tester().clear_results()
+      contest.clear_results()
       logger.info("Potential best individual still has errors")
 
   # We're out of generations
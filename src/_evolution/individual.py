@@ -9,6 +9,7 @@ Copyright ARC, David Kelk and Kevin Jalbert, 2012
 """
 
 from _txl import txl_operator
+import os
 import sys
 sys.path.append("..")  # To allow importing parent directory module
 import config
@@ -32,6 +33,7 @@ class Individual():
   lastDataraceRate (double): the last individual had what rate of dataraces
   lastDeadlockRate (double): the last individual had what rate of deadlocks
   lastErrorRate (double): the last individual had what rate of errors
+  successInterval ([(double, double)]): confidence interval on the success rate
   """
 
   def __init__(self, height, id):
@@ -55,7 +57,15 @@ class Individual():
     self.errors = []
     self.realTime = []
     self.voluntarySwitches = []
+    # Variance of the measurements behind realTime and voluntarySwitches, and
+    # the number of measurements
+    self.realTimeVariance = []
+    self.voluntarySwitchesVariance = []
+    self.measuredRuns = []
     self.goodRuns = []  # Boolean
+    # (low, high) confidence interval on the success rate, None if ConTest
+    # wasn't used
+    self.successInterval = []
 
     self.score = []
     self.validated = False  # Indicates if the validation was successful
@@ -89,10 +99,19 @@ class Individual():
     self.genome = [None] * self.height
 
     # Figure out the number of new possible mutation operator locations
-    txl_operator.mutate_project(self.generation, self.id, mutationOperators)
-    # hits = {'RSM': 0, 'ASIM': 4, 'ASAT': 5, ...}
-    hits = txl_operator.generate_representation(self.generation, self.id,
+    if config._LAZY_MUTANTS:
+      # Only count them. The mutants mutation() draws are made as it draws
+      # them
+      # hits = {'RSM': 0, 'ASIM': 4, 'ASAT': 5, ...}
+      hits = txl_operator.count_project_mutants(self.generation, self.id,
                                                 mutationOperators)
+    else:
+      txl_operator.mutate_project(self.generation, self.id, mutationOperators)
+      # hits = {'RSM': 0, 'ASIM': 4, 'ASAT': 5, ...}
+      hits = txl_operator.generate_representation(self.generation, self.id,
+                                                  mutationOperators)
+      # Find out which of the mutants compile, so mutation() can skip the rest
+      txl_operator.probe_mutants(self.generation, self.id)
 
     # Populate the genome string with the number of hits
     i = 0
@@ -129,9 +148,13 @@ class Individual():
     ret += " Switch Generation: {}\n".format(self.switchGeneration)
     ret += " Last Operator: {}\n".format(self.lastOperator)
     ret += " Applied Operators: {}\n".format(self.appliedOperators)
+    ret += " Edits: {}\n".format([(edit[1], os.path.basename(edit[0])) for edit
+      in txl_operator.projectEdits.get((self.generation, self.id), ())])
     ret += " Successes: {}\n".format(self.successes)
+    ret += " Success Interval: {}\n".format(self.successInterval)
     ret += " Real Time: {}\n".format(self.realTime)
     ret += " Voluntary Switches: {}\n".format(self.voluntarySwitches)
+    ret += " Measured Runs: {}\n".format(self.measuredRuns)
     ret += " Score: {}\n".format(self.score)
     ret += " Restarted: {}\n".format(self.wasRestarted)
     ret += " Replaced: {}\n".format(self.wasReplaced)
@@ -150,12 +173,16 @@ class Individual():
     newIndividual.lastOperator = self.lastOperator
     newIndividual.appliedOperators = self.appliedOperators[:]
     newIndividual.successes = self.successes[:]
+    newIndividual.successInterval = self.successInterval[:]
     newIndividual.timeouts = self.timeouts[:]
     newIndividual.dataraces = self.dataraces[:]
     newIndividual.deadlocks = self.deadlocks[:]
     newIndividual.errors = self.errors[:]
     newIndividual.realTime = self.realTime[:]
     newIndividual.voluntarySwitches = self.voluntarySwitches[:]
+    newIndividual.realTimeVariance = self.realTimeVariance[:]
+    newIndividual.voluntarySwitchesVariance = self.voluntarySwitchesVariance[:]
+    newIndividual.measuredRuns = self.measuredRuns[:]
     newIndividual.goodRuns = self.goodRuns[:]
     newIndividual.score = self.score[:]
     newIndividual.wasRestarted = self.wasRestarted[:]
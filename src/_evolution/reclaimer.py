@@ -0,0 +1,226 @@
+"""Delete the directory trees CORE no longer needs (old mutants, work areas,
+sandboxes, the tmp/ of the previous run) in the background.
+
+Deleting a tree of mutants takes a long time: tens of thousands of files per
+generation, and half an hour for the tmp/ of a previous run on the mac.
+reclaim() only renames the tree out of the way (into tmp/trash/) and hands
+it to a reclaimer thread, so the evolution never waits for the deletion.
+
+The disk is still bounded: if the free space of the file system holding
+tmp/ drops below config._RECLAIM_MIN_FREE_MB, reclaim() waits for the trees
+already handed over to be deleted before returning.
+
+Trees that were renamed but not deleted when CORE stopped are deleted by the
+next run (see reclaim_leftovers).
+
+Copyright David Kelk, 2013
+"""
+
+import glob
+import os
+import os.path
+import Queue
+import threading
+import time
+import sys
+sys.path.append("..")  # To allow importing parent directory module
+import config
+import logging
+logger = logging.getLogger('output-log')
+
+# scandir (https://pypi.python.org/pypi/scandir) walks a tree without a stat()
+# per file. os.walk is used if it isn't installed
+try:
+  from scandir import walk
+except ImportError:
+  from os import walk
+
+# Global variables
+_queue = Queue.Queue()
+_thread = None
+_threadLock = threading.Lock()
+_trashCount = 0
+_reclaimed = 0
+_reclaimSeconds = 0.0
+
+
+def get_trash_dir():
+  """Where trees in tmp/ are renamed to before they are deleted.
+
+  Returns:
+    string: tmp/trash/
+  """
+
+  return os.path.join(config._TMP_DIR, 'trash', '')
+
+
+def get_trash_path(path):
+  """A new name for a tree to be deleted, on the same file system so the
+  tree can be renamed.
+
+  Attributes:
+    path (string): tree to be deleted
+  Returns:
+    string: tmp/trash/<n> for a tree in tmp/, <path>.trash.<pid>.<n> next to
+      the tree otherwise
+  """
+
+  global _trashCount
+
+  with _threadLock:
+    _trashCount += 1
+    count = _trashCount
+
+  path = os.path.abspath(path)
+  tmpDir = os.path.abspath(config._TMP_DIR)
+  if path.startswith(tmpDir + os.sep):
+    return os.path.join(get_trash_dir(), str(count))
+  return "{}.trash.{}.{}".format(path, os.getpid(), count)
+
+
+def reclaim(path):
+  """Delete a tree in the background. The tree is gone from path when this
+  returns, so path can be used again right away.
+
+  Attributes:
+    path (string): directory (or file) to delete
+  Returns:
+    No return value
+  """
+
+  path = path.rstrip(os.sep)
+  if not os.path.lexists(path):
+    return
+
+  trashPath = get_trash_path(path)
+  trashDir = os.path.dirname(trashPath)
+  try:
+    if not os.path.isdir(trashDir):
+      os.makedirs(trashDir)
+  except OSError:
+    # Made by another thread in the meantime
+    pass
+
+  try:
+    os.rename(path, trashPath)
+  except OSError:
+    # Can't be renamed (eg. a mount point), delete it here
+    remove_tree(path)
+    return
+
+  start_reclaimer()
+  _queue.put(trashPath)
+
+  if is_low_on_disk():
+    logger.debug("Low on disk space, waiting for the deleted trees to go.")
+    _queue.join()
+
+
+def reclaim_leftovers():
+  """Hand over the trees an earlier run renamed but didn't get to delete.
+
+  Returns:
+    No return value
+  """
+
+  start_reclaimer()
+  for trashPath in glob.glob(config._TMP_DIR.rstrip(os.sep) + ".trash.*"):
+    _queue.put(trashPath)
+
+
+def is_low_on_disk():
+  """Is the free space of the file system holding tmp/ below
+  config._RECLAIM_MIN_FREE_MB? Always False if that is 0."""
+
+  if config._RECLAIM_MIN_FREE_MB <= 0 or not os.path.isdir(config._TMP_DIR):
+    return False
+
+  stat = os.statvfs(config._TMP_DIR)
+  return stat.f_bavail * stat.f_frsize < config._RECLAIM_MIN_FREE_MB * 1048576
+
+
+def start_reclaimer():
+  """Start the reclaimer thread, if it isn't running."""
+
+  global _thread
+
+  with _threadLock:
+    if _thread is None or not _thread.is_alive():
+      _thread = threading.Thread(target=run_reclaimer, name='reclaimer')
+      # Whatever is left when CORE is killed is deleted by the next run
+      _thread.daemon = True
+      _thread.start()
+
+
+def run_reclaimer():
+  """Thread body: delete the trees handed over by reclaim, until None."""
+
+  global _reclaimed, _reclaimSeconds
+
+  while True:
+    trashPath = _queue.get()
+    try:
+      if trashPath is None:
+        return
+      startTime = time.time()
+      remove_tree(trashPath)
+      _reclaimSeconds += time.time() - startTime
+      _reclaimed += 1
+    finally:
+      _queue.task_done()
+
+
+def remove_tree(path):
+  """Delete a tree, bottom up. Errors are logged, the rest of the tree is
+  still deleted.
+
+  Attributes:
+    path (string): directory (or file) to delete
+  """
+
+  if os.path.islink(path) or not os.path.isdir(path):
+    remove(os.remove, path)
+    return
+
+  for root, dirs, files in walk(path, topdown=False):
+    for name in files:
+      remove(os.remove, os.path.join(root, name))
+    for name in dirs:
+      dirPath = os.path.join(root, name)
+      # Links to directories are listed with the directories
+      if os.path.islink(dirPath):
+        remove(os.remove, dirPath)
+      else:
+        remove(os.rmdir, dirPath)
+  remove(os.rmdir, path)
+
+
+def remove(function, path):
+  """Call os.remove or os.rmdir, logging instead of raising an error."""
+
+  try:
+    function(path)
+  except OSError, err:
+    logger.error("Couldn't delete {}: {}".format(path, err))
+
+
+def shutdown_reclaimer():
+  """CORE is closing: wait for the trees handed over to be deleted, and stop
+  the reclaimer thread.
+
+  Returns:
+    No return value
+  """
+
+  global _thread
+
+  with _threadLock:
+    thread = _thread
+    _thread = None
+  if thread is None:
+    return
+
+  _queue.put(None)
+  thread.join()
+  logger.info("Reclaimer: deleted {} trees in {:.1f}s".format(_reclaimed,
+    _reclaimSeconds))
@@ -0,0 +1,74 @@
+"""Schedule the per-member work of a generation (mutation, compilation and
+evaluation) so that several members of the population are handled at once.
+
+Each member that is in flight builds and tests its project in its own
+workarea (see txl_operator.get_workarea), so members don't overwrite each
+other's files in config._PROJECT_DIR. Nothing they run may change the
+working directory of the process (pass cwd to subprocess instead), and the
+static analysis lists they add to are guarded by static._staticLock.
+
+Copyright David Kelk, 2013
+"""
+
+import sys
+import threading
+sys.path.append("..")  # To allow importing parent directory module
+import config
+import logging
+logger = logging.getLogger('output-log')
+
+
+def run_members(individuals, workers, function, *args):
+  """Call function(individual, *args) for each individual, with up to workers
+  calls running at the same time.
+
+  Attributes:
+    individuals (list Individual): Members of the population to work on
+    workers (int): Maximum number of members handled at once
+    function: Work to do for one member
+    args: Extra arguments passed on to function
+  Returns:
+    list: Return values of function, in the same order as individuals
+  """
+
+  # Nothing to gain from threads, so keep the serial behaviour exactly
+  if workers <= 1 or len(individuals) <= 1:
+    return [function(individual, *args) for individual in individuals]
+
+  results = [None] * len(individuals)
+  failures = []
+  nextIndex = [0]
+  indexLock = threading.Lock()
+
+  def worker():
+    while True:
+      with indexLock:
+        if nextIndex[0] >= len(individuals) or len(failures) > 0:
+          return
+        index = nextIndex[0]
+        nextIndex[0] += 1
+
+      try:
+        results[index] = function(individuals[index], *args)
+      except:
+        logger.error("Member {} failed while being worked on concurrently".
+          format(individuals[index].id))
+        with indexLock:
+          failures.append(sys.exc_info())
+        return
+
+  threads = []
+  for i in xrange(min(workers, len(individuals))):
+    thread = threading.Thread(target=worker)
+    thread.daemon = True
+    thread.start()
+    threads.append(thread)
+  for thread in threads:
+    thread.join()
+
+  # Let the caller deal with the first exception, as in the serial case
+  if len(failures) > 0:
+    excType, excValue, excTraceback = failures[0]
+    raise excType, excValue, excTraceback
+
+  return results
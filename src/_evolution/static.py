@@ -15,9 +15,11 @@ import sys
 sys.path.append("..")  # To allow importing parent directory module
 import zipfile
 import config
+from _txl.project_context import ProjectContext
 import re
 import tempfile
 import shutil
+import threading
 import fileinput
 import sys
 import urllib2
@@ -46,6 +48,11 @@ _classMeth = []
 
 _classMethVar = []
 
+# With config._EVOLUTION_PARALLEL_MEMBERS > 1, members are tested on
+# concurrent threads (see scheduler.py) and each of them adds what ConTest and
+# JPF find to the lists above. They are only changed while holding this lock
+_staticLock = threading.RLock()
+
 # Locking on primitive types (int, float, bool, ...) isn't allowed in
 # Java. The analysis in this unit return all shared variables, including
 # primitives. Removing them from the lists has multiple benefits: Less
@@ -70,11 +77,14 @@ def setup():
 
 # ------------------------ Chord ------------------------
 
-def configure_chord():
+def configure_chord(context=None):
   logger.info("Configuring Chord's chord.properties file")
 
+  if context is None:
+    context = ProjectContext()
+
   # Where we will place the properl configured chord.properties file (in input dir)
-  chordLoc = config._PROJECT_DIR + 'chord.properties'
+  chordLoc = context.projectDir + 'chord.properties'
 
   if os.path.exists(chordLoc):
     os.remove(chordLoc)
@@ -83,9 +93,9 @@ def configure_chord():
 
   for line in fileinput.FileInput(chordLoc, inplace=1):
     if line.find("chord.class.path =") is 0:
-      line = "chord.class.path = {} ".format(config._PROJECT_CLASS_DIR.replace(".", "/"))
+      line = "chord.class.path = {} ".format(context.classDir.replace(".", "/"))
     elif line.find("chord.src.path =") is 0:
-      line = "chord.src.path = {} ".format(config._PROJECT_SRC_DIR)
+      line = "chord.src.path = {} ".format(context.srcDir)
     elif line.find("chord.main.class =") is 0:
       line = "chord.main.class = {} ".format(config._CHORD_MAIN)
     elif line.find("chord.args.0 =") is 0:
@@ -96,8 +106,11 @@ def configure_chord():
     print(line[0:-1])  # Remove extra newlines
 
 
-def run_chord_datarace():
-  os.chdir(config._PROJECT_DIR)
+def run_chord_datarace(context=None):
+  if context is None:
+    context = ProjectContext()
+  # Chord runs in the project through the cwd argument below. No os.chdir, the
+  # working directory is shared by the members evaluated concurrently
 
   logger.info("Running Chord in datarace finding mode (This may take a while.)")
 
@@ -106,14 +119,17 @@ def run_chord_datarace():
 
   # Chord is run by invoking the build.xml in Chord's dir. (lib\Chord\build.xml)
   process = subprocess.Popen(['ant', '-f', os.path.join(config._CHORD_DIR, 'build.xml') ,
-    'run'], stdout=outFile, stderr=errFile, cwd=config._PROJECT_DIR, shell=False)
+    'run'], stdout=outFile, stderr=errFile, cwd=context.projectDir, shell=False)
 
   process.wait()
 
 
-def did_chord_find_dataraces():
+def did_chord_find_dataraces(context=None):
+  if context is None:
+    context = ProjectContext()
+
   # core/workarea/chord_output
-  chordOutDir = os.path.join(config._PROJECT_DIR, 'chord_output')
+  chordOutDir = os.path.join(context.projectDir, 'chord_output')
 
   if not os.path.exists(chordOutDir):
     logger.error("Chord output directory, {}, not found".format(chordOutDir))
@@ -139,11 +155,14 @@ def did_chord_find_dataraces():
   return True
 
 
-def get_chord_targets():
-  if not did_chord_find_dataraces():
+def get_chord_targets(context=None):
+  if context is None:
+    context = ProjectContext()
+
+  if not did_chord_find_dataraces(context):
     return False
 
-  chordOutDir = os.path.join(config._PROJECT_DIR, 'chord_output')
+  chordOutDir = os.path.join(context.projectDir, 'chord_output')
   URL = os.path.join(chordOutDir, 'dataraces_by_fld.html')
   URL = 'file:' + URL
   page = urllib2.urlopen(URL)
@@ -228,28 +247,29 @@ def get_chord_targets():
 def create_final_triple():
   """
   """
-  if len(_classMeth) == 0 or len(_classVar) == 0:
-    #logger.debug("Couldn't create the list of (class, method, variable) triples")
-    #logger.debug("One or both of the static analysis and ConTest shared variable detection didn't")
-    #logger.debug("find anything, or failed. As we are missing one (or both) of class.method and")
-    #logger.debug("class.variable, config.finalCMV, the list of class-method-variable triples")
-    #logger.debug("will be empty.")
-    return False
-
-  for cmTuple in _classMeth:
-    for cvTuple in _classVar:
-      if not cmTuple[-2] == cvTuple[-2]:  # Must be the same class
-        continue
-      aTriple = (cmTuple[-2], cmTuple[-1], cvTuple[-1]) # Class, method, variable
-      if aTriple not in _classMethVar and not is_variable_primitive(aTriple):
-        logger.debug("Adding triple {} to _classMethVar".format(aTriple))
-        _classMethVar.append(aTriple)
-      #else:
-      #  logger.debug("{} was rejected because it is either in _classMethVar".format(aTriple))
-      #  logger.debug("already, or the variable part is a primitive type.")
+  with _staticLock:
+    if len(_classMeth) == 0 or len(_classVar) == 0:
+      #logger.debug("Couldn't create the list of (class, method, variable) triples")
+      #logger.debug("One or both of the static analysis and ConTest shared variable detection didn't")
+      #logger.debug("find anything, or failed. As we are missing one (or both) of class.method and")
+      #logger.debug("class.variable, config.finalCMV, the list of class-method-variable triples")
+      #logger.debug("will be empty.")
+      return False
+
+    for cmTuple in _classMeth:
+      for cvTuple in _classVar:
+        if not cmTuple[-2] == cvTuple[-2]:  # Must be the same class
+          continue
+        aTriple = (cmTuple[-2], cmTuple[-1], cvTuple[-1]) # Class, method, variable
+        if aTriple not in _classMethVar and not is_variable_primitive(aTriple):
+          logger.debug("Adding triple {} to _classMethVar".format(aTriple))
+          _classMethVar.append(aTriple)
+        #else:
+        #  logger.debug("{} was rejected because it is either in _classMethVar".format(aTriple))
+        #  logger.debug("already, or the variable part is a primitive type.")
 
-  #logger.info("Populated (class, method, variable) list with Chord and ConTest data")
-  return True
+    #logger.info("Populated (class, method, variable) list with Chord and ConTest data")
+    return True
 
 
 def do_we_have_CV():
@@ -284,29 +304,30 @@ def load_contest_list():
 
   global _contestFoundVars
 
-  if _contestFoundVars:
-    return True
+  with _staticLock:
+    if _contestFoundVars:
+      return True
 
-  if not did_contest_find_shared_variables():
-    return False
+    if not did_contest_find_shared_variables():
+      return False
 
-  for line in open(config._SHARED_VARS_FILE, 'r'):
-    variableName = line.split('.')[-1].strip(' \t\n\r')
-    className = line.split('.')[-2].strip(' \t\n\r')
-    if "$" in className:    # From classA$classB, keep classA
-      className = className.split("$")[-2]
-    aTuple = (className, variableName)
-    if aTuple not in _classVar and not is_variable_primitive(aTuple):
-      logger.debug("Added {} to _classVar".format(aTuple))
-      _classVar.append(aTuple)
-    #else:
-    #    logger.debug("{} was rejected because it is either in _classVar".format(aTuple))
-    #    logger.debug("already, or the variable part is a primitive type.")
-
-  logger.info("Populated _classVar list with ConTest data")
-  _contestFoundVars = True
-  create_final_triple()
-  return True
+    for line in open(config._SHARED_VARS_FILE, 'r'):
+      variableName = line.split('.')[-1].strip(' \t\n\r')
+      className = line.split('.')[-2].strip(' \t\n\r')
+      if "$" in className:    # From classA$classB, keep classA
+        className = className.split("$")[-2]
+      aTuple = (className, variableName)
+      if aTuple not in _classVar and not is_variable_primitive(aTuple):
+        logger.debug("Added {} to _classVar".format(aTuple))
+        _classVar.append(aTuple)
+      #else:
+      #    logger.debug("{} was rejected because it is either in _classVar".format(aTuple))
+      #    logger.debug("already, or the variable part is a primitive type.")
+
+    logger.info("Populated _classVar list with ConTest data")
+    _contestFoundVars = True
+    create_final_triple()
+    return True
 
 # ---------------- JPF Related Functions -----------------
 
@@ -320,17 +341,18 @@ def add_JPF_race_list(JPFlist):
       by JPF
   """
 
-  for aTuple in JPFlist:
-    if aTuple not in _classMeth:
-      if "$" in aTuple[-2]:    # From classA$classB, keep classA
-        tempTuple = (aTuple[-2].split("$")[-2], aTuple[-1])
-        aTuple = tempTuple
-      _classMeth.append(aTuple)
-      #logger.debug("{} is new. Adding it to _classMeth.".format(aTuple))
-    #else:
-    #  logger.debug("{} is already in _classMeth".format(aTuple))
+  with _staticLock:
+    for aTuple in JPFlist:
+      if aTuple not in _classMeth:
+        if "$" in aTuple[-2]:    # From classA$classB, keep classA
+          tempTuple = (aTuple[-2].split("$")[-2], aTuple[-1])
+          aTuple = tempTuple
+        _classMeth.append(aTuple)
+        #logger.debug("{} is new. Adding it to _classMeth.".format(aTuple))
+      #else:
+      #  logger.debug("{} is already in _classMeth".format(aTuple))
 
-  create_final_triple()
+    create_final_triple()
 
 
 def add_JPF_lock_list(JPFList):
@@ -342,20 +364,21 @@ def add_JPF_lock_list(JPFList):
     JPFList (List string): List of classes involved in deadlocks
   """
 
-  for aItem in JPFList:
-    if "$" in aItem:    # From classA$classB, keep classA
-      aItem = aItem.split("$")[-2]
-    for aTuple in _classMeth:
-      newTuple = (aItem, aTuple[-1])
-      logger.debug("From class {} and classmeth tuple {}, adding {} to classmeth'") \
-        .format(aItem, aTuple, newTuple)
-      if newTuple not in _classMeth:
-        _classMeth.append(newTuple)
-        logger.debug("{} is new. Adding it to _classMeth.".format(aTuple))
-      #else:
-      #  logger.debug("{} is already in _classMeth".format(aTuple))
+  with _staticLock:
+    for aItem in JPFList:
+      if "$" in aItem:    # From classA$classB, keep classA
+        aItem = aItem.split("$")[-2]
+      for aTuple in _classMeth:
+        newTuple = (aItem, aTuple[-1])
+        logger.debug("From class {} and classmeth tuple {}, adding {} to classmeth'") \
+          .format(aItem, aTuple, newTuple)
+        if newTuple not in _classMeth:
+          _classMeth.append(newTuple)
+          logger.debug("{} is new. Adding it to _classMeth.".format(aTuple))
+        #else:
+        #  logger.debug("{} is already in _classMeth".format(aTuple))
 
-  create_final_triple()
+    create_final_triple()
 
 # ------------ Static analysis database file ---------------
 
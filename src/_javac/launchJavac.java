@@ -0,0 +1,199 @@
+import java.io.*;
+import java.net.*;
+import java.util.*;
+import java.util.concurrent.atomic.AtomicInteger;
+import javax.tools.*;
+
+// py4j is a python package for connecting to Java programs
+// JAR is in core/lib/Java
+import py4j.*;
+
+// Keeps a JavaCompiler warm, so compiling a mutant doesn't pay for starting
+// ant, a JVM and javac every time. See run_javac.py.
+//
+// compile returns a string whose first line is OK or FAILED, followed by one
+// line per diagnostic:
+//   KIND<tab>source file<tab>line<tab>message
+//
+// probeMutants compiles every mutant of a member, one at a time, in the same
+// compiler session and returns one character per mutant: 1 if it compiled,
+// 0 if it didn't.
+public class launchJavac {
+
+  protected
+    JavaCompiler compiler;
+    // Compiles of different members run in different py4j threads
+    AtomicInteger compileCount;
+
+  public launchJavac() {
+    // Null when running on a JRE instead of a JDK
+    compiler = ToolProvider.getSystemJavaCompiler();
+    compileCount = new AtomicInteger(0);
+  }
+
+  // sources are .java files or directories holding them
+  public String compile(List<String> sources, String classpath, String outputDir) {
+    if (compiler == null)
+      return "FAILED\nERROR\t\t0\tlaunchJavac.java: No system Java compiler, is this a JDK?";
+
+    List<File> files = new ArrayList<File>();
+    for (String source : sources)
+      collectSources(new File(source), files);
+
+    DiagnosticCollector<JavaFileObject> diagnostics =
+      new DiagnosticCollector<JavaFileObject>();
+    // A new file manager per compile, so no classes are cached from the
+    // previous mutant
+    StandardJavaFileManager fileManager =
+      compiler.getStandardFileManager(diagnostics, null, null);
+
+    List<String> options = Arrays.asList("-nowarn", "-d", outputDir,
+      "-cp", classpath);
+
+    boolean ok;
+    compileCount.incrementAndGet();
+    try {
+      ok = compiler.getTask(null, fileManager, diagnostics, options, null,
+        fileManager.getJavaFileObjectsFromFiles(files)).call();
+    } catch (RuntimeException e) {
+      return "FAILED\nERROR\t\t0\t" + oneLine(e.toString());
+    } finally {
+      try {
+        fileManager.close();
+      } catch (IOException e) {
+      }
+    }
+
+    StringBuilder text = new StringBuilder(ok ? "OK\n" : "FAILED\n");
+    for (Diagnostic<? extends JavaFileObject> d : diagnostics.getDiagnostics()) {
+      text.append(d.getKind() + "\t"
+        + (d.getSource() == null ? "" : d.getSource().getName()) + "\t"
+        + d.getLineNumber() + "\t" + oneLine(d.getMessage(null)) + "\n");
+    }
+    return text.toString();
+  }
+
+  // mutantFiles are the mutants as TXL wrote them (eg. Cache_1_2.java) and
+  // sourceNames the files they replace (eg. net/sf/cache4j/Cache.java)
+  public String probeMutants(List<String> mutantFiles, List<String> sourceNames,
+    String classpath) {
+    StringBuilder verdicts = new StringBuilder();
+    if (compiler == null) {
+      for (int i = 0; i < mutantFiles.size(); i++)
+        verdicts.append('1');  // Don't know, let the real compile decide
+      return verdicts.toString();
+    }
+
+    // The classpath is indexed once for all of the mutants
+    DiagnosticListener<JavaFileObject> quiet = new DiagnosticListener<JavaFileObject>() {
+      public void report(Diagnostic<? extends JavaFileObject> d) {
+      }
+    };
+    DiscardingFileManager fileManager = new DiscardingFileManager(
+      compiler.getStandardFileManager(quiet, null, null));
+    List<String> options = Arrays.asList("-nowarn", "-proc:none", "-cp", classpath);
+
+    for (int i = 0; i < mutantFiles.size(); i++) {
+      boolean ok;
+      compileCount.incrementAndGet();
+      try {
+        JavaFileObject mutant = new MutantSource(sourceNames.get(i),
+          readFile(mutantFiles.get(i)));
+        ok = compiler.getTask(null, fileManager, quiet, options, null,
+          Arrays.asList(mutant)).call();
+      } catch (IOException e) {
+        ok = false;
+      } catch (RuntimeException e) {
+        ok = false;
+      }
+      verdicts.append(ok ? '1' : '0');
+    }
+
+    try {
+      fileManager.close();
+    } catch (IOException e) {
+    }
+    return verdicts.toString();
+  }
+
+  public int getCompileCount() {
+    return compileCount.get();
+  }
+
+  protected void collectSources(File source, List<File> files) {
+    if (source.isDirectory()) {
+      File[] children = source.listFiles();
+      if (children == null)
+        return;
+      Arrays.sort(children);
+      for (File child : children)
+        collectSources(child, files);
+    } else if (source.getName().endsWith(".java")) {
+      files.add(source);
+    }
+  }
+
+  protected String oneLine(String message) {
+    return message.replace("\n", " ").replace("\t", " ");
+  }
+
+  protected String readFile(String name) throws IOException {
+    Reader reader = new InputStreamReader(new FileInputStream(name));
+    StringBuilder text = new StringBuilder();
+    char[] buf = new char[4096];
+    try {
+      int n;
+      while ((n = reader.read(buf)) > 0)
+        text.append(buf, 0, n);
+    } finally {
+      reader.close();
+    }
+    return text.toString();
+  }
+
+  // A mutant, named after the file it replaces so javac accepts its public
+  // class
+  static class MutantSource extends SimpleJavaFileObject {
+    String text;
+
+    MutantSource(String sourceName, String inText) {
+      super(URI.create("string:///" + sourceName), Kind.SOURCE);
+      text = inText;
+    }
+
+    public CharSequence getCharContent(boolean ignoreEncodingErrors) {
+      return text;
+    }
+  }
+
+  // Probing only needs the verdict, the class files are thrown away
+  static class DiscardingFileManager
+    extends ForwardingJavaFileManager<StandardJavaFileManager> {
+
+    DiscardingFileManager(StandardJavaFileManager fileManager) {
+      super(fileManager);
+    }
+
+    public JavaFileObject getJavaFileForOutput(Location location,
+      String className, JavaFileObject.Kind kind, FileObject sibling) {
+      return new SimpleJavaFileObject(URI.create("mem:///"
+        + className.replace('.', '/') + kind.extension), kind) {
+        public OutputStream openOutputStream() {
+          return new ByteArrayOutputStream();
+        }
+      };
+    }
+  }
+
+  public static void main(String[] args) {
+    // py4j needs this
+    // The first argument, if given, is the port to listen on
+    launchJavac javac = new launchJavac();
+    GatewayServer server;
+    if (args.length > 0)
+      server = new GatewayServer(javac, Integer.parseInt(args[0]));
+    else
+      server = new GatewayServer(javac);
+    server.start();
+  } // main
+} // class
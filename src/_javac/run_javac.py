@@ -0,0 +1,296 @@
+"""This module manages the compile server, launchJavac.java.
+
+mutation() may compile hundreds of mutants per member. Starting a JVM for
+every one of them costs far more than the compile itself, so a JVM holding a
+javax.tools.JavaCompiler is kept up for the whole run and asked to compile
+through py4j, like _jpf/launchJPF.java. The compile server is started by the
+first compile and stopped by shutdown_compile_server. A server that takes
+longer than config._JAVAC_SERVER_TIMEOUT_SEC is restarted, and the compile is
+left to javac.
+
+The same compiler session can also check which of the mutants of a member
+compile at all (probe_mutants), so mutation() doesn't try the ones that
+don't.
+
+Copyright David Kelk, 2013
+"""
+
+# py4j is a library for calling java methods from python
+# http://py4j.sourceforge.net/
+from py4j.java_gateway import JavaGateway, GatewayClient
+from py4j.protocol import Py4JNetworkError, Py4JJavaError
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import sys
+sys.path.append("..")  # To allow importing parent directory module
+import config
+import logging
+logger = logging.getLogger('output-log')
+
+# Global variables
+_serverLock = threading.Lock()
+_serverCompiled = False
+_serverFailed = False  # Don't try to start a server that won't start
+_process = None
+_gateway = None
+_outFile = None
+_errFile = None
+
+# Seconds to wait for the compile server to accept connections
+_STARTUP_TIMEOUT_SEC = 30
+
+
+class ServerTimeout(Exception):
+  """The compile server didn't answer in time."""
+  pass
+
+
+class Diagnostic():
+  """A message from the compiler.
+
+  Attributes:
+    kind (string): ERROR, WARNING, NOTE, ...
+    source (string): source file the message is about, empty if none
+    line (int): line number in the source file
+    message (string): text of the message
+  """
+
+  def __init__(self, kind, source, line, message):
+    self.kind = kind
+    self.source = source
+    self.line = line
+    self.message = message
+
+  def __str__(self):
+    return "{}:{}: {}: {}".format(self.source, self.line, self.kind.lower(),
+                                  self.message)
+
+
+def compile_launcher():
+  """Compile src/_javac/launchJavac.java. Do this once per run.
+
+  Returns:
+    boolean: Did it compile?
+  """
+
+  global _serverCompiled
+
+  if _serverCompiled:
+    return True
+
+  logger.debug("Compiling _javac/launchJavac.java.")
+  outFile = tempfile.SpooledTemporaryFile()
+  errFile = tempfile.SpooledTemporaryFile()
+  process = subprocess.Popen(['javac', '-cp', ".:" + config._PY4J_JAR,
+    'launchJavac.java'], stdout=outFile, stderr=errFile,
+    cwd=config._JAVAC_DIR, shell=False)
+  if process.wait() != 0:
+    errFile.seek(0)
+    logger.error("Couldn't compile launchJavac.java:\n{}".format(errFile.read()))
+  else:
+    _serverCompiled = True
+  outFile.close()
+  errFile.close()
+
+  return _serverCompiled
+
+
+def start_compile_server():
+  """Start the compile server JVM and connect to it. The caller holds
+  _serverLock.
+
+  Returns:
+    boolean: Is the compile server running?
+  """
+
+  global _process, _gateway, _outFile, _errFile, _serverFailed
+
+  if _process is not None:
+    return True
+  if _serverFailed or not compile_launcher():
+    _serverFailed = True
+    return False
+
+  logger.debug("Starting the compile server on port {}.".format(
+    config._JAVAC_GATEWAY_PORT))
+  _outFile = tempfile.SpooledTemporaryFile()
+  _errFile = tempfile.SpooledTemporaryFile()
+  _process = subprocess.Popen(['java', '-cp', ".:" + config._PY4J_JAR,
+    'launchJavac', str(config._JAVAC_GATEWAY_PORT)], stdout=_outFile,
+    stderr=_errFile, cwd=config._JAVAC_DIR, shell=False)
+
+  # Wait until the Java end accepts connections instead of sleeping for a
+  # fixed amount of time
+  _gateway = JavaGateway(GatewayClient(port=config._JAVAC_GATEWAY_PORT),
+                         auto_convert=True)
+  startTime = time.time()
+  while True:
+    try:
+      _gateway.entry_point.getCompileCount()
+      return True
+    except Py4JNetworkError:
+      if _process.poll() is not None or \
+        time.time() - startTime > _STARTUP_TIMEOUT_SEC:
+        _errFile.seek(0)
+        logger.error("The compile server didn't start:\n{}".format(_errFile.read()))
+        stop_compile_server()
+        _serverFailed = True
+        return False
+      time.sleep(0.1)
+
+
+def stop_compile_server():
+  """Stop the compile server JVM. The caller holds _serverLock."""
+
+  global _process, _gateway, _outFile, _errFile
+
+  if _process is None:
+    return
+
+  if _gateway is not None:
+    try:
+      _gateway.close()
+    except:
+      pass
+  if _process.poll() is None:
+    _process.kill()
+  _process.wait()
+  _outFile.close()
+  _errFile.close()
+
+  _process = None
+  _gateway = None
+
+
+def shutdown_compile_server():
+  """CORE is closing, so stop the compile server.
+
+  Returns:
+    No return value
+  """
+
+  with _serverLock:
+    stop_compile_server()
+
+
+def call_server(gateway, method, args, timeLimit):
+  """Call a method of the compile server, giving up after timeLimit seconds.
+  py4j waits for an answer as long as it takes, so the call is made from a
+  thread of its own. A server that doesn't answer in time is stopped, which
+  also ends the call. The next compile starts a new one.
+
+  Attributes:
+    gateway (JavaGateway): gateway of the compile server
+    method (string): name of the method of launchJavac
+    args (tuple): its arguments
+    timeLimit (float): seconds to wait for the answer
+  Returns:
+    The answer of the server. Raises ServerTimeout, or the error of the call
+  """
+
+  answer = {}
+
+  def call():
+    try:
+      answer['result'] = getattr(gateway.entry_point, method)(*args)
+    except Exception, err:
+      answer['error'] = err
+
+  caller = threading.Thread(target=call)
+  caller.daemon = True
+  caller.start()
+  caller.join(timeLimit)
+
+  if caller.is_alive():
+    logger.error("The compile server didn't answer {} in {}s, restarting it".
+      format(method, timeLimit))
+    with _serverLock:
+      if _gateway is gateway:
+        stop_compile_server()
+    raise ServerTimeout(method)
+
+  if 'error' in answer:
+    raise answer['error']
+  return answer['result']
+
+
+def compile_sources(sources, classpath, outputDir):
+  """Compile java sources with the compile server.
+
+  Attributes:
+    sources (list string): .java files, or directories holding them
+    classpath (string): classpath to compile against
+    outputDir (string): where the classes are written
+  Returns:
+    (boolean, list Diagnostic): Did the sources compile, and the messages
+      from the compiler. None if the compile server isn't available, in which
+      case the caller should compile some other way
+  """
+
+  with _serverLock:
+    if not start_compile_server():
+      return None
+    gateway = _gateway
+
+  # Members can be compiled concurrently. The server compiles each request
+  # in its own thread
+  try:
+    result = call_server(gateway, 'compile', (sources, classpath, outputDir),
+                         config._JAVAC_SERVER_TIMEOUT_SEC)
+  except ServerTimeout:
+    return None
+  except (Py4JNetworkError, Py4JJavaError), err:
+    logger.error("The compile server stopped responding: {}".format(err))
+    with _serverLock:
+      if _gateway is gateway:
+        stop_compile_server()
+    return None
+
+  lines = result.split("\n")
+  diagnostics = []
+  for line in lines[1:]:
+    fields = line.split("\t", 3)
+    if len(fields) == 4:
+      diagnostics.append(Diagnostic(fields[0], fields[1], int(fields[2]),
+                                    fields[3]))
+
+  return lines[0] == "OK", diagnostics
+
+
+def probe_mutants(mutantFiles, sourceNames, classpath):
+  """Find out which mutants compile. Each mutant is compiled on its own, as
+  the file it replaces, against the classpath. No classes are written.
+
+  Attributes:
+    mutantFiles (list string): mutants (.java files written by TXL)
+    sourceNames (list string): for each mutant, the path of the file it
+      replaces, relative to the source directory
+    classpath (string): classes of the project the mutants were made from,
+      followed by the classpath of the project
+  Returns:
+    list boolean: for each mutant, did it compile? None if the compile server
+      isn't available
+  """
+
+  with _serverLock:
+    if not start_compile_server():
+      return None
+    gateway = _gateway
+
+  try:
+    verdicts = call_server(gateway, 'probeMutants',
+                 (mutantFiles, sourceNames, classpath),
+                 config._JAVAC_SERVER_TIMEOUT_SEC * max(1, len(mutantFiles)))
+  except ServerTimeout:
+    return None
+  except (Py4JNetworkError, Py4JJavaError), err:
+    logger.error("The compile server stopped responding: {}".format(err))
+    with _serverLock:
+      if _gateway is gateway:
+        stop_compile_server()
+    return None
+
+  return [verdict == '1' for verdict in verdicts]
@@ -198,8 +198,14 @@ public class launchJPF {
 
   public static void main(String[] args) {
     // py4j needs this
-    launchJPF gogoJPF = new launchJPF(args);
-    GatewayServer server = new GatewayServer(gogoJPF);
+    // The first argument, if given, is the port to listen on. It lets
+    // several launchJPF JVMs run at the same time (see run_jpf.py)
+    launchJPF gogoJPF = new launchJPF(null);
+    GatewayServer server;
+    if (args.length > 0)
+      server = new GatewayServer(gogoJPF, Integer.parseInt(args[0]));
+    else
+      server = new GatewayServer(gogoJPF);
     server.start();
   } // main
 } // class
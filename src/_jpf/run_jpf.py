@@ -8,22 +8,49 @@ Copyright David Kelk, 2013
 
 # py4j is a library for calling java methods from python
 # http://py4j.sourceforge.net/
-from py4j.java_gateway import JavaGateway
+from py4j.java_gateway import JavaGateway, GatewayClient
 from py4j.protocol import Py4JJavaError
 import py4j
 import sys
 sys.path.append("..")  # To allow importing parent directory module
 import config
+from _txl.project_context import ProjectContext
 import subprocess
 import tempfile
 import re
 import time
+import threading
+import Queue
 import logging
 logger = logging.getLogger('output-log')
 
 # Global variables
-_jpfLauncher = None
-_jpfProcess = None
+# Each thread evaluating a member talks to its own launchJPF JVM, so the
+# launcher, process and gateway port are kept per thread
+_jpf = threading.local()
+_freePorts = Queue.Queue()
+_portLock = threading.Lock()
+_portsCreated = 0
+_launcherCompiled = False
+
+
+def acquirePort():
+  """Get a py4j port no other launchJPF JVM is using. Ports are handed out
+  two apart, as py4j uses the port after the gateway port for callbacks.
+
+  Returns:
+    int: Port for the Java end of the gateway
+  """
+
+  global _portsCreated
+
+  try:
+    return _freePorts.get_nowait()
+  except Queue.Empty:
+    with _portLock:
+      port = config._JPF_GATEWAY_PORT + 2 * _portsCreated
+      _portsCreated += 1
+    return port
 
 
 def createGateway(individualID, generation):
@@ -34,20 +61,23 @@ def createGateway(individualID, generation):
     No return value
   """
 
-  global _jpfProcess
+  global _launcherCompiled
 
   outFile = tempfile.SpooledTemporaryFile()
   errFile = tempfile.SpooledTemporaryFile()
 
 
   # Compile src/_jpf/launchJPF.java, which creates and runs the JPF session
-  # Do this once per run
-  if individualID is 1 and generation is 1:
-    logger.debug("Compiling _jpf/launchJPF.java.")
-    process = subprocess.Popen(['javac', '-cp', ".:" + config._JPF_JAR
-      + ":" + config._PY4J_JAR, 'launchJPF.java'], stdout=outFile,
-      stderr=errFile, cwd=config._JPF_DIR, shell=False)
-    process.wait()
+  # Do this once per run. Members can be evaluated concurrently, so the
+  # first one to get here compiles it while the others wait
+  with _portLock:
+    if not _launcherCompiled:
+      logger.debug("Compiling _jpf/launchJPF.java.")
+      process = subprocess.Popen(['javac', '-cp', ".:" + config._JPF_JAR
+        + ":" + config._PY4J_JAR, 'launchJPF.java'], stdout=outFile,
+        stderr=errFile, cwd=config._JPF_DIR, shell=False)
+      process.wait()
+      _launcherCompiled = True
 
     # Debugging
     #
@@ -65,11 +95,14 @@ def createGateway(individualID, generation):
   outFile = tempfile.SpooledTemporaryFile()
   errFile = tempfile.SpooledTemporaryFile()
 
-  logger.debug("Starting the Java side of the bridge.")
+  _jpf.port = acquirePort()
+
+  logger.debug("Starting the Java side of the bridge on port {}.".format(_jpf.port))
   # Run/start src/_jpf/launchJPF.java so we can connect to it throught py4j
-  _jpfProcess = subprocess.Popen(['java', '-Xmx{}m'.format(config._PROJECT_TEST_MB),
-    '-cp', ".:" + config._JPF_JAR + ":" + config._PY4J_JAR, 'launchJPF'],
-    stdout=outFile, stderr=errFile, cwd=config._JPF_DIR, shell=False)
+  _jpf.process = subprocess.Popen(['java', '-Xmx{}m'.format(config._PROJECT_TEST_MB),
+    '-cp', ".:" + config._JPF_JAR + ":" + config._PY4J_JAR, 'launchJPF',
+    str(_jpf.port)], stdout=outFile, stderr=errFile, cwd=config._JPF_DIR,
+    shell=False)
   time.sleep(2) # Wouldn't it be ironic if this lead to a data race
 
   # Debugging
@@ -87,29 +120,34 @@ def createGateway(individualID, generation):
     logger.debug(error)
 
 
-def runJPF():
+def runJPF(context=None):
   """Configure JPF, invoke it and wait for the results.
 
+  Attributes:
+    context (ProjectContext): project holding the mutant, config._PROJECT_DIR
+      if None
+
   Returns:
     No return value
   """
 
-  global _jpfLauncher
+  if context is None:
+    context = ProjectContext()
 
   # Create the local part of the gateway and connect to the Java end
   # auto_convert automatically converts python lists to java lists
   #logger.debug("Creating the python side of the bridge.")
-  pyGateway = JavaGateway(auto_convert=True)
+  pyGateway = JavaGateway(GatewayClient(port=_jpf.port), auto_convert=True)
 
-  _jpfLauncher = pyGateway.entry_point.getJPFInstance()
+  _jpf.launcher = pyGateway.entry_point.getJPFInstance()
 
   # Create the configuration list for JPF. Note that we are creating a Java
   # array (of Strings), not a Python list
 
   jpfConfig = pyGateway.new_array(pyGateway.jvm.java.lang.String, 10)
   jpfConfig[0] = config._JPF_CONFIG  # The .jpf file
-  jpfConfig[1] = '+classpath=' + config._PROJECT_CLASS_DIR
-  jpfConfig[2] = '+sourcepath=' + config._PROJECT_SRC_DIR
+  jpfConfig[1] = '+classpath=' + context.classDir
+  jpfConfig[2] = '+sourcepath=' + context.srcDir
   jpfConfig[3] = '+search.class=gov.nasa.jpf.search.heuristic.BFSHeuristic'
   jpfConfig[4] = '+search.depth_limit=' + str(config._JPF_SEARCH_DEPTH)
   jpfConfig[5] = '+log.level=info'
@@ -119,10 +157,10 @@ def runJPF():
   jpfConfig[9] = '+budget.max_time=' + str(config._JPF_SEARCH_TIME_SEC * 1000)
   # Invoke JPF through the gateway
   logger.debug("Running JPF.")
-  _jpfLauncher.setArgs(jpfConfig)
+  _jpf.launcher.setArgs(jpfConfig)
 
   try:
-    _jpfLauncher.runJPF()
+    _jpf.launcher.runJPF()
   except Py4JJavaError, pyExc:
     logger.error("Encountered a py4j.protocol.Py4JJavaError.")
     logger.error(str(pyExc))
@@ -143,11 +181,13 @@ def shutdownJPFProcess():
     No return value
   """
 
-  global _jpfProcess
-
-  _jpfProcess.send_signal(3)
+  _jpf.process.send_signal(3)
   time.sleep(1)
-  _jpfProcess.kill()
+  _jpf.process.kill()
+  _jpf.process.wait()
+
+  # The JVM is gone, so its port can be used by the next launchJPF
+  _freePorts.put(_jpf.port)
 
 
 def wasADataraceFound():
@@ -429,9 +469,7 @@ def hasJPFRun():
     No return value
   """
 
-  global _jpfLauncher
-
-  return _jpfLauncher.hasJPFRun()
+  return _jpf.launcher.hasJPFRun()
 
 
 def timeExceeded():
@@ -441,9 +479,7 @@ def timeExceeded():
   Returns
     boolean: Did we run out of time?
   """
-  global _jpfLauncher
-
-  return _jpfLauncher.timeExceeded()
+  return _jpf.launcher.timeExceeded()
 
 
 def outOfMemory():
@@ -455,8 +491,6 @@ def outOfMemory():
     boolean: Did it?
   """
 
-  global _jpfLauncher
-
   errStr = getErrorText()
   if errStr is not None and errStr.find("gov.nasa.jpf.vm.NoOutOfMemoryErrorProperty") > 0:
     return True
@@ -475,10 +509,8 @@ def getErrorText():
 
   """
 
-  global _jpfLauncher
-
   # Constructed in deadlock, passed back raw here
-  return _jpfLauncher.getDeadlockErrorMessage()
+  return _jpf.launcher.getDeadlockErrorMessage()
 
 
 def getExceptionText():
@@ -490,9 +522,7 @@ def getExceptionText():
 
   """
 
-  global _jpfLauncher
-
-  return _jpfLauncher.getExceptionText()
+  return _jpf.launcher.getExceptionText()
 
 
 def getStatistics():
@@ -510,11 +540,9 @@ def getStatistics():
     (list long): Statistics for the JPF run.
   """
 
-  global _jpfLauncher
-
   # py4j handles turning java's list<long> into a python list. see
   # http://py4j.sourceforge.net/getting_started.html#collections-help-and-constructors
-  return _jpfLauncher.getStatistics()
+  return _jpf.launcher.getStatistics()
 
 
 
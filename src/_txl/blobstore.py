@@ -0,0 +1,151 @@
+"""This module keeps the files of the projects in tmp/ in a content addressed
+store, used when config._PROJECT_SNAPSHOT is 'blobstore'.
+
+Every generation of every member has its own copy of the project, and they
+differ from each other by a handful of mutated files. In the store, each
+distinct file content is kept once, as a blob named after its sha1:
+
+  tmp/blobs/3f/3f2a...e1
+
+The files of a project directory are hard links to the blobs, so the project
+is still a plain directory to ant, ConTest and JPF, and its manifest (path ->
+blob) can be read off the directory (see get_manifest). tmp/ then holds about
+one copy of the project plus the distinct mutants, instead of a copy per
+generation and member.
+
+The store remembers the inode of every blob, so a file that is a link to a
+blob is never read again to find its hash.
+
+Like hard link farms (see snapshot.py), blobs must not be written in place.
+They are made read-only, so a write through one of their links fails instead
+of changing the blob (and the hash remembered for it). Only sources and
+classes are stored (see snapshot.blob_file), the build and the tests may
+write other files in place.
+
+Copyright David Kelk, 2013
+"""
+
+import hashlib
+import os
+import os.path
+import shutil
+import threading
+import sys
+sys.path.append("..")  # To allow importing parent directory module
+import config
+import logging
+logger = logging.getLogger('output-log')
+
+# Global variables
+_blobInodes = {}  # (st_dev, st_ino) of a blob => sha1 of its content
+_blobLock = threading.Lock()
+
+
+def get_blob_dir():
+  """Where the blobs are kept.
+
+  Returns:
+    string: tmp/blobs/
+  """
+
+  return os.path.join(config._TMP_DIR, 'blobs', '')
+
+
+def get_blob_path(sha):
+  """Path of the blob holding a content.
+
+  Returns:
+    string: tmp/blobs/3f/3f2a...e1
+  """
+
+  return os.path.join(get_blob_dir(), sha[:2], sha)
+
+
+def get_file_hash(path):
+  """sha1 of the content of a file. Free for a file that is a blob or a link
+  to one.
+
+  Attributes:
+    path (string): file to hash
+  Returns:
+    string: sha1, as hex
+  """
+
+  stat = os.stat(path)
+  with _blobLock:
+    sha = _blobInodes.get((stat.st_dev, stat.st_ino))
+  if sha is not None:
+    return sha
+
+  sha = hashlib.sha1()
+  with open(path, 'rb') as aFile:
+    while True:
+      buf = aFile.read(65536)
+      if not buf:
+        break
+      sha.update(buf)
+  return sha.hexdigest()
+
+
+def store_file(path):
+  """Add the content of a file to the store, if it isn't there yet.
+
+  Attributes:
+    path (string): file to store
+  Returns:
+    string: path of the blob holding the content
+  """
+
+  sha = get_file_hash(path)
+  blob = get_blob_path(sha)
+
+  if not os.path.exists(blob):
+    blobDir = os.path.dirname(blob)
+    if not os.path.isdir(blobDir):
+      try:
+        os.makedirs(blobDir)
+      except OSError:
+        # Made by another thread in the meantime
+        if not os.path.isdir(blobDir):
+          raise
+    # Copy (not link) the file, so the blob doesn't change with it. Rename it
+    # into place so nobody links to half a blob
+    tmpBlob = "{}.{}.{}".format(blob, os.getpid(), threading.current_thread().ident)
+    shutil.copyfile(path, tmpBlob)
+    os.chmod(tmpBlob, 0444)
+    os.rename(tmpBlob, blob)
+
+  stat = os.stat(blob)
+  with _blobLock:
+    _blobInodes[(stat.st_dev, stat.st_ino)] = sha
+
+  return blob
+
+
+def get_manifest(projectDir):
+  """The manifest of a project: which blob each of its files holds.
+
+  Attributes:
+    projectDir (string): project directory
+  Returns:
+    dict: path relative to projectDir => sha1 of the content
+  """
+
+  manifest = {}
+  for root, dirs, files in os.walk(projectDir):
+    for name in files:
+      path = os.path.join(root, name)
+      manifest[os.path.relpath(path, projectDir)] = get_file_hash(path)
+  return manifest
+
+
+def log_statistics():
+  """Write the size of the store to the log."""
+
+  blobs = 0
+  size = 0
+  for root, dirs, files in os.walk(get_blob_dir()):
+    for name in files:
+      blobs += 1
+      size += os.path.getsize(os.path.join(root, name))
+  logger.info("Blob store: {} blobs, {:.1f} MB".format(blobs, size / 1048576.0))
@@ -0,0 +1,198 @@
+"""This module remembers whether a project compiled, and the classes it
+compiled to.
+
+Different members, and the same member in different generations, often end
+up with the same mutant. Instead of compiling it again, the result of the
+first compile is looked up by a hash of the project's source. A mutant that
+didn't compile because of errors in its sources is skipped right away, the
+classes of one that did are copied into the work area. Other failures (javac
+didn't start, ran out of memory, ...) aren't stored, see compile_project.
+
+The cache is kept in config._COMPILE_CACHE_DIR, outside of tmp/, so it is
+reused by later runs on the same project. Each entry is a directory named
+after the hash holding either a FAILED marker or the class directory:
+
+  <cache>/3f/3f2a...e1/FAILED
+  <cache>/8c/8c07...4d/class/...
+
+Copyright David Kelk, 2013
+"""
+
+import hashlib
+import os
+import os.path
+import shutil
+import subprocess
+import threading
+import sys
+sys.path.append("..")  # To allow importing parent directory module
+import config
+import blobstore
+import logging
+logger = logging.getLogger('output-log')
+
+# Global variables
+_hits = 0
+_misses = 0
+_countLock = threading.Lock()
+_javacVersion = None
+
+
+def get_key(projectDir):
+  """Hash what a compile of a project depends on: its source and test
+  directories, its build.xml, the classpath and the version of javac. Files
+  are hashed in sorted order along with their paths, so two copies of the
+  same project hash the same no matter where they are or in which order the
+  directory is listed.
+
+  The cache is kept between runs, so a changed test, build file or JDK
+  makes new keys instead of bringing back classes compiled before.
+
+  Attributes:
+    projectDir (string): workarea holding the project
+  Returns:
+    string: sha1 of the project, None if the source directory doesn't exist
+  """
+
+  srcDir = config._PROJECT_SRC_DIR.replace(config._PROJECT_DIR, projectDir)
+  if not os.path.isdir(srcDir):
+    return None
+
+  key = hashlib.sha1()
+  key.update(str(config._PROJECT_CLASSPATH))
+  key.update('\0' + get_javac_version())
+
+  buildFile = os.path.join(projectDir, 'build.xml')
+  if os.path.isfile(buildFile):
+    key.update('\0build.xml\0' + blobstore.get_file_hash(buildFile))
+
+  testDir = config._PROJECT_TEST_DIR.replace(config._PROJECT_DIR, projectDir)
+  for label, aDir in (('source', srcDir), ('test', testDir)):
+    if not os.path.isdir(aDir):
+      continue
+
+    paths = []
+    for root, dirs, files in os.walk(aDir):
+      for name in files:
+        paths.append(os.path.join(root, name))
+    paths.sort()
+
+    key.update('\0' + label)
+    for path in paths:
+      key.update(os.path.relpath(path, aDir))
+      # Doesn't read the file if it is in the blob store
+      key.update(blobstore.get_file_hash(path))
+
+  return key.hexdigest()
+
+
+def get_javac_version():
+  """The output of javac -version, asked for once per run.
+
+  Returns:
+    string: eg. "javac 1.7.0_45", empty if javac can't be run
+  """
+
+  global _javacVersion
+
+  with _countLock:
+    if _javacVersion is None:
+      try:
+        process = subprocess.Popen(['javac', '-version'],
+          stdout=subprocess.PIPE, stderr=subprocess.PIPE, shell=False)
+        out, err = process.communicate()
+        # Older JDKs print the version to stderr
+        _javacVersion = (out + err).strip()
+      except OSError:
+        _javacVersion = ""
+    return _javacVersion
+
+
+def get_entry_dir(key):
+  """Directory of a cache entry.
+
+  Returns:
+    string: <cache>/3f/3f2a...e1
+  """
+
+  return os.path.join(config._COMPILE_CACHE_DIR, key[:2], key)
+
+
+def restore(key, classDir):
+  """Look a project up in the cache. If it compiled, copy its classes to the
+  class directory.
+
+  Attributes:
+    key (string): hash of the project, see get_key
+    classDir (string): class directory of the workarea
+  Returns:
+    boolean: Did the project compile? None if it isn't in the cache
+  """
+
+  global _hits, _misses
+
+  if key is None:
+    return None
+
+  entryDir = get_entry_dir(key)
+  if os.path.exists(os.path.join(entryDir, 'FAILED')):
+    compiled = False
+  elif os.path.isdir(os.path.join(entryDir, 'class')):
+    if os.path.exists(classDir):
+      shutil.rmtree(classDir)
+    shutil.copytree(os.path.join(entryDir, 'class'), classDir)
+    compiled = True
+  else:
+    compiled = None
+
+  with _countLock:
+    if compiled is None:
+      _misses += 1
+    else:
+      _hits += 1
+
+  return compiled
+
+
+def store(key, compiled, classDir):
+  """Add the result of a compile to the cache.
+
+  The entry is written under a temporary name and renamed into place, so a
+  member compiling the same project at the same time never sees half of it.
+
+  Attributes:
+    key (string): hash of the project, see get_key
+    compiled (boolean): Did the project compile?
+    classDir (string): class directory of the workarea
+  Returns:
+    No return value
+  """
+
+  if key is None:
+    return
+
+  entryDir = get_entry_dir(key)
+  if os.path.exists(entryDir):
+    return
+
+  tmpDir = "{}.{}.{}".format(entryDir, os.getpid(), threading.current_thread().ident)
+  if os.path.exists(tmpDir):
+    shutil.rmtree(tmpDir)
+
+  if compiled:
+    shutil.copytree(classDir, os.path.join(tmpDir, 'class'))
+  else:
+    os.makedirs(tmpDir)
+    open(os.path.join(tmpDir, 'FAILED'), 'w').close()
+
+  try:
+    os.rename(tmpDir, entryDir)
+  except OSError:
+    # Someone else stored it first
+    shutil.rmtree(tmpDir)
+
+
+def log_statistics():
+  """Write how often the cache saved a compile to the log."""
+
+  logger.info("Compile cache: {} hits, {} misses".format(_hits, _misses))
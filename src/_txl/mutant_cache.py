@@ -0,0 +1,250 @@
+"""This module remembers the mutants a txl invocation wrote.
+
+From generation 2 on, each member mutates its own project, which differs from
+the projects mutated before by a file or two. Every other file is mutated
+again with the same operators and arguments, writing the same mutants. The
+mutants of a txl invocation are looked up by a hash of the file it mutates,
+the operator and the arguments instead, and copied into place.
+
+The cache is kept in config._MUTANT_CACHE_DIR, outside of tmp/, so it is
+reused by later runs. Each entry is a directory named after the hash holding
+the mutants, named by their number (txl names them <outfile>_<n>.java):
+
+  <cache>/3f/3f2a...e1/1.java
+  <cache>/3f/3f2a...e1/2.java
+
+An invocation that made no mutants has an empty entry.
+
+Copyright David Kelk, 2013
+"""
+
+import glob
+import hashlib
+import os
+import os.path
+import re
+import shutil
+import threading
+import sys
+sys.path.append("..")  # To allow importing parent directory module
+import config
+import blobstore
+import logging
+logger = logging.getLogger('output-log')
+
+# Global variables
+_hits = 0
+_misses = 0
+_countLock = threading.Lock()
+_grammarHashes = {}  # directory of the operators => hash of its .Txl and .Grm
+
+
+def get_key(command):
+  """Hash a txl invocation: the content of the file mutated, the operators
+  and grammars and the arguments, except where the mutants are written.
+
+  Attributes:
+    command (list string): txl command line, see
+      txl_operator.generate_mutants
+  Returns:
+    string: sha1 of the invocation, None if it can't be cached
+  """
+
+  if len(command) < 3 or not os.path.isfile(command[1]) or \
+    not os.path.isfile(command[2]):
+    return None
+
+  key = hashlib.sha1()
+  key.update(blobstore.get_file_hash(command[1]))
+  key.update(os.path.basename(command[2]))
+  key.update(get_grammar_hash(os.path.dirname(command[2])))
+
+  args = command[3:]
+  i = 0
+  while i < len(args):
+    if args[i] in ('-outfile', '-outdir'):
+      i += 2
+      continue
+    key.update('\0' + args[i])
+    i += 1
+
+  return key.hexdigest()
+
+
+def get_grammar_hash(txlDir):
+  """Hash of the operators and grammars in a directory. An operator includes
+  Java.Grm, WriteMutants.Txl, ..., so a change to any of them makes new
+  keys.
+
+  Returns:
+    string: sha1 of the .Txl and .Grm files
+  """
+
+  with _countLock:
+    grammarHash = _grammarHashes.get(txlDir)
+  if grammarHash is not None:
+    return grammarHash
+
+  key = hashlib.sha1()
+  for path in sorted(glob.glob(os.path.join(txlDir, '*.Txl')) +
+                     glob.glob(os.path.join(txlDir, '*.Grm'))):
+    key.update(os.path.basename(path))
+    key.update(blobstore.get_file_hash(path))
+  grammarHash = key.hexdigest()
+
+  with _countLock:
+    _grammarHashes[txlDir] = grammarHash
+  return grammarHash
+
+
+def get_entry_dir(key):
+  """Directory of a cache entry.
+
+  Returns:
+    string: <cache>/3f/3f2a...e1
+  """
+
+  return os.path.join(config._MUTANT_CACHE_DIR, key[:2], key)
+
+
+def get_output(command):
+  """Where a txl invocation writes its mutants.
+
+  Attributes:
+    command (list string): txl command line
+  Returns:
+    (string, string): its -outfile and -outdir arguments
+  """
+
+  return (command[command.index('-outfile') + 1],
+          command[command.index('-outdir') + 1])
+
+
+def get_mutants(outFile, outDir):
+  """The mutants one txl invocation wrote.
+
+  Attributes:
+    outFile (string): -outfile argument, eg. Cache_1
+    outDir (string): -outdir argument
+  Returns:
+    list (string, string): number of the mutant and its file, eg.
+      ('2', 'tmp/3/4/source/main/net/sf/cache4j/Cache/ASAT/Cache_1_2.java')
+  """
+
+  if not os.path.isdir(outDir):
+    return []
+
+  pattern = re.compile(re.escape(outFile) + r'_(\d+)\.java$')
+  mutants = []
+  for name in os.listdir(outDir):
+    match = pattern.match(name)
+    if match is not None:
+      mutants.append((match.group(1), os.path.join(outDir, name)))
+  return mutants
+
+
+def restore(key, outFile, outDir):
+  """Look a txl invocation up in the cache. If it is there, copy its mutants
+  to where the invocation would have written them.
+
+  Attributes:
+    key (string): hash of the invocation, see get_key
+    outFile (string): -outfile argument of the invocation
+    outDir (string): -outdir argument of the invocation
+  Returns:
+    boolean: Were the mutants restored?
+  """
+
+  global _hits, _misses
+
+  if key is None:
+    return False
+
+  entryDir = get_entry_dir(key)
+  found = os.path.isdir(entryDir)
+  if found:
+    if not os.path.isdir(outDir):
+      os.makedirs(outDir)
+    for name in os.listdir(entryDir):
+      # 2.java -> Cache_1_2.java
+      shutil.copyfile(os.path.join(entryDir, name),
+                      os.path.join(outDir, outFile + "_" + name))
+
+  with _countLock:
+    if found:
+      _hits += 1
+    else:
+      _misses += 1
+
+  return found
+
+
+def count(key):
+  """How many mutants a txl invocation in the cache made, without copying
+  them. See txl_operator.count_project_mutants.
+
+  Attributes:
+    key (string): hash of the invocation, see get_key
+  Returns:
+    int: number of mutants, None if the invocation isn't in the cache
+  """
+
+  global _hits, _misses
+
+  if key is None:
+    return None
+
+  entryDir = get_entry_dir(key)
+  mutants = None
+  if os.path.isdir(entryDir):
+    mutants = len(os.listdir(entryDir))
+
+  with _countLock:
+    if mutants is None:
+      _misses += 1
+    else:
+      _hits += 1
+
+  return mutants
+
+
+def store(key, outFile, outDir):
+  """Add the mutants of a txl invocation to the cache.
+
+  The entry is written under a temporary name and renamed into place, so a
+  member mutating the same file at the same time never sees half of it.
+
+  Attributes:
+    key (string): hash of the invocation, see get_key
+    outFile (string): -outfile argument of the invocation
+    outDir (string): -outdir argument of the invocation
+  Returns:
+    No return value
+  """
+
+  if key is None:
+    return
+
+  entryDir = get_entry_dir(key)
+  if os.path.exists(entryDir):
+    return
+
+  tmpDir = "{}.{}.{}".format(entryDir, os.getpid(), threading.current_thread().ident)
+  if os.path.exists(tmpDir):
+    shutil.rmtree(tmpDir)
+  os.makedirs(tmpDir)
+
+  for number, mutantFile in get_mutants(outFile, outDir):
+    shutil.copyfile(mutantFile, os.path.join(tmpDir, number + ".java"))
+
+  try:
+    os.rename(tmpDir, entryDir)
+  except OSError:
+    # Someone else stored it first
+    shutil.rmtree(tmpDir)
+
+
+def log_statistics():
+  """Write how often the cache saved a txl invocation to the log."""
+
+  logger.info("Mutant cache: {} hits, {} misses".format(_hits, _misses))
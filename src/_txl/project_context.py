@@ -0,0 +1,64 @@
+"""This module describes where a copy of the project is.
+
+config._PROJECT_DIR, _PROJECT_SRC_DIR, ... describe the work area. The same
+project is also built and tested in other places: per-member work areas,
+sandboxes and, with config._BUILD_IN_PLACE, the local projects in tmp/. A
+ProjectContext carries the paths of one such copy to the tools working on it
+(the compile, ConTest, JPF and Chord), so none of them has to assume the
+project is in the work area.
+
+Copyright David Kelk, 2013
+"""
+
+import os
+import os.path
+import sys
+sys.path.append("..")  # To allow importing parent directory module
+import config
+
+
+class ProjectContext():
+  """The paths of one copy of the project.
+
+  Attributes:
+    projectDir (string): directory of the copy, ending with a separator like
+      config._PROJECT_DIR
+    srcDir (string): its source directory
+    testDir (string): its test directory
+    classDir (string): its class directory
+    classpath (string): config._PROJECT_CLASSPATH pointing into the copy, None
+      if the classpath isn't known yet
+  """
+
+  def __init__(self, projectDir=None):
+    if projectDir is None:
+      projectDir = config._PROJECT_DIR
+    self.projectDir = os.path.join(projectDir, '')
+
+    self.srcDir = self.get_path(config._PROJECT_SRC_DIR)
+    self.testDir = self.get_path(config._PROJECT_TEST_DIR)
+    self.classDir = self.get_path(config._PROJECT_CLASS_DIR)
+
+    self.classpath = config._PROJECT_CLASSPATH
+    if self.classpath is not None and not self.is_workarea():
+      self.classpath = self.classpath.replace(config._PROJECT_DIR.rstrip(os.sep),
+                         self.projectDir.rstrip(os.sep))
+
+  def __repr__(self):
+    return "ProjectContext({})".format(self.projectDir)
+
+  def get_path(self, path):
+    """Where a path of the work area is in this copy.
+
+    Attributes:
+      path (string): path in config._PROJECT_DIR, eg. config._PROJECT_SRC_DIR
+    Returns:
+      string: the same path in projectDir
+    """
+
+    return path.replace(config._PROJECT_DIR, self.projectDir, 1)
+
+  def is_workarea(self):
+    """Is this copy the shared work area, config._PROJECT_DIR?"""
+
+    return self.projectDir == config._PROJECT_DIR
@@ -0,0 +1,207 @@
+"""This module makes the copies of projects CORE works on: local projects,
+work areas, sandboxes and the output project.
+
+A copy of a project is only ever changed in a few files (the mutant, the
+classes compiled from it), so copying every file of the project each time is
+mostly wasted I/O. config._PROJECT_SNAPSHOT picks how a copy is made:
+
+- 'copy': Plain copies, like shutil.copytree.
+- 'reflink': Copy-on-write clones of the files (FICLONE ioctl, btrfs, xfs,
+  ...). The clone shares the data blocks of the original until either one is
+  written, so it is as safe as a copy. Falls back to 'copy' if the file system
+  can't clone files.
+- 'hardlink': A farm of hard links to the original files. Nearly free, but a
+  file written in place changes in every copy, so the links have to be broken
+  before writing. CORE does this for the files it writes (see replace_file and
+  txl_operator.compile_changed_file). The build and the testsuite of the
+  project must not change the project's own files in place.
+- 'blobstore': Like 'hardlink', but the links point into a content addressed
+  store (see blobstore.py), so identical files of different projects share
+  storage even when they weren't copied from each other. Only the sources
+  and classes are links, the other files of the project are copied.
+
+Either way the copies are plain directories to ant, ConTest and JPF.
+
+Copyright David Kelk, 2013
+"""
+
+import errno
+import fcntl
+import os
+import os.path
+import shutil
+import threading
+import sys
+sys.path.append("..")  # To allow importing parent directory module
+import config
+import blobstore
+import logging
+logger = logging.getLogger('output-log')
+
+# ioctl number of FICLONE, from linux/fs.h
+_FICLONE = 0x40049409
+
+# Files kept in the blob store, see blob_file
+_BLOB_EXTENSIONS = ('.java', '.class')
+
+# Global variables
+_reflinkSupported = True  # Until a clone fails
+# Snapshots are taken by concurrent members and speculative compiles
+_reflinkLock = threading.Lock()
+
+
+def snapshot(srcDir, destDir, ignore=None):
+  """Make a copy of a project directory. destDir must not exist.
+
+  Attributes:
+    srcDir (string): directory to copy
+    destDir (string): where the copy goes
+    ignore (function): same as the ignore argument of shutil.copytree
+  Returns:
+    No return value
+  """
+
+  if config._PROJECT_SNAPSHOT == 'hardlink':
+    copyFile = link_file
+  elif config._PROJECT_SNAPSHOT == 'blobstore':
+    copyFile = blob_file
+  elif config._PROJECT_SNAPSHOT == 'reflink' and _reflinkSupported:
+    copyFile = reflink_file
+  else:
+    shutil.copytree(srcDir, destDir, ignore=ignore)
+    return
+
+  copy_tree(srcDir, destDir, ignore, copyFile)
+
+
+def copy_tree(srcDir, destDir, ignore, copyFile):
+  """shutil.copytree, with the file copying done by copyFile. Symbolic links
+  are followed, like copytree does by default."""
+
+  names = os.listdir(srcDir)
+  if ignore is not None:
+    ignoredNames = ignore(srcDir, names)
+  else:
+    ignoredNames = set()
+
+  os.makedirs(destDir)
+  for name in names:
+    if name in ignoredNames:
+      continue
+    srcName = os.path.join(srcDir, name)
+    destName = os.path.join(destDir, name)
+    if os.path.isdir(srcName):
+      copy_tree(srcName, destName, ignore, copyFile)
+    else:
+      copyFile(os.path.realpath(srcName), destName)
+  shutil.copystat(srcDir, destDir)
+
+
+def link_file(srcFile, destFile):
+  """Hard link a file, or copy it if it is on another file system."""
+
+  try:
+    os.link(srcFile, destFile)
+  except OSError, err:
+    if err.errno not in (errno.EXDEV, errno.EMLINK, errno.EPERM):
+      raise
+    shutil.copy2(srcFile, destFile)
+
+
+def uses_links():
+  """Do copies share files with the original, so files have to be replaced
+  instead of written in place?"""
+
+  return config._PROJECT_SNAPSHOT in ('hardlink', 'blobstore')
+
+
+def blob_file(srcFile, destFile):
+  """Link a file to the blob holding its content. A file in tmp/ that isn't a
+  blob yet is replaced by a link to the blob as well, so it isn't stored
+  twice.
+
+  Only sources and classes, which CORE replaces instead of writing in place,
+  are stored. Other files are copied, the build or the tests may write them."""
+
+  if os.path.splitext(srcFile)[1] not in _BLOB_EXTENSIONS:
+    shutil.copy2(srcFile, destFile)
+    return
+
+  blob = blobstore.store_file(srcFile)
+  link_file(blob, destFile)
+
+  if os.path.abspath(srcFile).startswith(os.path.abspath(config._TMP_DIR)) \
+    and not os.path.samefile(srcFile, blob):
+    tmpFile = srcFile + ".blob"
+    try:
+      os.link(blob, tmpFile)
+      os.rename(tmpFile, srcFile)
+    except OSError:
+      if os.path.lexists(tmpFile):
+        os.remove(tmpFile)
+
+
+def reflink_file(srcFile, destFile):
+  """Clone a file, or copy it if the file system can't clone files."""
+
+  global _reflinkSupported
+
+  if _reflinkSupported:
+    with open(srcFile, 'rb') as src:
+      with open(destFile, 'wb') as dest:
+        try:
+          fcntl.ioctl(dest.fileno(), _FICLONE, src.fileno())
+          cloned = True
+        except IOError, err:
+          cloned = False
+          if err.errno in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EINVAL,
+                           errno.ENOSYS):
+            with _reflinkLock:
+              if _reflinkSupported:
+                logger.info("The file system doesn't support reflinks, "
+                            "copying projects instead.")
+                _reflinkSupported = False
+          elif err.errno != errno.EXDEV:
+            raise
+    if cloned:
+      shutil.copystat(srcFile, destFile)
+      return
+
+  shutil.copy2(srcFile, destFile)
+
+
+def replace_file(srcFile, destFile):
+  """Copy a file over a file of a snapshot. The old file is removed first, so
+  a hard link is replaced instead of written through.
+
+  Attributes:
+    srcFile (string): new content, eg. a mutant
+    destFile (string): file of the snapshot to replace
+  Returns:
+    No return value
+  """
+
+  if os.path.lexists(destFile):
+    os.remove(destFile)
+  shutil.copy(srcFile, destFile)
+
+
+def move_into(srcDir, destDir):
+  """Move the files of one directory tree into another, replacing files that
+  exist. Files are renamed into place, so hard links in destDir are replaced
+  instead of written through. srcDir is removed.
+
+  Attributes:
+    srcDir (string): directory tree to move, eg. freshly compiled classes
+    destDir (string): directory tree to move it into
+  Returns:
+    No return value
+  """
+
+  for root, dirs, files in os.walk(srcDir):
+    destRoot = os.path.join(destDir, os.path.relpath(root, srcDir))
+    if not os.path.isdir(destRoot):
+      os.makedirs(destRoot)
+    for name in files:
+      os.rename(os.path.join(root, name), os.path.join(destRoot, name))
+  shutil.rmtree(srcDir)
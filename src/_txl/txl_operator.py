@@ -16,10 +16,20 @@ import subprocess
 import os
 import os.path
 import tempfile
+import threading
 import time
 import shutil
 import re
 from _evolution import static
+from _evolution import reclaimer
+from _javac import run_javac
+from _contest.supervisor import Supervisor
+from _contest import harness
+import compile_cache
+import mutant_cache
+import snapshot
+import blobstore
+from project_context import ProjectContext
 from shutil import ignore_patterns
 sys.path.append("..")  # To allow importing parent directory module
 import config
@@ -27,7 +37,6 @@ import logging
 logger = logging.getLogger('output-log')
 # Send2Trash from https://pypi.python.org/pypi/Send2Trash
 # See core.py for more details
-from send2trash import send2trash
 
 # A dictionary to hold the path of unique mutations by individual's and
 # generation. The mapping is:
@@ -37,6 +46,57 @@ from send2trash import send2trash
 #                 /EXCR/EXCR_DeadlockDemo_1.java_3
 uniqueMutants = {}
 
+# With config._LAZY_MUTANTS on, the txl invocation that writes each mutant,
+# filled in by count_project_mutants. The mutant file (in uniqueMutants) is
+# only written when the mutant is drawn, see realize_mutant. Same keys as
+# uniqueMutants: (generation, memberNum, txlOperator, mutantNum) => command line
+mutantCommands = {}
+
+# Which mutants compile against the classes of the project they were made
+# from, filled in by probe_mutants. Same keys as uniqueMutants:
+# (generation, memberNum, txlOperator, mutantNum) => boolean
+compilableMutants = {}
+
+# The edits that turn the pristine project into a local project:
+# (generation, memberNum) => ((file, txlOperator, sha1), ...)
+# file is relative to the project, sha1 is the hash of the mutant moved over
+# it. For example:
+# (3, 4) -> (('source/main/net/sf/cache4j/CacheCleaner.java', 'ASAT', '3f2a..'),)
+projectEdits = {}
+
+# With config._DELTA_INDIVIDUALS on, local projects are created and copied by
+# setting their edits in projectEdits. The directory is only made (from the
+# pristine project and the mutants in the blob store) when it is used, see
+# get_local_project. (generation, memberNum) of the ones not made yet:
+unmaterialized = set()
+
+# With config._INCREMENTAL_MUTATION on, the files each member mutated, so the
+# next generation of the member can tell which of its files are unchanged:
+# (generation, memberNum) => (signature, {file: (sha1, mutant directory)})
+# file is relative to the source directory mutated, the mutant directory to
+# the directory the mutants were written to, signature is from
+# get_mutation_signature. For example:
+# (3, 4) -> ("([('ASAT', True), ...", {'main/net/sf/cache4j/Cache.java':
+#             ('3f2a..', 'main/net/sf/cache4j/Cache'), ...})
+mutatedSources = {}
+
+# With config._INCREMENTAL_MUTATION and config._LAZY_MUTANTS on, the number of
+# mutants of the txl invocations counted so far:
+# key of the invocation (see mutant_cache.get_key) => number of mutants
+mutantCounts = {}
+
+# The operators member 1 of generation 1 was mutated with, once its mutants
+# are complete. The other members of generation 1 copy them, see
+# make_first_member_mutants
+_firstMemberOperators = None
+_firstMemberLock = threading.Lock()
+
+# What testing leaves in a project: ConTest's output, the per-worker run
+# directories (see tester.py) and JVM dumps. With config._BUILD_IN_PLACE it is
+# in the local projects. It isn't part of the project, and a snapshot made
+# with links (see snapshot.py) would share the files ConTest writes to
+_TEST_OUTPUT = ignore_patterns('java.*', 'com_ibm_contest', 'contest_runs')
+
 
 # -----------------------------------------------------------------------------
 #
@@ -63,7 +123,11 @@ def mutate_project(generation, memberNum, mutationOperators):
   #   in the /input directory. So, instead of creating the mutants N
   #   times, create them once (for member #1) and copy them to the
   #   other member directories for generation 1.
-  if generation == 1 and memberNum > 1:
+  if generation == 1:
+    make_first_member_mutants(mutationOperators, mutate_member)
+    if memberNum == 1:
+      return
+
     # tmp/1/1/source/
     srcDir = os.path.join(config._TMP_DIR, str(1), str(1),
              config._PROJECT_SRC_DIR.replace(config._PROJECT_DIR, ''))
@@ -73,13 +137,72 @@ def mutate_project(generation, memberNum, mutationOperators):
 
     if os.path.exists(destDir):
       shutil.rmtree(destDir)
-    shutil.copytree(srcDir, destDir)
+    snapshot.snapshot(srcDir, destDir)
+
+    if (1, 1) in mutatedSources:
+      mutatedSources[(1, memberNum)] = mutatedSources[(1, 1)]
 
     return
 
+  mutate_member(generation, memberNum, mutationOperators)
+
+
+def mutate_member(generation, memberNum, mutationOperators):
+  """The work of mutate_project, without the generation 1 optimization."""
+
   #logger.debug("Arguments received: {} {} {}".format(generation, memberNum,
   #   mutationOperators))
 
+  sourceDir, destDir = get_mutation_dirs(generation, memberNum)
+
+  #logger.debug("---------------------------")
+  #logger.debug("  generation: {}".format(generation))
+  #logger.debug("  member num: {}".format(memberNum))
+  #logger.debug("  operators: {}".format(mutationOperators))
+  #logger.debug("  sourceDir:  {}".format(sourceDir))
+  #logger.debug("  destDir:    {}".format(destDir))
+
+  recursively_mutate_project(generation, memberNum, sourceDir, destDir,
+                             mutationOperators)
+
+
+def make_first_member_mutants(mutationOperators, makeMutants):
+  """Generation 1: Every member shares the mutants of member 1 (see
+  mutate_project and count_project_mutants). Make them with
+  makeMutants(1, 1, mutationOperators), unless they were made with the same
+  operators already.
+
+  Members mutated concurrently (config._EVOLUTION_PARALLEL_MEMBERS) wait here
+  until the mutants of member 1 are complete, whichever member makes them,
+  instead of copying a tree that is only partly written.
+
+  Attributes:
+  mutationOperators ([list]): one of {config._FUNCTIONAL_MUTATIONS,
+    config._NONFUNCTIONAL_MUTATIONS}
+  makeMutants (function): mutate_member or count_member_mutants
+  """
+
+  global _firstMemberOperators
+
+  operators = [operator[0] for operator in mutationOperators if operator[1]]
+  with _firstMemberLock:
+    if _firstMemberOperators != operators:
+      makeMutants(1, 1, mutationOperators)
+      _firstMemberOperators = operators
+
+
+def get_mutation_dirs(generation, memberNum):
+  """Where the project a member mutates is, and where its mutants go. See
+  mutate_project.
+
+  Attributes:
+  generation (int): Current generation of the evolutionary GA
+  memberNum (int): Which member of the population we are mutating
+  Returns:
+  (string, string): input/source/ or tmp/2/4/project/source/, and
+    tmp/3/4/source
+  """
+
   # source/
   codeDir = config._PROJECT_SRC_DIR.replace(config._PROJECT_DIR, '')
 
@@ -92,18 +215,10 @@ def mutate_project(generation, memberNum, mutationOperators):
     sourceDir = config._PROJECT_PRISTINE_SRC_DIR
   else:
     # tmp/2/4/project/source/
-    sourceDir = os.path.join(config._TMP_DIR, str(generation - 1),
-      str(memberNum), 'project', codeDir)
+    sourceDir = os.path.join(get_local_project(generation - 1, memberNum),
+      codeDir)
 
-  #logger.debug("---------------------------")
-  #logger.debug("  generation: {}".format(generation))
-  #logger.debug("  member num: {}".format(memberNum))
-  #logger.debug("  operators: {}".format(mutationOperators))
-  #logger.debug("  sourceDir:  {}".format(sourceDir))
-  #logger.debug("  destDir:    {}".format(destDir))
-
-  recursively_mutate_project(generation, memberNum, sourceDir, destDir,
-                             mutationOperators)
+  return sourceDir, destDir
 
 
 def recursively_mutate_project(generation, memberNum, sourceDir, destDir, \
@@ -115,6 +230,15 @@ def recursively_mutate_project(generation, memberNum, sourceDir, destDir, \
   Most of the work is farmed out to the generate_all_mutants function.
   These function exists for future flexibility.
 
+  The txl invocations for all of the files and operators are collected first
+  (see collect_mutant_jobs) and then run config._TXL_PARALLEL_PROCESSES at a
+  time (see run_mutant_jobs). Each one writes to its own directory.
+
+  With config._INCREMENTAL_MUTATION on, only the files that changed since the
+  member's last generation (the mutant moved into its project, or a project
+  copied over it) are mutated. The mutants of the other files are carried
+  forward from tmp/<generation - 1>/<member>/source, see collect_mutant_jobs.
+
   Attributes:
   generation (int): Current generation of the evolutionary strategy
   memberNum (int): Which member of the population we are mutating
@@ -126,10 +250,49 @@ def recursively_mutate_project(generation, memberNum, sourceDir, destDir, \
 
   #logger.debug("sourceDir    {}".format(sourceDir))
 
+  run_mutant_jobs(collect_mutant_jobs(generation, memberNum, sourceDir,
+                                      destDir, mutationOperators,
+                                      config._INCREMENTAL_MUTATION))
+
+
+def collect_mutant_jobs(generation, memberNum, sourceDir, destDir, \
+  mutationOperators, carryForward=False):
+  """The txl invocations making the mutants of every file of a project. See
+  recursively_mutate_project.
+
+  With carryForward, the files mutated are recorded in mutatedSources. A file
+  the member mutated in the last generation, with the same content, operators
+  and static.py variables, gets no jobs: its mutant directory is copied from
+  the last generation instead. generate_representation numbers the mutants
+  carried forward along with the new ones.
+
+  Returns:
+  list MutantJob: jobs made by generate_mutants, not run yet
+  """
+
+  jobs = []
+
+  provenance = {}
+  parent = None
+  if carryForward:
+    signature = get_mutation_signature(mutationOperators)
+    parent = mutatedSources.get((generation - 1, memberNum))
+    # tmp/2/4/source
+    parentDestDir = os.path.join(config._TMP_DIR, str(generation - 1),
+      str(memberNum), config._PROJECT_SRC_DIR.replace(config._PROJECT_DIR, ''))
+    # The mutants of the last generation were deleted or made differently
+    if parent is not None and \
+      (parent[0] != signature or not os.path.isdir(parentDestDir)):
+      parent = None
+  carried = 0
+
   # tmp/2/4/project/source or input/source/
+  # Sorted, so the mutants are numbered the same way every time (see
+  # get_walk_order)
   for root, dirs, files in os.walk(sourceDir):
+    dirs.sort()
 
-    for aFile in files:
+    for aFile in sorted(files):
       if ("." in aFile and aFile.split(".")[1] == "java"):
         # core/input/source/main/net/sf/cache4j/Cache.java or
         # tmp/1/3/source/main/net/sf/cache4j/Cache.java
@@ -173,13 +336,56 @@ def recursively_mutate_project(generation, memberNum, sourceDir, destDir, \
         #logger.debug("  reldir:       {}".format(reldir))
         #logger.debug("  localDestDir: {}".format(localDestDir))
 
-        generate_all_mutants(generation, memberNum, sourceFile, localDestDir,
-                             mutationOperators)
+        if carryForward:
+          # main/net/sf/cache4j/Cache.java
+          relFile = os.path.relpath(sourceFile, sourceDir)
+          sha = blobstore.get_file_hash(sourceFile)
+          # tmp/3/4/source/main/net/sf/cache4j/Cache
+          mutantDir = os.path.join(localDestDir,
+                      os.path.splitext(aFile)[0])
+          provenance[relFile] = (sha, os.path.relpath(mutantDir, destDir))
+
+          if parent is not None and relFile in parent[1] and \
+            parent[1][relFile][0] == sha:
+            # tmp/2/4/source/main/net/sf/cache4j/Cache, if the file had any
+            # mutants
+            parentMutantDir = os.path.join(parentDestDir, parent[1][relFile][1])
+            if os.path.isdir(parentMutantDir) and \
+              not os.path.exists(mutantDir):
+              snapshot.snapshot(parentMutantDir, mutantDir)
+            carried += 1
+            continue
+
+        jobs.extend(generate_all_mutants(generation, memberNum, sourceFile,
+                                         localDestDir, mutationOperators))
+
+  if carryForward:
+    mutatedSources[(generation, memberNum)] = (signature, provenance)
+    logger.debug("Mutants of {} of {} files carried forward from generation {}."
+      .format(carried, len(provenance), generation - 1))
+
+  return jobs
+
+
+def get_mutation_signature(mutationOperators):
+  """What the mutants of a file depend on, besides its content: the operators
+  enabled and the variables found by static.py. See collect_mutant_jobs.
+
+  Returns:
+  string: the same for mutations making the same mutants of a file
+  """
+
+  return repr(([(operator[0], operator[1]) for operator in mutationOperators],
+               static._classVar, static._classMeth, static._classMethVar))
 
 
 def generate_all_mutants(generation, memberNum, sourceFile, destDir, \
   mutationOperators):
-  """See comment for recursively_mutate_project."""
+  """See comment for recursively_mutate_project.
+
+  Returns:
+  list MutantJob: the txl invocations for the file, not run yet
+  """
 
   #logger.debug("---------------------------")
   #logger.debug("  generation:      {}".format(generation))
@@ -187,17 +393,21 @@ def generate_all_mutants(generation, memberNum, sourceFile, destDir, \
   #logger.debug("  sourceFile:      {}".format(sourceFile))
   #logger.debug("  destDir:         {}".format(destDir))
 
+  jobs = []
   for operator in mutationOperators:
     if operator[1]:  # If enabled
 
       #logger.debug("operator:        {}".format(operator))
 
-      generate_mutants(generation, memberNum, operator, sourceFile, destDir)
+      jobs.append(generate_mutants(generation, memberNum, operator, sourceFile,
+                                   destDir))
+  return jobs
 
 
 def generate_mutants(generation, memberNum, txlOperator, sourceFile, destDir):
   """See comment for recursively_mutate_project.  The only new parameter here
-  is the txlOperator to apply to a file.
+  is the txlOperator to apply to a file. The txl command lines are only
+  collected here, run_mutant_jobs runs them.
 
   Example command line invocation:
     txl account ASAT_CV.Txl - -outfile account_1_1 -outdir . -class account
@@ -209,6 +419,8 @@ def generate_mutants(generation, memberNum, txlOperator, sourceFile, destDir):
   txlOperator (string): One of _MUTATION_ASAT, etc... from config.py
   sourceFile (string): The specific file from the source project we are mutating
   destDir (string): Where the project is being copied to
+  Returns:
+  MutantJob: the txl invocations making the mutants
   """
 
   # sourceFile: tmp/1/3/source/main/net/sf/cache4j/Cache.java
@@ -227,6 +439,7 @@ def generate_mutants(generation, memberNum, txlOperator, sourceFile, destDir):
     shutil.rmtree(txlDestDir)
   os.makedirs(txlDestDir)
 
+  commands = []
   counter = 1
 
   # ----- ASM ----- Add synchonized statement around the method block
@@ -243,29 +456,12 @@ def generate_mutants(generation, memberNum, txlOperator, sourceFile, destDir):
         if sourceNameOnly != lineCMV[-3]:
           continue
 
-        outFile = tempfile.SpooledTemporaryFile()
-        errFile = tempfile.SpooledTemporaryFile()
         mutantSource = sourceNameOnly + "_" + str(counter)
 
-        process = subprocess.Popen(['txl', sourceFile, config._TXL_DIR +
+        commands.append(['txl', sourceFile, config._TXL_DIR +
                 'ASM_CMV.Txl', '-', '-outfile', mutantSource, '-outdir',
                 txlDestDir, '-class', lineCMV[-3], '-method', lineCMV[-2],
-                '-syncvar', lineCMV[-1]], stdout=outFile,
-                stderr=errFile, cwd=config._PROJECT_DIR, shell=False)
-        process.wait()
-
-        # Note to self: Keep this snipped for debugging purposes
-        #
-        # outFile.seek(0)
-        # errFile.seek(0)
-        # output = outFile.read()
-        # error = errFile.read()
-        # outFile.close()
-        # errFile.close()
-        # logger.debug("Mutant generation, Output text:\n")
-        # logger.debug(output)
-        # logger.debug("Mutant generation, Error text:\n")
-        # logger.debug(error)
+                '-syncvar', lineCMV[-1]])
 
         counter += 1
 
@@ -275,30 +471,21 @@ def generate_mutants(generation, memberNum, txlOperator, sourceFile, destDir):
           continue
 
         mutantSource = sourceNameOnly + "_" + str(counter)
-        outFile = tempfile.SpooledTemporaryFile()
-        errFile = tempfile.SpooledTemporaryFile()
 
-        process = subprocess.Popen(['txl', sourceFile, config._TXL_DIR +
+        commands.append(['txl', sourceFile, config._TXL_DIR +
                 'ASM_CV.Txl', '-', '-outfile', mutantSource, '-outdir',
-                txlDestDir, '-class', lineCV[-2], '-syncvar', lineCV[-1]],
-                stdout=outFile, stderr=errFile, cwd=config._PROJECT_DIR,
-                shell=False)
-        process.wait()
+                txlDestDir, '-class', lineCV[-2], '-syncvar', lineCV[-1]])
 
         counter += 1
 
     # If we have nothing we can always fall back on using 'this' as the
     # synchronization variable
     if not static.do_we_have_CV and not static.do_we_have_CMV:
-      outFile = tempfile.SpooledTemporaryFile()
-      errFile = tempfile.SpooledTemporaryFile()
       mutantSource = sourceNameOnly + "_" + str(counter)
 
-      process = subprocess.Popen(['txl', sourceFile, config._TXL_DIR +
+      commands.append(['txl', sourceFile, config._TXL_DIR +
               'ASM_V.Txl', '-', '-outfile', mutantSource, '-outdir',
-              txlDestDir, '-syncvar', 'this'], stdout=outFile,
-              stderr=errFile, cwd=config._PROJECT_DIR, shell=False)
-      process.wait()
+              txlDestDir, '-syncvar', 'this'])
 
       counter += 1
 
@@ -306,15 +493,11 @@ def generate_mutants(generation, memberNum, txlOperator, sourceFile, destDir):
 
   # I don't think much is gained by using ASIM_C.txt or ASIM_CM.txl
   elif txlOperator is config._MUTATION_ASIM:
-    outFile = tempfile.SpooledTemporaryFile()
-    errFile = tempfile.SpooledTemporaryFile()
     mutantSource = sourceNameOnly + "_" + str(counter)
 
-    process = subprocess.Popen(['txl', sourceFile, config._TXL_DIR +
+    commands.append(['txl', sourceFile, config._TXL_DIR +
             'ASIM_RND.Txl', '-', '-outfile', mutantSource, '-outdir',
-            txlDestDir,], stdout=outFile, stderr=errFile,
-            cwd=config._PROJECT_DIR, shell=False)
-    process.wait()
+            txlDestDir,])
 
     counter += 1
 
@@ -331,16 +514,11 @@ def generate_mutants(generation, memberNum, txlOperator, sourceFile, destDir):
           syncVar = lineCMV2[-1]
 
           mutantSource = sourceNameOnly + "_" + str(counter)
-          outFile = tempfile.SpooledTemporaryFile()
-          errFile = tempfile.SpooledTemporaryFile()
 
-          process = subprocess.Popen(['txl', sourceFile, config._TXL_DIR +
+          commands.append(['txl', sourceFile, config._TXL_DIR +
                   'ASAT_CMV.Txl', '-', '-outfile', mutantSource, '-outdir',
                   txlDestDir, '-class', lineCMV[-3], '-method', lineCMV[-2],
-                  '-var', lineCMV[-1], '-syncvar', syncVar],
-                  stdout=outFile, stderr=errFile, cwd=config._PROJECT_DIR,
-                  shell=False)
-          process.wait()
+                  '-var', lineCMV[-1], '-syncvar', syncVar])
 
           counter += 1
 
@@ -354,30 +532,22 @@ def generate_mutants(generation, memberNum, txlOperator, sourceFile, destDir):
           syncVar = lineCV2[-1]
 
           mutantSource = sourceNameOnly + "_" + str(counter)
-          outFile = tempfile.SpooledTemporaryFile()
-          errFile = tempfile.SpooledTemporaryFile()
 
           # Different operator when 2 args are available
-          process = subprocess.Popen(['txl', sourceFile, config._TXL_DIR +
+          commands.append(['txl', sourceFile, config._TXL_DIR +
                   'ASAT_CV.Txl', '-', '-outfile', mutantSource, '-outdir',
                   txlDestDir, '-class', lineCV[-2], '-var', lineCV[-1],
-                  '-syncvar', syncVar], stdout=outFile, stderr=errFile,
-                  cwd=config._PROJECT_DIR, shell=False)
-          process.wait()
+                  '-syncvar', syncVar])
 
           counter += 1
 
     # We can always synchronize on the 'this' variable
     if not static.do_we_have_CV and not static.do_we_have_CMV:
       mutantSource = sourceNameOnly + "_" + str(counter)
-      outFile = tempfile.SpooledTemporaryFile()
-      errFile = tempfile.SpooledTemporaryFile()
 
-      process = subprocess.Popen(['txl', sourceFile, config._TXL_DIR +
+      commands.append(['txl', sourceFile, config._TXL_DIR +
                 'ASAT_RND.Txl', '-', '-outfile', mutantSource, '-outdir',
-                txlDestDir, '-syncvar', 'this'], stdout=outFile,
-                stderr=errFile, cwd=config._PROJECT_DIR, shell=False)
-      process.wait()
+                txlDestDir, '-syncvar', 'this'])
 
       counter += 1
 
@@ -388,27 +558,275 @@ def generate_mutants(generation, memberNum, txlOperator, sourceFile, destDir):
 
   else:
     mutantSource = sourceNameOnly + "_" + str(counter)
-    outFile = tempfile.SpooledTemporaryFile()
-    errFile = tempfile.SpooledTemporaryFile()
 
-    process = subprocess.Popen(['txl', sourceFile, txlOperator[4], '-',
-              '-outfile', mutantSource, '-outdir', txlDestDir],
-              stdout=outFile, stderr=errFile, cwd=config._PROJECT_DIR,
-              shell=False)
-    process.wait()
+    commands.append(['txl', sourceFile, txlOperator[4], '-',
+              '-outfile', mutantSource, '-outdir', txlDestDir])
 
     counter += 1
 
+  # tmp/3/4/source/main/net/sf/cache4j/Cache
+  return MutantJob(txlOperator[0], commands, txlDestDir,
+                   os.path.join(destDir, sourceNameOnly))
+
+
+class MutantJob():
+  """The txl invocations making the mutants of one file for one operator.
+
+  Attributes:
+  txlOperator (string): name of the operator, eg. ASAT
+  commands (list list string): txl command lines
+  txlDestDir (string): where the mutants are written, eg.
+    tmp/3/4/source/main/net/sf/cache4j/Cache/ASAT
+  sourceDestDir (string): directory of the mutants of the file, eg.
+    tmp/3/4/source/main/net/sf/cache4j/Cache
+  """
+
+  def __init__(self, txlOperator, commands, txlDestDir, sourceDestDir):
+    self.txlOperator = txlOperator
+    self.commands = commands
+    self.txlDestDir = txlDestDir
+    self.sourceDestDir = sourceDestDir
+
+
+def run_mutant_jobs(jobs):
+  """Run the txl invocations of the jobs, up to
+  config._TXL_PARALLEL_PROCESSES at a time, and wait for all of them. Then
+  delete the directories that didn't get any mutants.
+
+  With config._MUTANT_CACHE on, an invocation that was run before (on a file
+  with the same content, by any member, in any generation or an earlier run)
+  isn't run again. Its mutants are copied from mutant_cache.py.
+
+  Attributes:
+  jobs (list MutantJob): jobs made by generate_mutants
+  """
+
+  commands = []
+  cacheKeys = []
+  for job in jobs:
+    for command in job.commands:
+      cacheKey = None
+      if config._MUTANT_CACHE:
+        cacheKey = mutant_cache.get_key(command)
+        outFile, outDir = mutant_cache.get_output(command)
+        if mutant_cache.restore(cacheKey, outFile, outDir):
+          continue
+      commands.append(command)
+      cacheKeys.append(cacheKey)
+
+  for command, cacheKey, child in zip(commands, cacheKeys, run_txl(commands)):
+    if child.returncode == 0:
+      outFile, outDir = mutant_cache.get_output(command)
+      mutant_cache.store(cacheKey, outFile, outDir)
 
   # Cleanup: Delete empty directories
-  # tmp/3/4/source/main/net/sf/cache4j/Cache/ASAT
-  if sum((len(f) for _, _, f in os.walk(txlDestDir))) == 0:
-    shutil.rmtree(txlDestDir)
+  for job in jobs:
+    # tmp/3/4/source/main/net/sf/cache4j/Cache/ASAT
+    if os.path.exists(job.txlDestDir) and \
+      sum((len(f) for _, _, f in os.walk(job.txlDestDir))) == 0:
+      shutil.rmtree(job.txlDestDir)
 
-  # tmp/3/4/source/main/net/sf/cache4j/Cache
-  sourceDestDir = os.path.join(destDir, sourceNameOnly)
-  if sum((len(f) for _, _, f in os.walk(sourceDestDir))) == 0:
-    shutil.rmtree(sourceDestDir)
+    # tmp/3/4/source/main/net/sf/cache4j/Cache
+    if os.path.exists(job.sourceDestDir) and \
+      sum((len(f) for _, _, f in os.walk(job.sourceDestDir))) == 0:
+      shutil.rmtree(job.sourceDestDir)
+
+
+def run_txl(commands):
+  """Run txl command lines, up to config._TXL_PARALLEL_PROCESSES at a time,
+  and wait for all of them.
+
+  Attributes:
+  commands (list list string): txl command lines
+  Returns:
+  list Child: the finished txl processes (see supervisor.py), in the order of
+    commands
+  """
+
+  children = [None] * len(commands)
+  supervisor = Supervisor()
+  started = 0
+
+  try:
+    while started < len(commands) or supervisor.running() > 0:
+      while started < len(commands) and \
+        supervisor.running() < max(1, config._TXL_PARALLEL_PROCESSES):
+        supervisor.start(commands[started], config._PROJECT_DIR, float('inf'),
+                         started)
+        started += 1
+
+      for child in supervisor.wait_any():
+        # Note to self: Keep this snipped for debugging purposes
+        #
+        # logger.debug("Mutant generation, Output text:\n")
+        # logger.debug(child.output)
+        # logger.debug("Mutant generation, Error text:\n")
+        # logger.debug(child.error)
+        children[child.tag] = child
+  finally:
+    supervisor.kill_all()
+
+  return children
+
+
+def count_project_mutants(generation, memberNum, mutationOperators):
+  """config._LAZY_MUTANTS: Stands in for mutate_project and
+  generate_representation. The mutants of a member are counted, not written:
+  txl is run with -count (see WriteMutants.Txl), which only prints the names
+  of the mutants. The invocations in the mutant cache aren't run at all.
+
+  uniqueMutants is filled in as if the mutants were written, and
+  mutantCommands with the invocation writing each of them. A mutant is only
+  written when it is drawn (see realize_mutant).
+
+  Attributes:
+  generation (int): Current generation of the evolutionary strategy
+  memberNum (int): Which member of the population we are mutating
+  mutationOperators ([list]): one of {config._FUNCTIONAL_MUTATIONS,
+    config._NONFUNCTIONAL_MUTATIONS}
+  Returns:
+  dict: number of mutants by operator, like generate_representation
+  """
+
+  # Optimization: Like in mutate_project, in generation 1 every member has
+  #   the mutants of member 1. Only their directory differs
+  if generation == 1:
+    make_first_member_mutants(mutationOperators, count_member_mutants)
+
+    representation = {}
+    for mutationOp in mutationOperators:
+      representation[mutationOp[0]] = 0
+
+    if memberNum > 1:
+      remove_member_mutants(1, memberNum)
+      # tmp/1/1/ -> tmp/1/2/
+      srcPrefix = os.path.join(config._TMP_DIR, str(1), str(1), '')
+      destPrefix = os.path.join(config._TMP_DIR, str(1), str(memberNum), '')
+      for key in [key for key in mutantCommands.keys() if key[:2] == (1, 1)]:
+        newKey = (1, memberNum) + key[2:]
+        uniqueMutants[newKey] = uniqueMutants[key].replace(srcPrefix, destPrefix, 1)
+        mutantCommands[newKey] = [arg.replace(srcPrefix, destPrefix, 1)
+                                  for arg in mutantCommands[key]]
+
+    for key in mutantCommands.keys():
+      if key[:2] == (1, memberNum) and key[2] in representation:
+        representation[key[2]] = max(representation[key[2]], key[3])
+    return representation
+
+  return count_member_mutants(generation, memberNum, mutationOperators)
+
+
+def remove_member_mutants(generation, memberNum):
+  """Forget the mutants uniqueMutants and mutantCommands have for a member."""
+
+  for key in [key for key in uniqueMutants.keys()
+              if key[0] == generation and key[1] == memberNum]:
+    del uniqueMutants[key]
+    mutantCommands.pop(key, None)
+
+
+def count_member_mutants(generation, memberNum, mutationOperators):
+  """The work of count_project_mutants, without the generation 1
+  optimization."""
+
+  remove_member_mutants(generation, memberNum)
+
+  representation = {}
+  for mutationOp in mutationOperators:
+    representation[mutationOp[0]] = 0
+
+  sourceDir, destDir = get_mutation_dirs(generation, memberNum)
+  jobs = collect_mutant_jobs(generation, memberNum, sourceDir, destDir,
+                             mutationOperators)
+
+  # Commands whose mutants aren't in the cache are run to count them. With
+  # config._INCREMENTAL_MUTATION, neither are the commands counted before
+  # (the files that didn't change since the last generation)
+  counts = {}
+  countCommands = []
+  countKeys = []
+  for job in jobs:
+    for command in job.commands:
+      count = None
+      cacheKey = None
+      if config._MUTANT_CACHE or config._INCREMENTAL_MUTATION:
+        cacheKey = mutant_cache.get_key(command)
+      if config._INCREMENTAL_MUTATION:
+        count = mutantCounts.get(cacheKey)
+      if count is None and config._MUTANT_CACHE:
+        count = mutant_cache.count(cacheKey)
+      if count is None:
+        countCommands.append(command)
+        countKeys.append(cacheKey)
+      else:
+        counts[id(command)] = count
+
+  for command, cacheKey, child in zip(countCommands, countKeys,
+                            run_txl([command + ['-count'] for command in countCommands])):
+    outFile = mutant_cache.get_output(command)[0]
+    # Each mutant's name is printed once, eg. "Cache_1_2.java"
+    names = re.findall(r'^"?' + re.escape(outFile) + r'_(\d+)\.java"?\s*$',
+                       child.output + "\n" + child.error, re.M)
+    counts[id(command)] = len(set(names))
+    if config._INCREMENTAL_MUTATION and cacheKey is not None and \
+      child.returncode == 0:
+      mutantCounts[cacheKey] = counts[id(command)]
+
+  for job in jobs:
+    for command in job.commands:
+      outFile, outDir = mutant_cache.get_output(command)
+      for number in xrange(1, counts[id(command)] + 1):
+        representation[job.txlOperator] += 1
+        key = (generation, memberNum, job.txlOperator,
+               representation[job.txlOperator])
+        # tmp/3/4/source/main/net/sf/cache4j/Cache/ASAT/Cache_1_2.java
+        uniqueMutants[key] = os.path.join(outDir,
+                             "{}_{}.java".format(outFile, number))
+        mutantCommands[key] = command
+
+    # Nothing was written, the directories are made again by realize_mutant
+    for aDir in (job.txlDestDir, job.sourceDestDir):
+      if os.path.isdir(aDir) and \
+        sum((len(f) for _, _, f in os.walk(aDir))) == 0:
+        shutil.rmtree(aDir)
+
+  return representation
+
+
+def realize_mutant(generation, memberNum, txlOperator, mutantNum):
+  """config._LAZY_MUTANTS: Make sure the file of a mutant exists, running the
+  txl invocation that writes it (or copying its mutants from the mutant
+  cache) if it doesn't. Without config._LAZY_MUTANTS every mutant exists.
+
+  Attributes:
+  generation (int): Current generation of the evolutionary strategy
+  memberNum (int): Which member of the population we are dealing with
+  txlOperator (string): Operator of the mutant, eg. ASAT
+  mutantNum (int): Number of the mutant, see uniqueMutants
+  Returns:
+  boolean: Does the mutant file exist?
+  """
+
+  key = (generation, memberNum, txlOperator, mutantNum)
+  mutantFile = uniqueMutants.get(key)
+  if mutantFile is None:
+    return False
+  if os.path.exists(mutantFile) or key not in mutantCommands:
+    return os.path.exists(mutantFile)
+
+  command = mutantCommands[key]
+  outDir = mutant_cache.get_output(command)[1]
+  # The directory txl expects was removed by count_project_mutants
+  if not os.path.isdir(outDir):
+    os.makedirs(outDir)
+  run_mutant_jobs([MutantJob(txlOperator, [command], outDir,
+                             os.path.dirname(outDir))])
+
+  if not os.path.exists(mutantFile):
+    logger.error("txl didn't write the {} mutant {}".format(txlOperator,
+                 mutantFile))
+    return False
+  return True
 
 
 def generate_representation(generation, memberNum, mutationOperators):
@@ -444,11 +862,31 @@ def generate_representation(generation, memberNum, mutationOperators):
          rep, mutationOperators)
 
 
+def get_walk_order(relFile):
+  """Sort key putting the files of a tree in the order a sorted walk finds
+  them (see collect_mutant_jobs): the files of a directory, by name, before
+  its subdirectories, which are taken by name.
+
+  Attributes:
+  relFile (string): file relative to the top of the tree
+  Returns:
+  list: compares like the positions of the files in the walk
+  """
+
+  parts = relFile.split(os.sep)
+  return [(1, part) for part in parts[:-1]] + [(0, parts[-1])]
+
+
 def recursive_generate_representation(generation, memberNum, recDir, \
   representation, mutationOperators):
   """See the documentation for generate_representation
   """
 
+  # The mutants are numbered in the order count_project_mutants numbers them
+  # with config._LAZY_MUTANTS: by the source file they were made from (in the
+  # order collect_mutant_jobs finds it), then by txl invocation and by mutant.
+  # (order, mutant file, operator)
+  mutants = []
   for root, dirs, files in os.walk(recDir):
 
     #for aDir in dirs:
@@ -460,19 +898,33 @@ def recursive_generate_representation(generation, memberNum, recDir, \
     for aFile in files:
       # Find the operator
       for mutationOp in mutationOperators:
+        # tmp/3/4/source/main/net/sf/cache4j/Cache/ASAT holds ASAT mutants
+        if os.path.basename(root) != mutationOp[0]:
+          continue
 
-        representation[mutationOp[0]] += 1
-        # uniqueMutants at {1, 1, ASAT, 1} = /Users/kelk/workspace
-        #  /CORE-Test-Suite/test_area/core/tmp/1/1/Account/ASAT
-        #  /ASAT_Account_1.java_1
-        #logger.debug("uniqueMutants at {}, {}, {}, {} = {}".format(generation,
-        #           memberNum, mutationOp[0], rep[mutationOp[0]],
-        #           os.path.join(root, aDir)))
-        uniqueMutants[(generation, memberNum, mutationOp[0],
-                    representation[mutationOp[0]])] = os.path.join(root, aFile)
-
-        # Representation: {'RSM': 0, 'ASIM': 4, 'ASAT': 5, ...
-        #logger.debug("Representation at file step: {}".format(representation))
+        # main/net/sf/cache4j/Cache.java
+        sourceFile = os.path.relpath(os.path.dirname(root), recDir) + ".java"
+        # Cache_1_2.java is mutant 2 of invocation 1
+        numbers = re.search(r'_(\d+)_(\d+)\.java$', aFile)
+        if numbers is not None:
+          numbers = (int(numbers.group(1)), int(numbers.group(2)))
+        mutants.append(((get_walk_order(sourceFile), numbers, aFile),
+                        os.path.join(root, aFile), mutationOp))
+
+  mutants.sort()
+  for order, mutantFile, mutationOp in mutants:
+    representation[mutationOp[0]] += 1
+    # uniqueMutants at {1, 1, ASAT, 1} = /Users/kelk/workspace
+    #  /CORE-Test-Suite/test_area/core/tmp/1/1/Account/ASAT
+    #  /ASAT_Account_1.java_1
+    #logger.debug("uniqueMutants at {}, {}, {}, {} = {}".format(generation,
+    #           memberNum, mutationOp[0], rep[mutationOp[0]],
+    #           os.path.join(root, aDir)))
+    uniqueMutants[(generation, memberNum, mutationOp[0],
+                   representation[mutationOp[0]])] = mutantFile
+
+    # Representation: {'RSM': 0, 'ASIM': 4, 'ASAT': 5, ...
+    #logger.debug("Representation at file step: {}".format(representation))
 
   #logger.debug("Representation at end: {}".format(representation))
 
@@ -494,7 +946,17 @@ def clean_up_mutants(generation, memberNum):
   cleanDir = os.path.join(config._TMP_DIR, str(generation), str(memberNum), \
     "source")
 
-  send2trash(cleanDir);
+  # Deleted in the background, see reclaimer.py
+  reclaimer.reclaim(cleanDir)
+
+  # The test harnesses of the member's workarea (tmp/3/4/workarea/ or, with
+  # config._BUILD_IN_PLACE, tmp/3/4/project/) aren't needed anymore
+  harness.release_harnesses(os.path.join(config._TMP_DIR, str(generation),
+    str(memberNum)))
+
+  # Per-member workareas are only used when members are evaluated concurrently
+  if has_own_workarea(generation, memberNum):
+    reclaimer.reclaim(get_workarea(generation, memberNum))
   #for root, dirs, files in os.walk(cleanDir):
   #  for aDir in dirs:
   #    if aDir <> "project":
@@ -532,15 +994,29 @@ def create_local_project(generation, memberNum, restart, switchGeneration=0):
   # gen for non-functional)
   if generation is 1 or restart:
     if switchGeneration > 0:
-      # tmp/1/3/project
-      srcDir = os.path.join(config._TMP_DIR, str(switchGeneration), staticPart)
+      srcGeneration = switchGeneration
     else:
-      # /input
-      srcDir = config._PROJECT_PRISTINE_DIR
+      srcGeneration = None
   else:
     # Note: generation - 1 vs generation
-    # tmp/2/3/project
-    srcDir = os.path.join(config._TMP_DIR, str(generation - 1), staticPart)
+    srcGeneration = generation - 1
+
+  if srcGeneration is None:
+    edits = ()
+  else:
+    edits = projectEdits.get((srcGeneration, memberNum), ())
+
+  if config._DELTA_INDIVIDUALS:
+    set_local_project(generation, memberNum, edits)
+    return
+  projectEdits[(generation, memberNum)] = edits
+
+  if srcGeneration is None:
+    # /input
+    srcDir = config._PROJECT_PRISTINE_DIR
+  else:
+    # tmp/1/3/project or tmp/2/3/project
+    srcDir = get_local_project(srcGeneration, memberNum)
 
   # tmp/3/3/project
   destDir = os.path.join(config._TMP_DIR, str(generation), staticPart)
@@ -550,9 +1026,19 @@ def create_local_project(generation, memberNum, restart, switchGeneration=0):
   #logger.debug("srcDir:     {} {}".format(srcDir, os.path.exists(srcDir)))
   #logger.debug("destDir:    {} {}".format(destDir,  os.path.exists(destDir)))
 
+  # With config._BUILD_IN_PLACE the parent was tested in srcDir
   if os.path.exists(destDir):
     shutil.rmtree(destDir)
-  shutil.copytree(srcDir, destDir, ignore=ignore_patterns('java.*'))
+  snapshot.snapshot(srcDir, destDir, ignore=_TEST_OUTPUT)
+
+  # The pristine project has no classes. Use the ones compiled at startup
+  # so mutants can be compiled incrementally
+  pristineClassDir = get_pristine_class_dir()
+  destClassDir = os.path.join(destDir,
+                 config._PROJECT_CLASS_DIR.replace(config._PROJECT_DIR, ''))
+  if config._INCREMENTAL_COMPILE and srcDir == config._PROJECT_PRISTINE_DIR \
+    and os.path.isdir(pristineClassDir) and not os.path.exists(destClassDir):
+    snapshot.snapshot(pristineClassDir, destClassDir)
 
 
 def copy_local_project_a_to_b(generationSrc, memberNumSrc, generationDst, \
@@ -569,8 +1055,14 @@ def copy_local_project_a_to_b(generationSrc, memberNumSrc, generationDst, \
   #logger.debug("Gen: {} Mem: {}  ->  Gen: {} Mem: {} ".format(generationSrc,
   #                              memberNumSrc, generationDst, memberNumDst))
 
-  srcDir = os.path.join(config._TMP_DIR, str(generationSrc), str(memberNumSrc),
-           'project')
+  edits = projectEdits.get((generationSrc, memberNumSrc), ())
+  if config._DELTA_INDIVIDUALS:
+    # Copying the edits is enough
+    set_local_project(generationDst, memberNumDst, edits)
+    return
+  projectEdits[(generationDst, memberNumDst)] = edits
+
+  srcDir = get_local_project(generationSrc, memberNumSrc)
 
   destDir = os.path.join(config._TMP_DIR, str(generationDst), str(memberNumDst),
             'project')
@@ -580,10 +1072,92 @@ def copy_local_project_a_to_b(generationSrc, memberNumSrc, generationDst, \
 
   if os.path.exists(destDir):
     shutil.rmtree(destDir)
-  shutil.copytree(srcDir, destDir)
+  snapshot.snapshot(srcDir, destDir, ignore=_TEST_OUTPUT)
+
+
+def get_local_project(generation, memberNum):
+  """Return the local project of a member, making the directory from its
+  edits first if it hasn't been made yet (see materialize_local_project).
+
+  Attributes:
+  generation (int): Generation of the local project
+  memberNum (int): Which member of the population we are dealing with
+  Returns:
+  string: tmp/gen/member/project
+  """
+
+  if (generation, memberNum) in unmaterialized:
+    materialize_local_project(generation, memberNum)
+
+  # tmp/3/4/project
+  return os.path.join(config._TMP_DIR, str(generation), str(memberNum),
+         'project')
+
+
+def set_local_project(generation, memberNum, edits):
+  """config._DELTA_INDIVIDUALS: Make a local project by giving it its edits.
+  The directory is made when it is needed.
+
+  Attributes:
+  generation (int): Generation of the local project
+  memberNum (int): Which member of the population we are dealing with
+  edits (tuple): edits of the pristine project, see projectEdits
+  """
+
+  destDir = os.path.join(config._TMP_DIR, str(generation), str(memberNum),
+            'project')
+  if os.path.exists(destDir):
+    shutil.rmtree(destDir)
+
+  projectEdits[(generation, memberNum)] = edits
+  unmaterialized.add((generation, memberNum))
+
 
+def materialize_local_project(generation, memberNum):
+  """Make the directory of a local project known only by its edits: a
+  snapshot of the pristine project with the mutants of the edits moved in.
 
-def move_mutant_to_local_project(generation, memberNum, txlOperator, mutantNum):
+  The classes come from the pristine classes for an unmutated project, or
+  from the compile cache (a project with these edits was compiled before).
+  Otherwise the project has no classes and compile_project rebuilds it.
+
+  Attributes:
+  generation (int): Generation of the local project
+  memberNum (int): Which member of the population we are dealing with
+  """
+
+  unmaterialized.discard((generation, memberNum))
+  edits = projectEdits.get((generation, memberNum), ())
+
+  # tmp/3/4/project
+  destDir = os.path.join(config._TMP_DIR, str(generation), str(memberNum),
+            'project')
+  if os.path.exists(destDir):
+    shutil.rmtree(destDir)
+  snapshot.snapshot(config._PROJECT_PRISTINE_DIR, destDir,
+                    ignore=ignore_patterns('java.*'))
+
+  for changedFile, txlOperator, sha in edits:
+    snapshot.replace_file(blobstore.get_blob_path(sha),
+                          os.path.join(destDir, changedFile))
+
+  classDir = os.path.join(destDir,
+             config._PROJECT_CLASS_DIR.replace(config._PROJECT_DIR, ''))
+  pristineClassDir = get_pristine_class_dir()
+  if len(edits) == 0:
+    if config._INCREMENTAL_COMPILE and os.path.isdir(pristineClassDir) \
+      and not os.path.exists(classDir):
+      snapshot.snapshot(pristineClassDir, classDir)
+  elif config._COMPILE_CACHE:
+    compile_cache.restore(compile_cache.get_key(os.path.join(destDir, '')),
+                          classDir)
+
+  #logger.debug("Made local project {}/{} from {} edits".format(generation,
+  #  memberNum, len(edits)))
+
+
+def move_mutant_to_local_project(generation, memberNum, txlOperator, mutantNum,
+  projectDir=None):
   """After the files have been mutated and the local project formed (by copying
   it into tmp/gen/member/project/), move a mutated file to the local project
 
@@ -592,6 +1166,10 @@ def move_mutant_to_local_project(generation, memberNum, txlOperator, mutantNum):
   memberNum (int): Which member of the population we are dealing with
   txlOperator (string): Selected TXL operator (eg: ASAT)
   mutantNum (int): Mutant number selected from the mutant dir
+  projectDir (string): project to move the mutant to, the local project
+    (tmp/gen/member/project/) if None
+  Returns:
+  string: path of the replaced file, relative to the project directory
   """
 
   #logger.debug("Op: {} -> Gen: {} Mem: {} ".format(txlOperator, generation, memberNum))
@@ -602,10 +1180,62 @@ def move_mutant_to_local_project(generation, memberNum, txlOperator, mutantNum):
   # tmp/3/4/source/main/net/sf/cache4j/CacheCleaner/ASAT/CacheCleaner_1_1.java
   sourceFile = uniqueMutants[(generation, memberNum, txlOperator, mutantNum)]
 
+  localProject = projectDir is None
+  if localProject:
+    # tmp/3/4/project
+    projectDir = get_local_project(generation, memberNum)
+
   # Put together the destination DIRECTORY of the mutant
   # tmp/3/4/project/source/
-  baseDestPath = os.path.join(config._TMP_DIR, str(generation), str(memberNum),
-                'project', config._PROJECT_SRC_DIR.replace(config._PROJECT_DIR, ''))
+  baseDestPath = os.path.join(projectDir,
+                 config._PROJECT_SRC_DIR.replace(config._PROJECT_DIR, ''))
+
+  # tmp/3/4/project/source/main/net/sf/cache4j/CacheCleaner.java
+  destFile = os.path.join(baseDestPath, get_mutated_file(generation, memberNum,
+             sourceFile))
+  destPath = os.path.split(destFile)[0]
+
+  #logger.debug("---------------------------")
+  #logger.debug("  txlOperator:   {}".format(txlOperator))
+  #logger.debug("  destFile:      {}".format(destFile))
+
+  if not os.path.exists(destPath):
+    os.makedirs(destPath)
+
+  #logger.debug("Moving mutant to local project:")
+  #logger.debug("  sourceFile: {}".format(sourceFile))
+  #logger.debug("  destFile:   {}".format(destFile))
+
+  # Don't write through a hard link to the parent project
+  snapshot.replace_file(sourceFile, destFile)
+
+  # source/main/net/sf/cache4j/CacheCleaner.java
+  changedFile = os.path.relpath(destFile, projectDir)
+
+  if localProject:
+    if config._DELTA_INDIVIDUALS:
+      # Keep the mutant, the local project may be made from its edits later
+      sha = os.path.basename(blobstore.store_file(sourceFile))
+    else:
+      sha = blobstore.get_file_hash(sourceFile)
+    projectEdits[(generation, memberNum)] = projectEdits.get((generation,
+      memberNum), ()) + ((changedFile, txlOperator, sha),)
+
+  return changedFile
+
+
+def get_mutated_file(generation, memberNum, sourceFile):
+  """Find the project file a mutant replaces.
+
+  Attributes:
+  generation (int): Current generation of the evolutionary strategy
+  memberNum (int): Which member of the population we are dealing with
+  sourceFile (string): the mutant, eg.
+    tmp/3/4/source/main/net/sf/cache4j/CacheCleaner/ASAT/CacheCleaner_1_1.java
+  Returns:
+  string: path of the replaced file relative to the source directory, eg.
+    main/net/sf/cache4j/CacheCleaner.java
+  """
 
   # Compute the relative part of the directory
   # Given:
@@ -631,68 +1261,328 @@ def move_mutant_to_local_project(generation, memberNum, txlOperator, mutantNum):
   # _1_1.java -> .java
   cleanFileName = re.sub("_\d+_\d+.java", ".java", cleanFileName)
 
-  # Full path of the destination of the mutant
-  # tmp/3/4/project/source/main/net/sf/cache4j
-  destPath = os.path.join(baseDestPath, relPart)
-  # tmp/3/4/project/source/main/net/sf/cache4j/CacheCleaner.java
-  destFile = os.path.join(destPath, cleanFileName)
-
-  #logger.debug("---------------------------")
-  #logger.debug("  txlOperator:   {}".format(txlOperator))
-  #logger.debug("  basePath:      {}".format(baseDstPath))
   #logger.debug("  relPart:       {}".format(relPart))
   #logger.debug("  cleanFileName: {}".format(cleanFileName))
 
-  if not os.path.exists(destPath):
-    os.makedirs(destPath)
+  # main/net/sf/cache4j/CacheCleaner.java
+  return os.path.join(relPart, cleanFileName)
 
-  #logger.debug("Moving mutant to local project:")
-  #logger.debug("  sourceFile: {}".format(sourceFile))
-  #logger.debug("  destFile:   {}".format(destFile))
 
-  shutil.copy(sourceFile, destFile)
+def probe_mutants(generation, memberNum):
+  """Compile all of the mutants of a member in one go, against the classes of
+  the project they were made from, and record which ones compile in
+  compilableMutants. mutation() only draws mutants that compile.
+
+  The probe needs the compile server and the classes of the parent project
+  (see config._INCREMENTAL_COMPILE). Without them nothing is recorded and
+  every mutant is assumed to compile.
+
+  Attributes:
+  generation (int): Current generation of the evolutionary strategy
+  memberNum (int): Which member of the population we are dealing with
+  """
+
+  keys = sorted([key for key in uniqueMutants.keys()
+                 if key[0] == generation and key[1] == memberNum])
+  for key in keys:
+    compilableMutants.pop(key, None)
+
+  if not config._PROBE_MUTANTS or not config._USE_COMPILE_SERVER \
+    or not config._INCREMENTAL_COMPILE or config._PROJECT_CLASSPATH is None \
+    or len(keys) == 0:
+    return
+
+  # The mutants were made from the same project as in mutate_project
+  classPart = config._PROJECT_CLASS_DIR.replace(config._PROJECT_DIR, '')
+  if generation == 1:
+    # input/
+    parentDir = config._PROJECT_PRISTINE_DIR
+    parentClassDir = get_pristine_class_dir()
+  else:
+    # tmp/2/4/project/
+    parentDir = os.path.join(get_local_project(generation - 1, memberNum), '')
+    parentClassDir = os.path.join(parentDir, classPart)
+
+  if not os.path.isdir(parentClassDir) or len(os.listdir(parentClassDir)) == 0:
+    return
+
+  classpath = parentClassDir + ":" + ProjectContext(parentDir).classpath
+  mutantFiles = [uniqueMutants[key] for key in keys]
+  sourceNames = [get_mutated_file(generation, memberNum, mutantFile)
+                 for mutantFile in mutantFiles]
+
+  verdicts = run_javac.probe_mutants(mutantFiles, sourceNames, classpath)
+  if verdicts is None:
+    return
+
+  for key, verdict in zip(keys, verdicts):
+    compilableMutants[key] = verdict
+
+  logger.debug("{} of the {} mutants of member {} compile".format(
+    verdicts.count(True), len(verdicts), memberNum))
+
+
+def is_compilable(generation, memberNum, txlOperator, mutantNum):
+  """Does a mutant compile, according to probe_mutants?
+
+  Attributes:
+  generation (int): Current generation of the evolutionary strategy
+  memberNum (int): Which member of the population we are dealing with
+  txlOperator (string): Selected TXL operator (eg: ASAT)
+  mutantNum (int): Mutant number selected from the mutant dir
+  Returns:
+  boolean: False if the mutant is known not to compile, True otherwise
+  """
+
+  return compilableMutants.get((generation, memberNum, txlOperator, mutantNum),
+                               True)
+
+
+def get_workarea(generation, memberNum):
+  """Return the directory a member's project is compiled and tested in.
+  Normally every member shares config._PROJECT_DIR. When several members are
+  evaluated at the same time (config._EVOLUTION_PARALLEL_MEMBERS > 1) each
+  member gets its own workarea next to its local project. With
+  config._BUILD_IN_PLACE the local project itself is the workarea.
+
+  Attributes:
+  generation (int): Current generation of the evolutionary strategy
+  memberNum (int): Which member of the population we are dealing with
+  Returns:
+  string: workarea directory, ending with a separator like config._PROJECT_DIR
+  """
+
+  if config._BUILD_IN_PLACE:
+    # tmp/3/4/project/
+    return os.path.join(get_local_project(generation, memberNum), '')
+
+  if config._EVOLUTION_PARALLEL_MEMBERS <= 1:
+    return config._PROJECT_DIR
+
+  # tmp/3/4/workarea/
+  return os.path.join(config._TMP_DIR, str(generation), str(memberNum),
+         'workarea', '')
+
+
+def get_context(generation, memberNum):
+  """Return the paths the compile, ConTest and JPF use for a member.
+
+  Attributes:
+  generation (int): Current generation of the evolutionary strategy
+  memberNum (int): Which member of the population we are dealing with
+  Returns:
+  ProjectContext: the member's workarea, see get_workarea
+  """
+
+  return ProjectContext(get_workarea(generation, memberNum))
+
+
+def has_own_workarea(generation, memberNum):
+  """Is the member's workarea a copy of its own, to be deleted once the
+  member is done with it? Not when it is the shared config._PROJECT_DIR or,
+  with config._BUILD_IN_PLACE, the local project.
+
+  Attributes:
+  generation (int): Current generation of the evolutionary strategy
+  memberNum (int): Which member of the population we are dealing with
+  Returns:
+  boolean: True if the workarea can be deleted
+  """
+
+  if config._BUILD_IN_PLACE:
+    return False
+
+  workarea = get_workarea(generation, memberNum)
+  return workarea != config._PROJECT_DIR and os.path.exists(workarea)
 
 
 def move_local_project_to_workarea(generation, memberNum):
   """When the mutants are generated, project assembled and mutant copied
   in, the final step is to copy the local project to the work area
-  directory and compile it.
+  directory and compile it. With config._BUILD_IN_PLACE there is nothing to
+  copy, the local project is compiled where it is.
 
   Attributes:
   generation (int): Current generation of the evolutionary strategy
   memberNum (int): Which member of the population we are dealing with
   """
 
-  srcDir = os.path.join(config._TMP_DIR, str(generation), str(memberNum),
-           'project')
+  # The member is done testing in its workarea of the last generation, so only
+  # one test harness JVM per member stays up
+  harness.release_harnesses(os.path.join(config._TMP_DIR, str(generation - 1),
+    str(memberNum)))
+
+  if config._BUILD_IN_PLACE:
+    # Makes the directory of a delta individual
+    get_local_project(generation, memberNum)
+    return
+
+  srcDir = get_local_project(generation, memberNum)
+  workarea = get_workarea(generation, memberNum)
 
   #logger.debug("Moving local project to work area:")
-  #logger.debug("\nSrc: {}\nDst: {}".format(srcDir, config._PROJECT_DIR))
+  #logger.debug("\nSrc: {}\nDst: {}".format(srcDir, workarea))
+
+  # A test harness still running in the old copy of the workarea would test
+  # in a deleted directory
+  harness.release_harnesses(workarea)
+
+  if os.path.exists(workarea):
+    shutil.rmtree(workarea)
+  snapshot.snapshot(srcDir, workarea, ignore=_TEST_OUTPUT)
+
+
+def get_sandbox(generation, memberNum, slot):
+  """Return the directory a candidate mutant is compiled in when several
+  candidates of a member are compiled at once (config._SPECULATIVE_COMPILES).
+
+  Attributes:
+  generation (int): Current generation of the evolutionary strategy
+  memberNum (int): Which member of the population we are dealing with
+  slot (int): Which of the candidates being compiled
+  Returns:
+  string: sandbox directory, ending with a separator like config._PROJECT_DIR
+  """
+
+  # tmp/3/4/speculative/2/
+  return os.path.join(config._TMP_DIR, str(generation), str(memberNum),
+         'speculative', str(slot), '')
 
-  if os.path.exists(config._PROJECT_DIR):
-    shutil.rmtree(config._PROJECT_DIR)
-  shutil.copytree(srcDir, config._PROJECT_DIR)
 
+def create_sandbox(generation, memberNum, slot):
+  """Copy the local project to a sandbox, so a candidate mutant can be moved
+  into it and compiled without disturbing the other candidates.
 
-def compile_project():
-  """After the local project is copied to the work area, compile it."""
+  Attributes:
+  generation (int): Current generation of the evolutionary strategy
+  memberNum (int): Which member of the population we are dealing with
+  slot (int): Which of the candidates being compiled
+  Returns:
+  string: sandbox directory
+  """
+
+  srcDir = get_local_project(generation, memberNum)
+  sandbox = get_sandbox(generation, memberNum, slot)
+
+  if os.path.exists(sandbox):
+    shutil.rmtree(sandbox)
+  snapshot.snapshot(srcDir, sandbox, ignore=_TEST_OUTPUT)
+  return sandbox
 
-  if not os.path.isfile(config._PROJECT_DIR + 'build.xml'):
+
+def move_sandbox_to_workarea(generation, memberNum, slot):
+  """The candidate compiled in a sandbox was chosen. Make the sandbox, which
+  already holds its classes, the member's work area.
+
+  Attributes:
+  generation (int): Current generation of the evolutionary strategy
+  memberNum (int): Which member of the population we are dealing with
+  slot (int): Which of the candidates was chosen
+  """
+
+  workarea = get_workarea(generation, memberNum)
+
+  if os.path.exists(workarea):
+    shutil.rmtree(workarea)
+  # A rename when tmp/ and the work area are on the same file system
+  shutil.move(get_sandbox(generation, memberNum, slot), workarea)
+
+
+def clean_up_sandboxes(generation, memberNum):
+  """Delete the sandboxes of a member once a candidate was chosen.
+
+  Attributes:
+  generation (int): Current generation of the evolutionary strategy
+  memberNum (int): Which member of the population we are dealing with
+  """
+
+  # tmp/3/4/speculative
+  sandboxDir = os.path.join(config._TMP_DIR, str(generation), str(memberNum),
+               'speculative')
+  reclaimer.reclaim(sandboxDir)
+
+
+def compile_project(context=None, changedFile=None):
+  """After the local project is copied to the work area, compile it.
+
+  A mutant differs from the project it was made from by one file. When the
+  classes of that project were copied along with it, only the mutated file is
+  compiled (see compile_changed_file). Otherwise, or with
+  config._INCREMENTAL_COMPILE off, the whole project is rebuilt with ant.
+
+  With config._COMPILE_CACHE on, a project that was compiled before (by any
+  member, in any generation or an earlier run) isn't compiled again. See
+  compile_cache.py.
+
+  Attributes:
+  context (ProjectContext): project to compile, config._PROJECT_DIR if None
+  changedFile (string): the only source file (relative to the project) that
+    differs from the existing classes, or None to rebuild everything
+  Returns:
+  boolean: Did the project compile?
+  """
+
+  if context is None:
+    context = ProjectContext()
+  classDir = context.classDir
+
+  cacheKey = None
+  if config._COMPILE_CACHE:
+    cacheKey = compile_cache.get_key(context.projectDir)
+    compiled = compile_cache.restore(cacheKey, classDir)
+    if compiled is not None:
+      return compiled
+
+  if changedFile is not None and config._INCREMENTAL_COMPILE \
+    and context.classpath is not None and os.path.isdir(classDir) \
+    and len(os.listdir(classDir)) > 0:
+    compiled, diagnosed = compile_changed_file(context, changedFile)
+  elif not os.path.isfile(context.projectDir + 'build.xml'):
     logger.error("No ant build.xml file found in workarea directory")
     return False
-  #else:
-  #  logger.debug("Compiling new source files")
+  else:
+    #logger.debug("Compiling new source files")
+    compiled, diagnosed = compile_with_ant(context)
+
+  # A compile that failed without errors in the sources (javac didn't start,
+  # ran out of memory, ...) could succeed the next time, so it isn't cached
+  if compiled or diagnosed:
+    compile_cache.store(cacheKey, compiled, classDir)
+  return compiled
+
+
+def has_compile_errors(text):
+  """Did javac report errors in the sources (File.java:12: ...)?
+
+  Attributes:
+  text (string): what javac, or ant running it, printed
+  Returns:
+  boolean: Are there diagnostics about the sources in the text?
+  """
+
+  return re.search("\.java:\d+: ", text) is not None
+
+
+def compile_with_ant(context):
+  """Rebuild the whole project with the ant compile target.
+
+  Attributes:
+  context (ProjectContext): project to compile
+  Returns:
+  (boolean, boolean): Did the project compile, and did javac report errors
+    in the sources?
+  """
 
   outFile = tempfile.SpooledTemporaryFile()
   errFile = tempfile.SpooledTemporaryFile()
 
-  if os.path.exists(config._PROJECT_CLASS_DIR):
-    shutil.rmtree(config._PROJECT_CLASS_DIR)
-  os.mkdir(config._PROJECT_CLASS_DIR)
+  if os.path.exists(context.classDir):
+    shutil.rmtree(context.classDir)
+  os.mkdir(context.classDir)
 
   # Make an ant call to compile the program
   antProcess = subprocess.Popen(['ant', config._PROJECT_COMPILE], stdout=outFile,
-                      stderr=errFile, cwd=config._PROJECT_DIR, shell=False)
+                      stderr=errFile, cwd=context.projectDir, shell=False)
   antProcess.wait()
 
   # Look for a compilation error
@@ -710,9 +1600,127 @@ def compile_project():
 
   if (outText.find("build failed") >= 0 or errText.find("build failed") >= 0):
     #logger.debug("Ant 'compile' command failed, could not compile project in work area")
-    return False
+    return False, has_compile_errors(outText) or has_compile_errors(errText)
   else:
-    return True
+    return True, False
+
+
+def compile_changed_file(context, changedFile):
+  """Compile a single source file against the classes already in the class
+  directory. The mutation operators only add, remove or move synchronization,
+  so the signatures of the classes don't change and the classes that depend
+  on the changed file don't have to be recompiled.
+
+  The file is compiled by the compile server (see _javac/run_javac.py) when
+  config._USE_COMPILE_SERVER is on, and by starting javac otherwise.
+
+  When the classes are hard links (see snapshot.py), javac would write the
+  new classes through them. They are compiled to a directory of their own
+  instead, and renamed into the class directory.
+
+  Attributes:
+  context (ProjectContext): project to compile, its class directory holding
+    the classes of the unmutated project
+  changedFile (string): source file to compile, relative to the project
+  Returns:
+  (boolean, boolean): Did the file compile, and did javac report errors in
+    the sources?
+  """
+
+  projectDir = context.projectDir
+  classDir = context.classDir
+  classpath = context.classpath
+
+  outputDir = classDir
+  if snapshot.uses_links():
+    # workarea/class.XXXXXX
+    outputDir = tempfile.mkdtemp(prefix='class.', dir=projectDir)
+
+  result = None
+  if config._USE_COMPILE_SERVER:
+    result = run_javac.compile_sources([os.path.join(projectDir, changedFile)],
+               classDir + ":" + classpath, outputDir)
+
+  if result is not None:
+    compiled, diagnostics = result
+    #for diagnostic in diagnostics:
+    #  logger.debug(diagnostic)
+    diagnosed = len([diagnostic for diagnostic in diagnostics
+                     if diagnostic.kind == 'ERROR']) > 0
+  else:
+    # The compile server isn't available, start javac instead
+    outFile = tempfile.SpooledTemporaryFile()
+    errFile = tempfile.SpooledTemporaryFile()
+
+    javacProcess = subprocess.Popen(['javac', '-nowarn', '-d', outputDir,
+      '-cp', classDir + ":" + classpath, os.path.join(projectDir, changedFile)],
+      stdout=outFile, stderr=errFile, cwd=projectDir, shell=False)
+    compiled = javacProcess.wait() == 0
+
+    errFile.seek(0)
+    errText = errFile.read()
+    #logger.debug("Compile, Error text:\n")
+    #logger.debug(errText)
+    diagnosed = has_compile_errors(errText)
+    outFile.close()
+    errFile.close()
+
+  if outputDir != classDir:
+    if compiled:
+      snapshot.move_into(outputDir, classDir)
+    else:
+      shutil.rmtree(outputDir)
+
+  return compiled, not compiled and diagnosed
+
+
+def get_pristine_class_dir():
+  """Where the classes of the pristine project are kept.
+
+  Returns:
+  string: tmp/pristine/class
+  """
+
+  return os.path.join(config._TMP_DIR, 'pristine',
+         config._PROJECT_CLASS_DIR.replace(config._PROJECT_DIR, ''))
+
+
+def save_pristine_classes():
+  """Keep the classes of the pristine project, compiled in the work area at
+  startup. They are copied into the local projects made from the pristine
+  project, so the first mutants can be compiled incrementally."""
+
+  if not config._INCREMENTAL_COMPILE or \
+    not os.path.isdir(config._PROJECT_CLASS_DIR):
+    return
+
+  pristineClassDir = get_pristine_class_dir()
+  if os.path.exists(pristineClassDir):
+    shutil.rmtree(pristineClassDir)
+  snapshot.snapshot(config._PROJECT_CLASS_DIR, pristineClassDir)
+
+
+def save_classes_to_local_project(generation, memberNum):
+  """After a mutant compiled in the work area, keep its classes in the local
+  project. The next generation's mutants of this member start from them.
+
+  Attributes:
+  generation (int): Current generation of the evolutionary strategy
+  memberNum (int): Which member of the population we are dealing with
+  """
+
+  if not config._INCREMENTAL_COMPILE or config._BUILD_IN_PLACE:
+    # With config._BUILD_IN_PLACE they were compiled in the local project
+    return
+
+  classPart = config._PROJECT_CLASS_DIR.replace(config._PROJECT_DIR, '')
+  srcDir = os.path.join(get_workarea(generation, memberNum), classPart)
+  # tmp/3/4/project/class/
+  destDir = os.path.join(get_local_project(generation, memberNum), classPart)
+
+  if os.path.exists(destDir):
+    shutil.rmtree(destDir)
+  snapshot.snapshot(srcDir, destDir)
 
 
 def move_best_project_to_output(generation, memberNum):
@@ -724,15 +1732,14 @@ def move_best_project_to_output(generation, memberNum):
   memberNum (int): Which member of the population
   """
 
-  srcDir = os.path.join(config._TMP_DIR, str(generation), str(memberNum),
-           'project')
+  srcDir = get_local_project(generation, memberNum)
 
   logger.debug("Moving local project to output:")
   logger.debug("\nSrc: {}\nDst: {}".format(srcDir, config._PROJECT_OUTPUT_DIR))
 
   if os.path.exists(config._PROJECT_OUTPUT_DIR):
     shutil.rmtree(config._PROJECT_OUTPUT_DIR)
-  shutil.copytree(srcDir, config._PROJECT_OUTPUT_DIR)
+  snapshot.snapshot(srcDir, config._PROJECT_OUTPUT_DIR, ignore=_TEST_OUTPUT)
 
 
 # -----------------------------------------------------------------------------
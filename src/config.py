@@ -17,11 +17,12 @@ _MAX_CORES = 2
 _TMP_DIR = _ROOT_DIR + "tmp/"
 _TXL_DIR = _ROOT_DIR + "src/_txl/"
 _JPF_DIR = _ROOT_DIR + "src/_jpf/"
+_HARNESS_DIR = _ROOT_DIR + "src/_contest/"
+_JAVAC_DIR = _ROOT_DIR + "src/_javac/"
 _JUNIT_JAR = _ROOT_DIR + "lib/junit-4.8.1.jar"
 _LOG_LEVEL = "DEBUG"  # {OFF,ERROR,WARN,INFO,DEBUG}
 _LOG_FILE = "log.txt"  # If None then use stdout, otherwise specify a file
 _RANDOM_SEED = None  # None means use the system time, non-zero is fixed
-_OS = "MAC"
 
 # Target project variables
 
@@ -44,6 +45,48 @@ _PROJECT_COMPILE = "compile"
 _PROJECT_TEST = "test"
 _PROJECT_CLASSPATH = None  # Automatically acquired using ant test if None
 _PROJECT_TEST_MB = 2000
+# Compile only the mutated file of a mutant (javac) against the classes of the
+# project it was made from, instead of rebuilding the project with ant
+_INCREMENTAL_COMPILE = True
+# Compile the mutated files in a long running JVM (_javac/launchJavac.java)
+# instead of starting javac for every mutant
+_USE_COMPILE_SERVER = True
+_JAVAC_GATEWAY_PORT = 25533  # py4j port of the compile server
+# Seconds a compile (and each mutant checked by probe_mutants) may take in the
+# compile server. After that the server is restarted and javac is used
+_JAVAC_SERVER_TIMEOUT_SEC = 120
+# Remember which projects compiled and keep their classes, so a mutant seen
+# before isn't compiled again. The cache is kept between runs. Entries are
+# keyed by a hash of the sources, tests, build.xml, classpath and javac
+# version, so a changed build gets entries of its own
+_COMPILE_CACHE = True
+_COMPILE_CACHE_DIR = _ROOT_DIR + "compile_cache/"
+# Number of candidate mutants of a member compiled at once, each in its own
+# sandbox (tmp/gen/member/speculative/n/). The first one, in the order they
+# were drawn, that compiles is used. 1 compiles one candidate at a time
+_SPECULATIVE_COMPILES = 1
+# After the mutants of a member are generated, check which of them compile in
+# one compile server session. mutation() skips the ones that don't. Needs
+# _USE_COMPILE_SERVER and _INCREMENTAL_COMPILE
+_PROBE_MUTANTS = True
+# How copies of projects (local projects, work areas, ...) are made:
+# 'copy', 'reflink' (copy-on-write clones, falls back to 'copy'), 'hardlink'
+# or 'blobstore' (hard links into a content addressed store in tmp/blobs/).
+# See _txl/snapshot.py before using 'hardlink' or 'blobstore'
+_PROJECT_SNAPSHOT = 'reflink'
+# Keep local projects (tmp/gen/member/project/) as the pristine project plus a
+# list of edits (mutants), and only make the directory when it is used.
+# Replacing, restarting and cloning members then copies no files. Works best
+# with _COMPILE_CACHE on, which provides the classes of the made projects
+_DELTA_INDIVIDUALS = False
+# Compile and test each member in its local project (tmp/gen/member/project/)
+# instead of copying it to a workarea first. Members then never share a
+# directory, whatever _EVOLUTION_PARALLEL_MEMBERS is
+_BUILD_IN_PLACE = False
+# Old mutants and work areas are deleted in the background. If the file system
+# holding tmp/ has less than this many MB free, wait for the deletion to catch
+# up before going on. 0 never waits
+_RECLAIM_MIN_FREE_MB = 1024
 
 # JPF variables
 _JPF_JAR = _ROOT_DIR + "lib/JPF/build/jpf.jar"
@@ -51,6 +94,9 @@ _JPF_INCREMENTAL_JAR = _ROOT_DIR + "lib/JPF/build/jpf-incremental.jar"
 _JPF_CONFIG = _PROJECT_PRISTINE_DIR + 'account.jpf'
 _JPF_SEARCH_DEPTH = 50
 _JPF_SEARCH_TIME_SEC = 30
+# py4j port of the first launchJPF JVM. When members are evaluated
+# concurrently, each launchJPF JVM gets its own port counting up from here
+_JPF_GATEWAY_PORT = 25333
 
 # Location of py4j jar
 _PY4J_JAR = _ROOT_DIR + "lib/Java/py4j0.8.jar"
@@ -71,9 +117,74 @@ _SHARED_VARS_FILE = _PROJECT_DIR + "com_ibm_contest/sharedVars.txt"
 _CONTEST_JAR = _CONTEST_DIR + "ConTest.jar"
 _CONTEST_RUNS = 10
 _CONTEST_TIMEOUT_SEC = 300 # Default timeout, it is adjusted dynamically
+# Adaptive timeout: Once _CONTEST_TIMEOUT_MIN_SAMPLES test runs have finished,
+# the timeout is the _CONTEST_TIMEOUT_QUANTILE of the last
+# _CONTEST_TIMEOUT_WINDOW run times plus a _CONTEST_TIMEOUT_MARGIN fraction of it.
+# Until then (or if disabled) _CONTEST_TIMEOUT_SEC is used, and it is never
+# exceeded. Runs that time out without a deadlock count with their timeout as
+# run time. Runs in parallel and in the harness are timed separately
+_CONTEST_ADAPTIVE_TIMEOUT = True
+_CONTEST_TIMEOUT_WINDOW = 200
+_CONTEST_TIMEOUT_QUANTILE = 0.99
+_CONTEST_TIMEOUT_MARGIN = 1.0
+_CONTEST_TIMEOUT_MIN_SAMPLES = 20
+_CONTEST_TIMEOUT_MIN_SEC = 1
 # Default multiplier of 20 was too low for this program
 _CONTEST_TIMEOUT_MULTIPLIER = 20  # The average execution time (with conTest) is multiplied by this
+                                  # Used until the adaptive timeout has enough samples
 _CONTEST_VALIDATION_MULTIPLIER = 15  # Allows for validation of functionality
+# Max seconds to wait for the JVM thread dump of a timed out test run
+_CONTEST_THREAD_DUMP_SEC = 5
+# Watchdog: Sample the CPU time of running test JVMs. If it doesn't go up for
+# _CONTEST_WATCHDOG_STALLED_SAMPLES samples in a row, request a thread dump and
+# stop the run right away if it shows a deadlock
+_CONTEST_WATCHDOG = True
+_CONTEST_WATCHDOG_INTERVAL_SEC = 0.5
+_CONTEST_WATCHDOG_STALLED_SAMPLES = 3
+# Number of test JVMs kept running at once. 1 runs the tests one after another.
+# The performance measurements of the optimization phase are always taken one
+# run at a time
+_CONTEST_PARALLEL_RUNS = _MAX_CORES
+# Number of test JVMs kept running at once when validating a potential fix.
+# The first failure cancels the runs still in progress
+_CONTEST_VALIDATION_WORKERS = _MAX_CORES
+# Sequential testing: During the fixing phase, stop testing a member once the
+# confidence interval on its success rate is clear of the best success rate in
+# the population. Counts are scaled up to _CONTEST_RUNS runs
+_CONTEST_SEQUENTIAL_TESTING = False
+_CONTEST_SEQUENTIAL_Z = 1.96  # z value of the confidence interval (95%)
+_CONTEST_SEQUENTIAL_MIN_RUNS = 4  # Never stop before this many runs
+# Adaptive sample size for the optimization phase: Stop measuring a member
+# once the confidence intervals on its mean real time and voluntary switches
+# are within _MEASUREMENT_TARGET_WIDTH (relative half width) of the means, or
+# once it is clearly worse than the best member. At most
+# _CONTEST_RUNS * _CONTEST_VALIDATION_MULTIPLIER runs are measured. That many
+# runs are always done to check that the member has no new bugs, the ones
+# that aren't measured _CONTEST_VALIDATION_WORKERS at a time
+_MEASUREMENT_ADAPTIVE = True
+_MEASUREMENT_MIN_RUNS = 20
+_MEASUREMENT_TARGET_WIDTH = 0.05
+# Run the fixing phase tests in a long running JVM (_contest/launchHarness.java)
+# that loads the project in a new class loader for every run, instead of
+# starting a JVM per run. ConTest writes the shared variables it finds when
+# its JVM exits, so the harness is only used once they have been found
+_CONTEST_USE_HARNESS = False
+_CONTEST_HARNESS_PORT = 25433  # py4j port of the first harness JVM
+
+# Number of txl processes run at once while generating the mutants of a
+# member, over all of its files and operators
+_TXL_PARALLEL_PROCESSES = _MAX_CORES
+# Keep the mutants of every txl invocation, by the content of the file mutated,
+# the operator and its arguments. Later invocations that are the same copy
+# them instead of running txl. The cache is kept between runs
+_MUTANT_CACHE = True
+_MUTANT_CACHE_DIR = _ROOT_DIR + "mutant_cache/"
+# Only count the mutants of a member up front (txl -count) and write a mutant
+# when mutation() draws it. Mutants aren't probed (_PROBE_MUTANTS) then
+_LAZY_MUTANTS = False
+# From generation 2 on, only mutate the files of a member that changed since
+# its last generation. The mutants of the other files are carried forward
+_INCREMENTAL_MUTATION = True
 
 # Mutation operator variables
 # [0]Name  [1]Enable  [2]Enable for DataRace  [3]Enable for Deadlock  [4]File
@@ -117,6 +228,10 @@ _EVOLUTION_REPLACE_LOWEST_PERCENT = 10
 _EVOLUTION_REPLACE_INTERVAL = 5  # Consider replacement on this generational interval
 _EVOLUTION_REPLACE_WEAK_MIN_TURNS = 3  # Min number of turns of underperforming before replacement
 _EVOLUTION_REPLACE_WITH_BEST_PERCENT = 75
+# Number of members mutated, compiled and evaluated at the same time. When
+# larger than 1, each member is built and tested in tmp/<gen>/<member>/workarea/
+# instead of the shared _PROJECT_DIR
+_EVOLUTION_PARALLEL_MEMBERS = 1
 
 # Dynamic ranking window (number of generations to consider)
 _DYNAMIC_RANKING_WINDOW = 5
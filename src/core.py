@@ -39,17 +39,15 @@ import tempfile
 import re
 import sys
 from _contest import contester
+from _contest import timeout
 from _evolution import evolution
 from _txl import txl_operator
 from _evolution import static
-# Send2Trash from https://pypi.python.org/pypi/Send2Trash
-from send2trash import send2trash
+from _evolution import reclaimer
 
 import logging
 logger = logging.getLogger('output-log')
 
-_OS = "MAC"
-
 def main():
   """CORE starts here.
 
@@ -59,29 +57,10 @@ def main():
     Eternal damnation (Or a PhD)
   """
 
-  global _OS
-
   # Check for the workarea directory
   if not os.path.exists(config._PROJECT_DIR):
     os.makedirs(config._PROJECT_DIR)
 
-  # Different operating systems implement some commands differently, so we
-  # have to plan for that as it comes up. So far, we've found that MAC and
-  # LINUX implement the time command differently. Therefore, determine which
-  # OS we're running on.
-  outFile = tempfile.SpooledTemporaryFile()
-  errFile = tempfile.SpooledTemporaryFile()
-  helpProcess = subprocess.Popen(['uname', '-o'], stdout=outFile, stderr=errFile,
-    cwd=config._PROJECT_DIR, shell=False)
-  helpProcess.wait()
-  outFile.seek(0)
-  outText = outFile.read()
-  outFile.close()
-  if re.search("Linux", outText):
-    _OS = "LINUX"
-  else:
-    _OS = "MAC"
-
   # Compile the project
   if os.path.exists(config._PROJECT_DIR):
     shutil.rmtree(config._PROJECT_DIR)
@@ -142,22 +121,23 @@ def main():
   contestTime = contester.run_test_execution(20)
   config._CONTEST_TIMEOUT_SEC = contestTime * config._CONTEST_TIMEOUT_MULTIPLIER
   logger.info("Using a timeout value of {}s".format(config._CONTEST_TIMEOUT_SEC))
+  if config._CONTEST_ADAPTIVE_TIMEOUT:
+    logger.info("Adaptive timeout after the practice runs: {:.1f}s".format(
+      timeout.get_timeout(True)))
 
   # Clean up the temporary directory (Probably has subdirs from previous runs)
   logger.info("Cleaning TMP directory")
   # Cleaning up a previous run could take half an hour on the mac
   # (10,000+ files is slow)
-  # Trying an alternate approach: Sending the files to the trash
-  # Using an external module, Send2Trash from:
-  # https://pypi.python.org/pypi/Send2Trash
-  # Install command: pip install Send2Trash
-  # Some info on pip at: https://pypi.python.org/pypi
-
-  if not os.path.exists(config._TMP_DIR):
-    os.makedirs(config._TMP_DIR)
-  else:
-    send2trash(config._TMP_DIR)
-    os.makedirs(config._TMP_DIR)
+  # The old directory is renamed and deleted in the background while CORE
+  # runs, see _evolution/reclaimer.py. So is anything an earlier run didn't
+  # get to delete
+  reclaimer.reclaim_leftovers()
+  reclaimer.reclaim(config._TMP_DIR)
+  os.makedirs(config._TMP_DIR)
+
+  # Keep the classes compiled above for incremental compiles of the mutants
+  txl_operator.save_pristine_classes()
 
 
   # We're keeping a database (config file) containing the results